@@ -1,18 +1,52 @@
-import os
-from flask import Flask
-from flask_cors import CORS
-from dotenv import load_dotenv
-from routes.destinations import destinations_bp
-from routes.newsletter import newsletter_bp
-from routes.itinerary import itinerary_bp
-from routes.trips import trips_bp
-from routes.saved_destinations import saved_destinations_bp
-from routes.user import user_bp
-
-load_dotenv()
+from services.startup import startup_phase, init_startup_timing
+
+with startup_phase("flask"):
+    from flask import Flask
+    from flask_cors import CORS
+
+# .env is already loaded: services.startup loads it before reading its own settings
+
+with startup_phase("logging"):
+    from services.structured_logging import setup_logging
+
+# JSON logs through a queue and a writer thread, set up before anything logs
+setup_logging()
+
+with startup_phase("middleware"):
+    from middleware.json_provider import init_json_provider
+    from middleware.metrics import init_request_metrics
+    from middleware.profiling import init_profiling
+    from middleware.request_logging import init_request_logging
+    from middleware.responses import init_response_middleware
+
+# Each blueprint is imported in its own phase so the startup report shows what it costs.
+# Heavy SDKs (supabase, google-genai, resend, numpy/scipy) are only imported on first use.
+with startup_phase("routes.destinations"):
+    from routes.destinations import destinations_bp
+with startup_phase("routes.newsletter"):
+    from routes.newsletter import newsletter_bp
+with startup_phase("routes.itinerary"):
+    from routes.itinerary import itinerary_bp
+with startup_phase("routes.trips"):
+    from routes.trips import trips_bp
+with startup_phase("routes.saved_destinations"):
+    from routes.saved_destinations import saved_destinations_bp
+with startup_phase("routes.user"):
+    from routes.user import user_bp
+with startup_phase("routes.bootstrap"):
+    from routes.bootstrap import bootstrap_bp
+with startup_phase("routes.debug"):
+    from routes.debug import debug_bp
+with startup_phase("routes.metrics"):
+    from routes.metrics import metrics_bp
+from services.jobs import start_job_runner
+from services.outbox_service import start_outbox_dispatcher
 
 app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}})
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=["X-Next-Cursor", "ETag", "X-Request-ID"])
+
+# orjson-backed jsonify() and get_json(), when orjson is installed
+init_json_provider(app)
 
 # Register route blueprints
 app.register_blueprint(destinations_bp)
@@ -21,6 +55,28 @@ app.register_blueprint(itinerary_bp)
 app.register_blueprint(trips_bp)
 app.register_blueprint(saved_destinations_bp)
 app.register_blueprint(user_bp)
+app.register_blueprint(bootstrap_bp)
+app.register_blueprint(debug_bp)
+app.register_blueprint(metrics_bp)
+
+# Request ids for log records, returned as X-Request-ID
+init_request_logging(app)
+
+# Per-route latency histograms (registered first so they time the middleware below too)
+init_request_metrics(app)
+
+# Opt-in stack sampling of slow requests (PROFILE_ENABLED=1), listed at /api/debug/profiles
+init_profiling(app)
+
+# Conditional GET (ETag / 304) and brotli/gzip compression for JSON responses
+init_response_middleware(app)
+
+# Resume background jobs (account deletion, ...) left unfinished by a previous process
+start_job_runner()
+start_outbox_dispatcher()
+
+# Time-to-ready and time-to-first-request, reported at /api/debug/startup
+init_startup_timing(app)
 
 if __name__ == '__main__':
     app.run(debug=True, port=5001)
@@ -0,0 +1,114 @@
+"""
+ASGI entry point: the async serving mode.
+
+    gunicorn -k uvicorn.workers.UvicornWorker -w 2 -b 0.0.0.0:5001 --timeout 120 asgi:app
+
+The Gemini routes (see ASYNC_ROUTES in routes/itinerary.py) run natively
+on the event loop with the async GenAI client, so hundreds of slow LLM
+calls can be in flight in a few processes. Every other route is served
+by the regular Flask app on a thread pool (ASGI_WSGI_THREADS per process).
+
+The native routes bypass the Flask middleware. AsyncApp gives them the
+parts that matter for every request: an X-Request-ID carried by their log
+records, and the request latency metric. They are exempt from the rest:
+response compression (their bodies are small JSON), the sampling
+profiler (it samples threads, not coroutines), and the response
+middleware's ETag and cache headers (POST responses aren't cached).
+
+The sync entry point (gunicorn app:app) is unchanged and remains the default.
+"""
+import os
+import json
+import time
+import uuid
+from a2wsgi import WSGIMiddleware
+from app import app as flask_app
+from middleware.request_logging import REQUEST_ID_PATTERN
+from routes.itinerary import ASYNC_ROUTES
+from services.metrics import REQUEST_LATENCY
+from services.structured_logging import request_id_var
+
+# Threads per process for the routes that still run through Flask
+ASGI_WSGI_THREADS = int(os.environ.get("ASGI_WSGI_THREADS", "16"))
+
+
+class AsyncApp:
+    """Dispatches ASYNC_ROUTES natively and everything else to the WSGI app."""
+
+    def __init__(self, wsgi_app, routes: dict):
+        self.wsgi = WSGIMiddleware(wsgi_app, workers=ASGI_WSGI_THREADS)
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+
+        if scope["type"] == "http":
+            handler = self.routes.get((scope["method"], scope["path"]))
+            if handler is not None:
+                started = time.perf_counter()
+                status = await self._handle(scope, handler, receive, send)
+                if status is not None:
+                    REQUEST_LATENCY.labels(scope["method"], scope["path"], str(status)).observe(
+                        time.perf_counter() - started
+                    )
+                return
+
+        await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        # Startup work (job runner, outbox dispatcher) already ran when app.py was imported
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _handle(self, scope, handler, receive, send):
+        # Same request id rules as middleware/request_logging.py; each request
+        # runs in its own task, so the context variable doesn't leak between them
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")
+        if not REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+        request_id_var.set(request_id)
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+
+        try:
+            data = json.loads(b"".join(chunks) or b"null")
+        except ValueError:
+            body, status = {"error": "Request body must be valid JSON"}, 400
+        else:
+            # Handlers take a JSON object, or None for an empty body
+            if data is not None and not isinstance(data, dict):
+                body, status = {"error": "Request body must be a JSON object"}, 400
+            else:
+                body, status = await handler(data)
+        payload = json.dumps(body).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(payload)).encode()),
+                # Same CORS policy as the Flask app
+                (b"access-control-allow-origin", b"*"),
+                (b"x-request-id", request_id.encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": payload})
+        return status
+
+
+app = AsyncApp(flask_app, ASYNC_ROUTES)
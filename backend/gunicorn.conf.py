@@ -0,0 +1,24 @@
+"""
+Gunicorn settings picked up automatically from the working directory.
+
+Prepares the shared directory where every worker writes its Prometheus
+samples, so /metrics can report the whole container (see services/metrics).
+"""
+import os
+import shutil
+import tempfile
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "voyager-metrics"))
+
+
+def on_starting(server):
+    # Samples from a previous run would otherwise be added to this one
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
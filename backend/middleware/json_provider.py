@@ -0,0 +1,43 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: Flask's stdlib-json provider is used without it
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    jsonify() and request.get_json() backed by orjson.
+
+    Keys keep their insertion order (the serializer schemas define it)
+    instead of being sorted, and the encoded bytes go into the response
+    as-is rather than through an intermediate str.
+    """
+
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs) -> str:
+        return self._encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._encode(obj) + b"\n", mimetype=self.mimetype)
+
+    def _encode(self, obj) -> bytes:
+        option = orjson.OPT_INDENT_2 if self._app.debug else 0
+        try:
+            # Flask's default() covers the types orjson doesn't (Decimal, __html__)
+            return orjson.dumps(obj, default=self.default, option=option)
+        except TypeError:
+            # e.g. integers beyond 64 bits: the stdlib encoder handles anything Flask's does
+            return super().dumps(obj).encode()
+
+
+def init_json_provider(app):
+    """Serve JSON through orjson when it is installed."""
+    if orjson is not None:
+        app.json = FastJSONProvider(app)
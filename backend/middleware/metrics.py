@@ -0,0 +1,26 @@
+import time
+from flask import g, request
+from services.metrics import REQUEST_LATENCY
+
+
+def init_request_metrics(app):
+    """
+    Record every request's latency, labelled by route template and status.
+
+    Register this before the other after_request middleware: Flask runs
+    after_request hooks in reverse order, so the timing then includes them.
+    """
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _record_latency(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            # The route template (/api/trips/<trip_id>) keeps the label set small
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            REQUEST_LATENCY.labels(request.method, route, str(response.status_code)).observe(
+                time.perf_counter() - started
+            )
+        return response
@@ -0,0 +1,41 @@
+import time
+import threading
+from flask import g, request
+from services import profiler
+
+
+def init_profiling(app):
+    """
+    Sample the stacks of running requests and keep profiles of slow ones
+    (see services/profiler). Does nothing unless PROFILE_ENABLED=1.
+    """
+    if not profiler.PROFILE_ENABLED:
+        return
+
+    @app.before_request
+    def _start_sampling():
+        g.profile_started = time.perf_counter()
+        g.profile_wall_start = time.time()
+        g.profile_picked = profiler.pick_for_sampling()
+        profiler.sampler.start(threading.get_ident())
+
+    @app.teardown_request
+    def _finish_sampling(exc):
+        started = g.pop("profile_started", None)
+        if started is None:
+            return
+        samples = profiler.sampler.stop(threading.get_ident())
+        duration_ms = (time.perf_counter() - started) * 1000
+        if not samples or not profiler.should_keep(duration_ms, g.pop("profile_picked", False)):
+            return
+
+        started_at = g.pop("profile_wall_start")
+        profiler.submit(samples, {
+            "id": f"{int(started_at * 1000)}-{threading.get_ident() % 100000}",
+            "startedAt": started_at,
+            "method": request.method,
+            "route": request.url_rule.rule if request.url_rule else request.path,
+            "path": request.full_path.rstrip("?"),
+            "durationMs": round(duration_ms, 1),
+            "error": repr(exc) if exc else None,
+        })
@@ -0,0 +1,29 @@
+import re
+import uuid
+from flask import g, request
+from services.structured_logging import request_id_var
+
+# Incoming ids are reused only if they look like an id, so logs can't be injected into
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def init_request_logging(app):
+    """Give every request an id (X-Request-ID, reused from the caller if valid) that all its log records carry."""
+    @app.before_request
+    def _assign_request_id():
+        request_id = request.headers.get("X-Request-ID", "")
+        if not REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+        g.request_id = request_id
+        request_id_var.set(request_id)
+
+    @app.after_request
+    def _return_request_id(response):
+        if "request_id" in g:
+            response.headers["X-Request-ID"] = g.request_id
+        return response
+
+    @app.teardown_request
+    def _clear_request_id(exc):
+        # Worker threads are reused; don't let the id leak into the next request
+        request_id_var.set(None)
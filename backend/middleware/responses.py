@@ -0,0 +1,100 @@
+import os
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Optional: fall back to gzip only
+    brotli = None
+
+# Responses smaller than this are sent uncompressed - the headers would outweigh the savings
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/html", "text/plain", "text/csv"}
+
+# GET routes whose responses get an ETag and a Cache-Control policy.
+# Per-user data must be revalidated on every use, but an unchanged
+# payload then costs a 304 with no body instead of the full download.
+CACHE_POLICIES = [
+    ("/api/trips", "private, no-cache"),
+    ("/api/saved-destinations", "private, no-cache"),
+]
+
+
+def _cache_policy(path: str):
+    """Return the Cache-Control value for a path, or None if it isn't cacheable."""
+    for prefix, policy in CACHE_POLICIES:
+        if path == prefix or path.startswith(prefix + "/"):
+            return policy
+    return None
+
+
+def _apply_conditional_get(response):
+    """Tag cacheable GET responses with a weak ETag and answer 304 on a match."""
+    if request.method not in ("GET", "HEAD") or response.status_code != 200:
+        return response
+
+    policy = _cache_policy(request.path)
+    if policy is None:
+        return response
+
+    response.headers["Cache-Control"] = policy
+    # Routes may set their own ETag (e.g. a trip's version); keep it if so
+    response.add_etag(overwrite=False, weak=True)
+    return response.make_conditional(request)
+
+
+def _choose_encoding():
+    """Pick the best content coding the client accepts: br, then gzip."""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def _apply_compression(response):
+    """Compress large textual responses with brotli or gzip."""
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 304)
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+
+    encoding = _choose_encoding()
+    if encoding == "br":
+        compressed = brotli.compress(data, quality=BROTLI_QUALITY)
+    elif encoding == "gzip":
+        compressed = gzip.compress(data, compresslevel=GZIP_LEVEL)
+    else:
+        return response
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_response_middleware(app):
+    """
+    Register conditional GET and response compression on the Flask app.
+
+    The ETag is computed on the uncompressed body so it stays stable across
+    content codings, so conditional handling always runs first.
+    """
+    @app.after_request
+    def _finalize_response(response):
+        response = _apply_conditional_get(response)
+        return _apply_compression(response)
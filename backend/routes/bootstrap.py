@@ -0,0 +1,46 @@
+from flask import Blueprint, jsonify, request
+from services.bootstrap_service import load_bootstrap, BOOTSTRAP_PARTS
+from services.serializers import DESTINATION, PERSONALIZED_DESTINATION, SAVED_DESTINATION, TRIP
+
+bootstrap_bp = Blueprint('bootstrap', __name__)
+
+
+@bootstrap_bp.route('/api/bootstrap', methods=['GET'])
+def bootstrap():
+    """
+    Get the data for the app's first paint in one round trip.
+
+    Query Parameters:
+        userId: The signed-in user. Without it, saved destinations and trips are empty
+        tags: Comma-separated tags for a personalized feed (default: random feed)
+        include: Comma-separated subset of "destinations", "saved", "trips" (default: all)
+
+    Returns:
+        JSON with 'destinations' (the hero feed), 'savedDestinations' (as
+        GET /api/saved-destinations) and 'trips' (summaries, as GET /api/trips).
+        Parts not included are omitted.
+    """
+    user_id = request.args.get('userId')
+    tags = [t.strip() for t in request.args.get('tags', '').split(',') if t.strip()]
+
+    include = request.args.get('include')
+    if include:
+        parts = tuple(p.strip() for p in include.split(',') if p.strip())
+        unknown = [p for p in parts if p not in BOOTSTRAP_PARTS]
+        if unknown:
+            return jsonify({"error": f"include must be a subset of: {', '.join(BOOTSTRAP_PARTS)}"}), 400
+    else:
+        parts = BOOTSTRAP_PARTS
+
+    data = load_bootstrap(user_id, tags=tags, parts=parts)
+
+    result = {}
+    if "destinations" in parts:
+        schema = PERSONALIZED_DESTINATION if tags else DESTINATION
+        result["destinations"] = schema.many(data["destinations"])
+    if "saved" in parts:
+        result["savedDestinations"] = SAVED_DESTINATION.many(data.get("saved", []))
+    if "trips" in parts:
+        result["trips"] = TRIP.many(data.get("trips", []))
+
+    return jsonify(result), 200
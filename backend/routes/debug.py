@@ -0,0 +1,53 @@
+import os
+from flask import Blueprint, jsonify, abort, Response
+from services.startup import startup_report
+from services.profiler import ring as profile_ring
+
+debug_bp = Blueprint('debug', __name__)
+
+# Debug endpoints are off unless explicitly enabled for an environment
+DEBUG_ENDPOINTS_ENABLED = os.environ.get("DEBUG_ENDPOINTS", "").lower() in ("1", "true", "yes")
+
+
+@debug_bp.before_request
+def require_debug_enabled():
+    if not DEBUG_ENDPOINTS_ENABLED:
+        abort(404)
+
+
+@debug_bp.route('/api/debug/startup', methods=['GET'])
+def get_startup_report():
+    """
+    Get this worker's cold start breakdown: time to ready and to first request,
+    per-phase import times, shared client creation times and, when
+    STARTUP_IMPORT_PROFILE=1, the slowest module imports.
+    """
+    return jsonify({"pid": os.getpid(), **startup_report()}), 200
+
+
+@debug_bp.route('/api/debug/http', methods=['GET'])
+def get_http_stats():
+    """Get this worker's outbound connection pool usage and connection reuse per host."""
+    # Imported here so httpx stays out of the startup path
+    from services.http_transport import transport_stats
+
+    return jsonify({"pid": os.getpid(), **transport_stats()}), 200
+
+
+@debug_bp.route('/api/debug/profiles', methods=['GET'])
+def list_profiles():
+    """
+    List the stored slow-request profiles, newest first, with their
+    wait/Python split and time per service function (PROFILE_ENABLED=1).
+    """
+    profiles = [{k: v for k, v in p.items() if k != "collapsed"} for p in profile_ring.list()]
+    return jsonify({"profiles": profiles}), 200
+
+
+@debug_bp.route('/api/debug/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Get one profile's collapsed stacks as text, ready for flamegraph.pl or speedscope."""
+    profile = profile_ring.get(profile_id)
+    if not profile:
+        return jsonify({"error": "Profile not found"}), 404
+    return Response(profile["collapsed"] + "\n", mimetype="text/plain")
@@ -1,8 +1,23 @@
 from flask import Blueprint, jsonify, request
-from services.database import get_random_batch, get_destinations_by_tags
+from services.database import (
+    get_random_batch,
+    get_destinations_by_tags,
+    get_trending_destinations,
+    search_destinations,
+    suggest_destinations,
+)
+from services.serializers import DESTINATION, PERSONALIZED_DESTINATION, DESTINATION_SUGGESTION
 
 destinations_bp = Blueprint('destinations', __name__)
 
+# Upper bound on the page size a client may request from search
+MAX_SEARCH_PAGE_SIZE = 100
+# Values counted per facet in a search response
+SEARCH_FACET_LIMIT = 50
+# Typeahead bounds: suggestions per response and query length
+MAX_SUGGESTIONS = 20
+MAX_TYPEAHEAD_QUERY_LENGTH = 100
+
 
 @destinations_bp.route('/api/destinations/random', methods=['GET'])
 def random_destinations():
@@ -13,22 +28,7 @@ def random_destinations():
         return jsonify({"message": "Database is empty"}), 404
 
     # 2. Transform snake_case (DB) to camelCase (Frontend)
-    transformed = []
-    for dest in destinations:
-        transformed.append({
-            "id": str(dest.get("id")),
-            "name": dest.get("name"),
-            "location": dest.get("location"),
-            "description": dest.get("description"),
-            "tags": dest.get("tags", []),
-            "imagePrompt": dest.get("image_prompt", ""),
-            "imageUrl": dest.get("image_url"),
-            "isPersonalized": dest.get("is_personalized", False),
-            "country": dest.get("country", ""),
-            "region": dest.get("region", "")
-        })
-
-    return jsonify(transformed)
+    return jsonify(DESTINATION.many(destinations))
 
 
 @destinations_bp.route('/api/destinations/personalized', methods=['GET'])
@@ -61,19 +61,104 @@ def personalized_destinations():
         return jsonify({"message": "No destinations found matching your interests"}), 404
 
     # Transform snake_case (DB) to camelCase (Frontend)
+    return jsonify(PERSONALIZED_DESTINATION.many(destinations))
+
+
+@destinations_bp.route('/api/destinations/trending', methods=['GET'])
+def trending_destinations():
+    """
+    Fetches the most saved destinations, weighted towards recent saves.
+
+    Query Parameters:
+        limit: Number of destinations to return (default 10, max 50)
+
+    Returns:
+        JSON array of destinations, each with a 'saves' time-decayed save count
+    """
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    trending = get_trending_destinations(limit=limit)
+
     transformed = []
-    for dest in destinations:
-        transformed.append({
-            "id": str(dest.get("id")),
-            "name": dest.get("name"),
-            "location": dest.get("location"),
-            "description": dest.get("description"),
-            "tags": dest.get("tags", []),
-            "imagePrompt": dest.get("image_prompt", ""),
-            "imageUrl": dest.get("image_url"),
-            "isPersonalized": True,
-            "country": dest.get("country", ""),
-            "region": dest.get("region", "")
-        })
+    for dest, score in trending:
+        result = DESTINATION(dest)
+        result["saves"] = round(score, 2)
+        transformed.append(result)
 
     return jsonify(transformed)
+
+
+@destinations_bp.route('/api/destinations/search', methods=['GET'])
+def search():
+    """
+    Filter destinations by tags, country and region, with facet counts.
+
+    Query Parameters:
+        tags, country, region: Comma-separated values (case-insensitive). A destination
+            matches a facet if it has any of its values, and must match every facet given
+        match: "any" (default) or "all" - whether a destination needs any or all of the tags
+        limit: Page size (default 20, max 100)
+        offset: Number of matches to skip
+
+    Returns:
+        JSON with 'total' (number of matches), 'destinations' (the page) and
+        'facets': for tags, country and region, [{"value", "count"}] over all
+        matches, most common first
+    """
+    filters = {}
+    for facet in ('tags', 'country', 'region'):
+        filters[facet] = [v.strip() for v in request.args.get(facet, '').split(',') if v.strip()]
+
+    match = request.args.get('match', 'any')
+    if match not in ('any', 'all'):
+        return jsonify({"error": "match must be 'any' or 'all'"}), 400
+
+    limit = request.args.get('limit', 20, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if limit <= 0 or offset < 0:
+        return jsonify({"error": "limit must be positive and offset not negative"}), 400
+
+    result = search_destinations(
+        filters,
+        match_all=('tags',) if match == 'all' else (),
+        limit=min(limit, MAX_SEARCH_PAGE_SIZE),
+        offset=offset,
+        facet_limit=SEARCH_FACET_LIMIT,
+    )
+    if result is None:
+        return jsonify({"error": "Failed to search destinations"}), 500
+
+    return jsonify({
+        "total": result["total"],
+        "destinations": DESTINATION.many(result["rows"]),
+        "facets": {
+            facet: [{"value": value, "count": count} for value, count in counts]
+            for facet, counts in result["facets"].items()
+        },
+    }), 200
+
+
+@destinations_bp.route('/api/destinations/typeahead', methods=['GET'])
+def typeahead():
+    """
+    Suggest destinations for what the user has typed so far.
+
+    Query Parameters:
+        q: The text typed so far; its last word may be incomplete
+        limit: Number of suggestions (default 8, max 20)
+
+    Returns:
+        JSON array of {id, name, location, country, imageUrl}, best match first
+    """
+    query = request.args.get('q', '').strip()
+    if len(query) > MAX_TYPEAHEAD_QUERY_LENGTH:
+        return jsonify({"error": f"q must be at most {MAX_TYPEAHEAD_QUERY_LENGTH} characters"}), 400
+
+    limit = request.args.get('limit', 8, type=int)
+    if limit <= 0:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+
+    if not query:
+        return jsonify([]), 200
+
+    rows = suggest_destinations(query, limit=min(limit, MAX_SUGGESTIONS))
+    return jsonify(DESTINATION_SUGGESTION.many(rows)), 200
@@ -1,9 +1,32 @@
 from flask import Blueprint, jsonify, request
-from services.itinerary_service import generate_itinerary, generate_clarifying_questions
+from services.itinerary_service import (
+    generate_itinerary,
+    generate_clarifying_questions,
+    generate_itinerary_async,
+    generate_clarifying_questions_async,
+)
 
 itinerary_bp = Blueprint('itinerary', __name__)
 
 
+def validate_trip_request(data: dict) -> str:
+    """Return the error message for an invalid /generate request body, or None."""
+    if not data:
+        return "No data provided"
+    if not data.get('destination'):
+        return "Destination is required"
+    if not data.get('startDate') or not data.get('endDate'):
+        return "Start and end dates are required"
+    return None
+
+
+def itinerary_result(result: dict) -> tuple:
+    """Map a generate_itinerary result to (response body, status)."""
+    if result and "error" not in result:
+        return result, 200
+    return {"error": f"Failed to generate itinerary: {result.get('error', 'unknown')}"}, 500
+
+
 @itinerary_bp.route('/api/itinerary/questions', methods=['POST'])
 def get_questions():
     """
@@ -43,18 +66,35 @@ def generate():
     """
     data = request.get_json()
 
+    error = validate_trip_request(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    body, status = itinerary_result(generate_itinerary(data))
+    return jsonify(body), status
+
+
+# Async versions of the routes above, served natively by the ASGI app (asgi.py)
+# so a slow Gemini call waits on the event loop instead of holding a thread.
+# Each takes the parsed JSON body and returns (response body, status).
+
+async def get_questions_async(data: dict) -> tuple:
     if not data:
-        return jsonify({"error": "No data provided"}), 400
+        return {"questions": []}, 200
 
-    if not data.get('destination'):
-        return jsonify({"error": "Destination is required"}), 400
+    questions = await generate_clarifying_questions_async(data)
+    return {"questions": questions}, 200
 
-    if not data.get('startDate') or not data.get('endDate'):
-        return jsonify({"error": "Start and end dates are required"}), 400
 
-    result = generate_itinerary(data)
+async def generate_async(data: dict) -> tuple:
+    error = validate_trip_request(data)
+    if error:
+        return {"error": error}, 400
 
-    if result and "error" not in result:
-        return jsonify(result), 200
-    else:
-        return jsonify({"error": f"Failed to generate itinerary: {result.get('error', 'unknown')}"}), 500
+    return itinerary_result(await generate_itinerary_async(data))
+
+
+ASYNC_ROUTES = {
+    ('POST', '/api/itinerary/questions'): get_questions_async,
+    ('POST', '/api/itinerary/generate'): generate_async,
+}
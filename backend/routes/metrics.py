@@ -0,0 +1,18 @@
+import os
+from flask import Blueprint, request, abort, Response
+from services.metrics import render_metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# When set, scrapers must send "Authorization: Bearer <token>"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint, covering every gunicorn worker in this container."""
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        abort(401)
+
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
@@ -1,6 +1,12 @@
+import logging
 from flask import Blueprint, jsonify, request
-from services.database import get_random_batch, get_destinations_by_tags, get_subscribed_users
-from services.email_service import send_welcome_email, send_weekly_newsletter
+from services.database import get_random_batch, get_destinations_by_tags
+from services.email_service import send_weekly_newsletter
+from services.outbox_service import enqueue_email
+from services.newsletter_service import start_campaign, get_campaign_progress
+from services.subscribers_service import sync_subscription, start_reconcile
+
+logger = logging.getLogger(__name__)
 
 newsletter_bp = Blueprint('newsletter', __name__)
 
@@ -8,9 +14,12 @@ newsletter_bp = Blueprint('newsletter', __name__)
 @newsletter_bp.route('/api/newsletter/welcome', methods=['POST'])
 def send_welcome():
     """
-    Send a welcome email to a newly subscribed user.
+    Queue a welcome email to a newly subscribed user.
     Optionally includes personalized destinations based on user's saved tags.
 
+    The email is written to the outbox and sent in the background, so this
+    returns without waiting for the destination lookup or the email provider.
+
     Request Body:
         email: User's email address
         name: User's name
@@ -28,15 +37,10 @@ def send_welcome():
     if not email:
         return jsonify({"error": "Email is required"}), 400
 
-    # Get personalized destinations if tags are provided
-    destinations = None
-    if tags and len(tags) > 0:
-        destinations = get_destinations_by_tags(tags, limit=4)
-
-    result = send_welcome_email(email, name, destinations)
+    queued = enqueue_email("welcome", email, {"name": name, "tags": tags or []})
 
-    if result:
-        return jsonify({"message": "Welcome email sent successfully"}), 200
+    if queued:
+        return jsonify({"message": "Welcome email queued"}), 202
     else:
         return jsonify({"error": "Failed to send welcome email"}), 500
 
@@ -80,65 +84,89 @@ def send_newsletter():
         return jsonify({"error": "Failed to send newsletter"}), 500
 
 
+def transform_campaign(job: dict, counts: dict = None) -> dict:
+    """Transform a campaign job row to a camelCase status for the cron caller."""
+    progress = job.get("progress") or {}
+    return {
+        "campaignId": job.get("payload", {}).get("campaign_id"),
+        "status": job.get("status"),
+        "recipients": progress.get("recipients"),
+        "counts": counts,
+        "attempts": job.get("attempts", 0),
+        "lastError": job.get("last_error"),
+    }
+
+
 @newsletter_bp.route('/api/newsletter/send-all', methods=['POST'])
 def send_newsletter_to_all():
     """
     Send the weekly newsletter to ALL subscribed users.
     This endpoint is meant to be called by a cron job (e.g., cron-job.org).
 
-    Optional Query Parameter:
+    The send runs as a background campaign and this returns immediately.
+    Each ISO week is one campaign, so calling this again in the same week
+    returns the existing campaign instead of emailing everyone twice. If
+    that campaign failed for good, it is restarted for its pending recipients.
+
+    Optional Query Parameters:
         secret: A secret key to prevent unauthorized access (recommended for production)
+        campaign: Campaign id to use instead of the current week (e.g. to send a second edition)
 
     Returns:
-        JSON with count of emails sent and any errors
+        JSON with the campaign id and status; poll /api/newsletter/campaigns/<id> for progress
     """
     # Optional: Add a secret key check for security
     # secret = request.args.get('secret')
     # if secret != os.environ.get('CRON_SECRET'):
     #     return jsonify({"error": "Unauthorized"}), 401
 
-    # Get all subscribed users
-    subscribed_users = get_subscribed_users()
+    job = start_campaign(request.args.get('campaign'))
+    if not job:
+        return jsonify({"error": "Failed to start newsletter campaign"}), 500
 
-    if not subscribed_users:
-        return jsonify({
-            "message": "No subscribed users found",
-            "sent": 0,
-            "failed": 0
-        }), 200
+    return jsonify({"message": "Newsletter campaign started", **transform_campaign(job)}), 202
 
-    # Get random destinations for this week's newsletter
-    destinations = get_random_batch(limit=4)
 
-    if not destinations:
-        return jsonify({"error": "No destinations available to send"}), 404
+@newsletter_bp.route('/api/newsletter/campaigns/<campaign_id>', methods=['GET'])
+def campaign_progress(campaign_id):
+    """Get a newsletter campaign's status and per-recipient delivery counts."""
+    progress = get_campaign_progress(campaign_id)
+    if not progress:
+        return jsonify({"error": "Campaign not found"}), 404
+
+    return jsonify(transform_campaign(progress["job"], progress["counts"])), 200
+
+
+@newsletter_bp.route('/api/newsletter/subscription', methods=['POST'])
+def update_subscription():
+    """
+    Sync a user's newsletter subscription into the subscriber index.
+    Call this after changing subscribed_to_newsletter in the user's metadata.
+
+    Request Body:
+        userId: The user whose subscription changed
+    """
+    data = request.get_json()
+    if not data or not data.get('userId'):
+        return jsonify({"error": "userId is required"}), 400
+
+    try:
+        subscribed = sync_subscription(data['userId'])
+    except Exception as e:
+        logger.error("Error syncing subscription: %s", e, extra={"user_id": data["userId"]})
+        return jsonify({"error": "Failed to update subscription"}), 500
+
+    return jsonify({"subscribed": subscribed}), 200
+
+
+@newsletter_bp.route('/api/newsletter/subscribers/reconcile', methods=['POST'])
+def reconcile_subscribers():
+    """
+    Start a background job that repairs drift between auth metadata and the subscriber index.
+    Meant to be called by a daily cron job; repeated calls on the same day return the same job.
+    """
+    job = start_reconcile()
+    if not job:
+        return jsonify({"error": "Failed to start subscriber reconcile"}), 500
 
-    # Send newsletter to each subscribed user
-    sent_count = 0
-    failed_count = 0
-    errors = []
-
-    for user in subscribed_users:
-        try:
-            result = send_weekly_newsletter(
-                to_email=user['email'],
-                user_name=user['name'],
-                destinations=destinations
-            )
-
-            if result:
-                sent_count += 1
-            else:
-                failed_count += 1
-                errors.append(f"Failed to send to {user['email']}")
-
-        except Exception as e:
-            failed_count += 1
-            errors.append(f"Error sending to {user['email']}: {str(e)}")
-
-    return jsonify({
-        "message": f"Newsletter batch complete",
-        "sent": sent_count,
-        "failed": failed_count,
-        "errors": errors[:10] if errors else []  # Only return first 10 errors
-    }), 200
+    return jsonify({"message": "Subscriber reconcile started", "jobId": job.get("id"), "status": job.get("status")}), 202
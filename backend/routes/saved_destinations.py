@@ -1,39 +1,90 @@
 from flask import Blueprint, jsonify, request
 from services.saved_destinations_service import (
     get_saved_destinations,
+    get_saved_destination_ids,
+    count_saved_destinations,
     save_destination,
+    save_destinations,
     unsave_destination,
+    unsave_destinations,
+    SAVED_VIEW_COLUMNS,
 )
+from services.serializers import SAVED_DESTINATION
+from services.cursors import encode_cursor, decode_cursor
 
 saved_destinations_bp = Blueprint('saved_destinations', __name__)
 
+# Upper bound on the number of destination ids in one lookup or bulk request
+MAX_BULK_IDS = 100
+# Upper bound on the page size a client may request from the saved list
+MAX_SAVED_PAGE_SIZE = 100
 
-def transform_destination(row: dict) -> dict:
-    """Transform a saved_destinations join row to a camelCase destination for the frontend."""
-    dest = row.get("destinations", {})
-    return {
-        "id": str(dest.get("id")),
-        "name": dest.get("name"),
-        "location": dest.get("location"),
-        "description": dest.get("description"),
-        "tags": dest.get("tags", []),
-        "imagePrompt": dest.get("image_prompt", ""),
-        "imageUrl": dest.get("image_url"),
-        "isPersonalized": dest.get("is_personalized", False),
-        "country": dest.get("country", ""),
-        "region": dest.get("region", ""),
-    }
+
+def parse_bulk_request():
+    """
+    Read userId and destinationIds from a bulk request body.
+
+    Returns:
+        (user_id, destination_ids, None) or (None, None, error response)
+    """
+    data = request.get_json()
+    if not data or not data.get('userId') or not isinstance(data.get('destinationIds'), list):
+        return None, None, (jsonify({"error": "userId and destinationIds are required"}), 400)
+
+    destination_ids = [d for d in data['destinationIds'] if d not in (None, '')]
+    if not destination_ids:
+        return None, None, (jsonify({"error": "destinationIds must not be empty"}), 400)
+    if len(destination_ids) > MAX_BULK_IDS:
+        return None, None, (jsonify({"error": f"At most {MAX_BULK_IDS} destinationIds per request"}), 400)
+
+    return data['userId'], destination_ids, None
 
 
 @saved_destinations_bp.route('/api/saved-destinations', methods=['GET'])
 def list_saved():
-    """Get all saved destinations for a user."""
+    """
+    Get saved destinations for a user, newest first.
+
+    Query Parameters:
+        userId: The user whose saves to fetch (required)
+        view: "detail" (default) or "grid" (no description or image prompt)
+        before: Cursor from a previous page's X-Next-Cursor header
+        limit: Page size (max 100). Without it, all saves are returned
+        count: Set to "only" to return just {"count": n}
+    """
     user_id = request.args.get('userId')
     if not user_id:
         return jsonify({"error": "userId is required"}), 400
 
-    rows = get_saved_destinations(user_id)
-    return jsonify([transform_destination(r) for r in rows]), 200
+    if request.args.get('count') == 'only':
+        count = count_saved_destinations(user_id)
+        if count is None:
+            return jsonify({"error": "Failed to count saved destinations"}), 500
+        return jsonify({"count": count}), 200
+
+    view = request.args.get('view', 'detail')
+    if view not in SAVED_VIEW_COLUMNS:
+        return jsonify({"error": f"view must be one of: {', '.join(SAVED_VIEW_COLUMNS)}"}), 400
+
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit <= 0:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    if limit is not None:
+        limit = min(limit, MAX_SAVED_PAGE_SIZE)
+
+    before = None
+    if request.args.get('before'):
+        try:
+            before = decode_cursor(request.args['before'])
+        except ValueError:
+            return jsonify({"error": "before must be a cursor from X-Next-Cursor"}), 400
+
+    rows = get_saved_destinations(user_id, view=view, before=before, limit=limit)
+
+    response = jsonify(SAVED_DESTINATION.many(rows))
+    if limit and len(rows) == limit:
+        response.headers['X-Next-Cursor'] = encode_cursor(rows[-1].get("created_at", ""), rows[-1].get("destination_id"))
+    return response, 200
 
 
 @saved_destinations_bp.route('/api/saved-destinations', methods=['POST'])
@@ -62,3 +113,54 @@ def unsave():
         return jsonify({"message": "Destination unsaved"}), 200
     else:
         return jsonify({"error": "Failed to unsave destination"}), 500
+
+
+@saved_destinations_bp.route('/api/saved-destinations/status', methods=['GET'])
+def saved_status():
+    """
+    Check which of the given destinations a user has saved.
+
+    Query Parameters:
+        userId: The user to check
+        ids: Comma-separated destination ids (max 100)
+
+    Returns:
+        JSON with 'ids' (as requested) and 'saved' (a boolean per id, in the same order)
+    """
+    user_id = request.args.get('userId')
+    ids = [i.strip() for i in request.args.get('ids', '').split(',') if i.strip()]
+    if not user_id or not ids:
+        return jsonify({"error": "userId and ids are required"}), 400
+    if len(ids) > MAX_BULK_IDS:
+        return jsonify({"error": f"At most {MAX_BULK_IDS} ids per request"}), 400
+
+    saved_ids = get_saved_destination_ids(user_id)
+    return jsonify({"ids": ids, "saved": [i in saved_ids for i in ids]}), 200
+
+
+@saved_destinations_bp.route('/api/saved-destinations/bulk', methods=['POST'])
+def save_bulk():
+    """Save many destinations for a user in one request."""
+    user_id, destination_ids, error = parse_bulk_request()
+    if error:
+        return error
+
+    count, error = save_destinations(user_id, destination_ids)
+    if count is not None:
+        return jsonify({"message": "Destinations saved", "saved": count}), 201
+    else:
+        return jsonify({"error": f"Failed to save destinations: {error}"}), 500
+
+
+@saved_destinations_bp.route('/api/saved-destinations/bulk', methods=['DELETE'])
+def unsave_bulk():
+    """Unsave many destinations for a user in one request."""
+    user_id, destination_ids, error = parse_bulk_request()
+    if error:
+        return error
+
+    success = unsave_destinations(user_id, destination_ids)
+    if success:
+        return jsonify({"message": "Destinations unsaved"}), 200
+    else:
+        return jsonify({"error": "Failed to unsave destinations"}), 500
@@ -1,28 +1,64 @@
 from flask import Blueprint, jsonify, request
-from services.trips_service import save_trip, get_user_trips, update_trip, delete_trip
+from services.json_patch import JsonPatchError
+from services.serializers import TRIP
+from services.cursors import encode_cursor, decode_cursor
+from services.trips_service import (
+    save_trip,
+    get_user_trips,
+    get_trip,
+    update_trip,
+    patch_trip,
+    delete_trip,
+    TRIP_NOT_FOUND,
+    TRIP_CONFLICT,
+)
 
 trips_bp = Blueprint('trips', __name__)
 
+# Upper bound on the page size a client may request from the trips list
+MAX_TRIPS_PAGE_SIZE = 100
 
-def transform_trip(trip: dict) -> dict:
-    """Transform snake_case DB row to camelCase for frontend."""
-    return {
-        "id": trip.get("id"),
-        "userId": trip.get("user_id"),
-        "tripName": trip.get("trip_name", ""),
-        "destination": trip.get("destination", ""),
-        "startDate": trip.get("start_date", ""),
-        "endDate": trip.get("end_date", ""),
-        "currency": trip.get("currency", "USD"),
-        "budgetRange": trip.get("budget_range", ""),
-        "budgetAmount": trip.get("budget_amount", 0),
-        "companions": trip.get("companions", "solo"),
-        "numberOfPeople": trip.get("number_of_people"),
-        "specificDestinations": trip.get("specific_destinations", []),
-        "itinerary": trip.get("itinerary", []),
-        "countries": trip.get("countries", []),
-        "createdAt": trip.get("created_at", ""),
-    }
+
+def trip_etag(trip: dict) -> str:
+    """The ETag for a trip is its version counter."""
+    return f'"{trip.get("version") or 1}"'
+
+
+def parse_if_match():
+    """
+    Read the expected trip version from the If-Match header.
+
+    Returns:
+        (version, None) - version is None when the header is absent or "*"
+        (None, error) when the header is not a trip ETag
+    """
+    header = request.headers.get('If-Match')
+    if not header or header.strip() == '*':
+        return (None, None)
+
+    value = header.strip()
+    if value.startswith('W/'):
+        value = value[2:]
+    value = value.strip('"')
+    if not value.isdigit():
+        return (None, "If-Match must be a trip ETag")
+    return (int(value), None)
+
+
+def trip_response(trip: dict, status: int):
+    """JSON response for a single trip, tagged with its ETag."""
+    response = jsonify(TRIP(trip))
+    response.headers['ETag'] = trip_etag(trip)
+    return response, status
+
+
+def trip_write_error(error: str):
+    """Map an update_trip/patch_trip error code to a response."""
+    if error == TRIP_NOT_FOUND:
+        return jsonify({"error": "Trip not found"}), 404
+    if error == TRIP_CONFLICT:
+        return jsonify({"error": "Trip was modified by another request. Reload and try again."}), 409
+    return jsonify({"error": "Failed to update trip"}), 500
 
 
 @trips_bp.route('/api/trips', methods=['POST'])
@@ -34,34 +70,138 @@ def create_trip():
 
     result = save_trip(data)
     if result:
-        return jsonify(transform_trip(result)), 201
+        return trip_response(result, 201)
     else:
         return jsonify({"error": "Failed to save trip"}), 500
 
 
 @trips_bp.route('/api/trips', methods=['GET'])
 def list_trips():
-    """Get all trips for a user."""
+    """
+    Get trips for a user, newest first.
+
+    Query Parameters:
+        userId: Owner of the trips (required)
+        countries: Comma-separated list of countries; trips visiting any of them match
+        from: Only trips starting on or after this date (YYYY-MM-DD)
+        to: Only trips ending on or before this date (YYYY-MM-DD)
+        before: Cursor from a previous page's X-Next-Cursor header
+        limit: Page size (max 100). Without it, all matching trips are returned
+        view: "summary" (default, no itinerary) or "full"
+
+    Returns:
+        JSON array of trips. When a full page is returned, the X-Next-Cursor
+        header holds the cursor for the next page.
+    """
     user_id = request.args.get('userId')
     if not user_id:
         return jsonify({"error": "userId is required"}), 400
 
-    trips = get_user_trips(user_id)
-    return jsonify([transform_trip(t) for t in trips]), 200
+    countries_param = request.args.get('countries', '')
+    countries = [c.strip() for c in countries_param.split(',') if c.strip()]
+
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit <= 0:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    if limit is not None:
+        limit = min(limit, MAX_TRIPS_PAGE_SIZE)
+
+    view = request.args.get('view', 'summary')
+    if view not in ('summary', 'full'):
+        return jsonify({"error": "view must be 'summary' or 'full'"}), 400
+
+    before = None
+    if request.args.get('before'):
+        try:
+            before = decode_cursor(request.args['before'])
+        except ValueError:
+            return jsonify({"error": "before must be a cursor from X-Next-Cursor"}), 400
+
+    trips = get_user_trips(
+        user_id,
+        countries=countries,
+        start_from=request.args.get('from'),
+        end_to=request.args.get('to'),
+        before=before,
+        limit=limit,
+        full=(view == 'full'),
+    )
+
+    response = jsonify(TRIP.many(trips))
+    if limit and len(trips) == limit:
+        response.headers['X-Next-Cursor'] = encode_cursor(trips[-1].get("created_at", ""), trips[-1].get("id"))
+    return response, 200
+
+
+@trips_bp.route('/api/trips/<trip_id>', methods=['GET'])
+def get_single_trip(trip_id):
+    """Get a single trip including its full itinerary."""
+    trip = get_trip(trip_id)
+    if trip:
+        return trip_response(trip, 200)
+    else:
+        return jsonify({"error": "Trip not found"}), 404
 
 
 @trips_bp.route('/api/trips/<trip_id>', methods=['PUT'])
 def edit_trip(trip_id):
-    """Update an existing trip."""
+    """
+    Update an existing trip.
+
+    Send the trip's ETag in If-Match to reject the write with 409 if the
+    trip changed since it was loaded.
+    """
     data = request.get_json()
     if not data:
         return jsonify({"error": "No data provided"}), 400
 
-    result = update_trip(trip_id, data)
+    expected_version, error = parse_if_match()
+    if error:
+        return jsonify({"error": error}), 400
+
+    result, error = update_trip(trip_id, data, expected_version=expected_version)
+    if result:
+        return trip_response(result, 200)
+    else:
+        return trip_write_error(error)
+
+
+@trips_bp.route('/api/trips/<trip_id>', methods=['PATCH'])
+def patch_existing_trip(trip_id):
+    """
+    Apply a partial update to a trip.
+
+    Request Body:
+        application/json-patch+json: RFC 6902 operations against the camelCase trip,
+            e.g. [{"op": "replace", "path": "/itinerary/0/activities/1/title", "value": "Lunch"}]
+        application/merge-patch+json: RFC 7396 merge patch, e.g. {"tripName": "Japan 2026"}
+
+    Headers:
+        If-Match: The trip's ETag. Returns 409 if the trip has changed since.
+    """
+    merge = request.mimetype == 'application/merge-patch+json'
+    if not merge and request.mimetype != 'application/json-patch+json':
+        return jsonify({
+            "error": "Content-Type must be application/json-patch+json or application/merge-patch+json"
+        }), 415
+
+    patch = request.get_json(force=True, silent=True)
+    if patch is None:
+        return jsonify({"error": "No patch provided"}), 400
+
+    expected_version, error = parse_if_match()
+    if error:
+        return jsonify({"error": error}), 400
+
+    try:
+        result, error = patch_trip(trip_id, patch, merge=merge, expected_version=expected_version)
+    except JsonPatchError as e:
+        return jsonify({"error": f"Invalid patch: {e}"}), 422
+
     if result:
-        return jsonify(transform_trip(result)), 200
+        return trip_response(result, 200)
     else:
-        return jsonify({"error": "Failed to update trip"}), 500
+        return trip_write_error(error)
 
 
 @trips_bp.route('/api/trips/<trip_id>', methods=['DELETE'])
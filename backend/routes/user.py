@@ -1,14 +1,41 @@
 from flask import Blueprint, jsonify
-from services.user_service import delete_user
+from services.user_service import delete_user, get_user_deletion
 
 user_bp = Blueprint('user', __name__)
 
 
+def transform_deletion(job: dict) -> dict:
+    """Transform a deletion job row to a camelCase status for the frontend."""
+    return {
+        "jobId": job.get("id"),
+        "status": job.get("status"),
+        "completedSteps": (job.get("progress") or {}).get("completed_steps", []),
+        "attempts": job.get("attempts", 0),
+        "lastError": job.get("last_error"),
+    }
+
+
 @user_bp.route('/api/user/<user_id>', methods=['DELETE'])
 def remove_user(user_id):
-    """Delete a user account and all associated data."""
-    success = delete_user(user_id)
-    if success:
-        return jsonify({"message": "Account deleted"}), 200
+    """
+    Delete a user account and all associated data.
+
+    Deletion runs as a background job; poll GET /api/user/<user_id>/deletion
+    for progress. Repeating the request returns the existing job, or restarts
+    it if it ran out of attempts.
+    """
+    job = delete_user(user_id)
+    if job:
+        return jsonify({"message": "Account deletion started", **transform_deletion(job)}), 202
     else:
         return jsonify({"error": "Failed to delete account"}), 500
+
+
+@user_bp.route('/api/user/<user_id>/deletion', methods=['GET'])
+def user_deletion_status(user_id):
+    """Get the progress of a user's account deletion."""
+    job = get_user_deletion(user_id)
+    if job:
+        return jsonify(transform_deletion(job)), 200
+    else:
+        return jsonify({"error": "No deletion in progress for this user"}), 404
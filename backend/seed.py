@@ -3,18 +3,25 @@ import random
 import os
 import json
 import uuid
+import logging
 from difflib import SequenceMatcher
 from pathlib import Path
-from google import genai
 from google.genai import types
 from dotenv import load_dotenv
-from services.database import init_db, add_destination, get_all_destination_names
-from supabase import create_client
 
+# Load .env before the services read their settings from the environment at import
 load_dotenv()
 
-# --- CONFIGURATION ---
-client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+from services.structured_logging import setup_logging
+
+setup_logging()
+logger = logging.getLogger("seed")
+
+from supabase import create_client
+from services.clients import genai_client as client
+from services.database import init_db, add_destination, get_all_destination_names
+
+# Image uploads use the seeder's own SUPABASE_KEY, not the shared service-role client
 supabase = create_client(os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY"))
 
 init_db()
@@ -61,7 +68,7 @@ def upload_image(image_bytes, destination_name):
         )
         return supabase.storage.from_(bucket_name).get_public_url(filename)
     except Exception as e:
-        print(f"   ⚠️ Upload Failed: {e}")
+        logger.error("Image upload failed: %s", e, extra={"destination": destination_name})
         return None
 
 def generate_single_destination(existing_entries: list[dict]) -> dict | None:
@@ -77,7 +84,7 @@ def generate_single_destination(existing_entries: list[dict]) -> dict | None:
     c_theme = random.choice(REGION_THEMES[c_region])
     c_style = random.choice(TRAVEL_STYLES)
 
-    print(f"🎲 Rolling: {c_theme} in {c_region} ({c_style})...")
+    logger.info("Generating destination", extra={"theme": c_theme, "region": c_region, "style": c_style})
 
     destination_data = None
     max_dedup_attempts = 3  # How many times to retry if we get a duplicate
@@ -138,17 +145,22 @@ def generate_single_destination(existing_entries: list[dict]) -> dict | None:
                 destination_data = json.loads(response.text)
                 break
             except Exception as e:
-                print(f"   ⚠️ Text Error: {e}. Retrying...")
+                logger.warning("Text generation failed, retrying: %s", e, extra={"theme": c_theme, "region": c_region})
                 time.sleep(2)
 
         if not destination_data:
-            print("   ❌ Text failed. Skipping.")
+            logger.error("Text generation failed, skipping", extra={"theme": c_theme, "region": c_region})
             return None
 
         # 3. Fuzzy duplicate check (against ALL existing names, not just same country)
         matched = is_duplicate(destination_data['name'], existing_entries)
         if matched:
-            print(f"   🔁 Duplicate detected: '{destination_data['name']}' ≈ '{matched}'. Retrying ({dedup_attempt + 1}/{max_dedup_attempts})...")
+            logger.info("Duplicate destination, retrying", extra={
+                "destination": destination_data['name'],
+                "matched": matched,
+                "attempt": dedup_attempt + 1,
+                "max_attempts": max_dedup_attempts,
+            })
             # Track this name + its country so next retry can build a targeted avoid list
             avoid_names.append({'name': destination_data['name'], '_country': destination_data.get('country', '')})
             destination_data = None
@@ -158,7 +170,7 @@ def generate_single_destination(existing_entries: list[dict]) -> dict | None:
             break
 
     if not destination_data:
-        print("   ❌ Could not generate a unique destination after retries. Skipping.")
+        logger.warning("No unique destination after retries, skipping", extra={"theme": c_theme, "region": c_region})
         return None
 
     # 4. Image Generation
@@ -168,7 +180,7 @@ def generate_single_destination(existing_entries: list[dict]) -> dict | None:
     my_prompt = f"A stunning editorial travel photograph of {destination_data['name']}, {destination_data['location']}. {destination_data['imagePrompt']}. Shot on Fujifilm GFX 100S, medium format, 45mm lens, {lighting}, {vibe}, high resolution, sharp focus, professional color grading, Condé Nast Traveler style. The scene is COMPLETELY DEVOID of people. Any wildlife present must be in the far distance, no close-ups. Avoid large group of wildlife if any, keep it to few animals max."
 
     try:
-        print(f"   🎨 Painting {destination_data['name']}...")
+        logger.info("Generating image", extra={"destination": destination_data['name']})
         time.sleep(15) # Safety pause for Image API
 
         img_response = client.models.generate_images(
@@ -179,21 +191,21 @@ def generate_single_destination(existing_entries: list[dict]) -> dict | None:
 
         if img_response.generated_images:
             img_bytes = img_response.generated_images[0].image.image_bytes
-            print("   ☁️ Uploading...")
+            logger.info("Uploading image", extra={"destination": destination_data['name']})
             public_url = upload_image(img_bytes, destination_data['name'])
 
             if public_url:
                 destination_data['imageUrl'] = public_url
                 add_destination(destination_data)
-                print(f"   ✅ SUCCESS: {destination_data['name']}")
+                logger.info("Destination added", extra={"destination": destination_data['name']})
                 return {"name": destination_data['name'], "country": destination_data.get('country', '')}
         else:
-            print("   ❌ No image.")
+            logger.error("No image generated", extra={"destination": destination_data['name']})
 
     except Exception as e:
-        print(f"   ⚠️ Image Error: {e}")
+        logger.error("Image generation failed: %s", e, extra={"destination": destination_data['name']})
         if "429" in str(e):
-            print("   ⏳ Rate Limit. Sleeping 30s...")
+            logger.warning("Rate limited, sleeping", extra={"sleep_seconds": 30})
             time.sleep(30)
 
     return None
@@ -201,8 +213,8 @@ def generate_single_destination(existing_entries: list[dict]) -> dict | None:
 def generate_batch():
     # Fetch all existing destination names + countries once at the start
     existing_entries = get_all_destination_names()
-    print(f"📋 Loaded {len(existing_entries)} existing destinations for dedup check.")
-    print("🚀 Starting Batch (Generating 10 distinct items)...\n")
+    logger.info("Loaded existing destinations for dedup check", extra={"destinations": len(existing_entries)})
+    logger.info("Starting batch", extra={"items": 10})
 
     for _ in range(10):
         new_entry = generate_single_destination(existing_entries)
@@ -213,4 +225,4 @@ def generate_batch():
 
 if __name__ == "__main__":
     generate_batch()
-    print("\n🎉 Done.")
+    logger.info("Batch done")
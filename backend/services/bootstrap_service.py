@@ -0,0 +1,56 @@
+"""
+Everything the frontend needs for its first paint, loaded in one request.
+
+The hero feed, the user's saved destinations and their trip summaries
+come from independent Supabase queries, so they run concurrently on a
+shared thread pool: the request takes as long as the slowest of them
+rather than their sum.
+"""
+import os
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from services.database import get_random_batch, get_destinations_by_tags
+from services.saved_destinations_service import get_saved_destinations
+from services.trips_service import get_user_trips
+
+# Threads per worker process shared by all bootstrap requests (each uses up to 3)
+BOOTSTRAP_WORKERS = int(os.environ.get("BOOTSTRAP_WORKERS", "12"))
+FEED_SIZE = 4
+
+BOOTSTRAP_PARTS = ("destinations", "saved", "trips")
+
+_executor = ThreadPoolExecutor(max_workers=BOOTSTRAP_WORKERS, thread_name_prefix="bootstrap")
+
+
+def _submit(fn, *args, **kwargs):
+    # Run in a copy of the request's context so log records keep its request id
+    return _executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def load_bootstrap(user_id: str = None, tags: list = None, parts: tuple = BOOTSTRAP_PARTS) -> dict:
+    """
+    Load the hero feed, saved destinations and trip summaries concurrently.
+
+    Each loader handles its own errors and returns [] on failure, so one
+    slow or failing query never fails the others.
+
+    Args:
+        user_id: The signed-in user; without it only the feed is loaded
+        tags: Build a personalized feed from these tags instead of a random one
+        parts: Which of BOOTSTRAP_PARTS to load
+
+    Returns:
+        Dict of raw DB rows keyed by part
+    """
+    futures = {}
+    if "destinations" in parts:
+        if tags:
+            futures["destinations"] = _submit(get_destinations_by_tags, tags, limit=FEED_SIZE)
+        else:
+            futures["destinations"] = _submit(get_random_batch, limit=FEED_SIZE)
+    if user_id and "saved" in parts:
+        futures["saved"] = _submit(get_saved_destinations, user_id)
+    if user_id and "trips" in parts:
+        futures["trips"] = _submit(get_user_trips, user_id)
+
+    return {part: future.result() for part, future in futures.items()}
@@ -0,0 +1,196 @@
+import logging
+import os
+import json
+import mmap
+import time
+import struct
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from services.metrics import CACHE_REQUESTS, CACHE_ENTRIES, CACHE_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Default limits for each per-user cache; override through the environment
+USER_CACHE_MAX_BYTES = int(os.environ.get("USER_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+USER_CACHE_MAX_ENTRIES = int(os.environ.get("USER_CACHE_MAX_ENTRIES", "5000"))
+# Safety net for rows changed outside our own service functions (e.g. the Supabase dashboard)
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", "300"))
+
+GENERATION_SLOTS = 65536
+_SLOT = struct.Struct("<Q")
+
+
+def _default_generations_path() -> str:
+    # /dev/shm keeps the file in memory on Linux; fall back to the temp dir elsewhere
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "voyager-cache-generations")
+
+
+class SharedGenerations:
+    """
+    Per-user generation stamps shared by every worker on this host.
+
+    A fixed-size memory-mapped file holds GENERATION_SLOTS 64-bit stamps.
+    Each (namespace, user) pair hashes to a slot; a writer sets the slot to
+    a fresh value after changing the user's data, and readers compare the
+    stamp they cached with against the current one. Hash collisions only
+    cause extra cache misses, never stale reads.
+    """
+
+    def __init__(self, path: str = None, slots: int = GENERATION_SLOTS):
+        self.slots = slots
+        self.path = path or os.environ.get("CACHE_GENERATIONS_PATH") or _default_generations_path()
+        size = slots * _SLOT.size
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+    def _offset(self, namespace: str, user_id: str) -> int:
+        digest = hashlib.blake2b(f"{namespace}:{user_id}".encode(), digest_size=8).digest()
+        return (int.from_bytes(digest, "little") % self.slots) * _SLOT.size
+
+    def get(self, namespace: str, user_id: str) -> int:
+        return _SLOT.unpack_from(self._map, self._offset(namespace, user_id))[0]
+
+    def bump(self, namespace: str, user_id: str):
+        # A unique stamp rather than an increment, so racing writers can't
+        # both write the same value and hide one of the changes
+        stamp = (time.time_ns() ^ (os.getpid() << 40)) & 0xFFFFFFFFFFFFFFFF
+        _SLOT.pack_into(self._map, self._offset(namespace, user_id), stamp)
+
+
+_generations = None
+_generations_lock = threading.Lock()
+
+
+def _shared_generations():
+    global _generations
+    if _generations is None:
+        with _generations_lock:
+            if _generations is None:
+                try:
+                    _generations = SharedGenerations()
+                except OSError as e:
+                    logger.warning("Shared cache generations unavailable, caching per worker only: %s", e)
+                    _generations = False
+    return _generations or None
+
+
+def _estimate_size(value) -> int:
+    """Approximate memory footprint of a cached JSON-like value."""
+    return len(json.dumps(value, default=str))
+
+
+class UserCache:
+    """
+    Bounded LRU cache of per-user query results.
+
+    Entries are keyed by (user_id, variant), where the variant captures the
+    query parameters. The cache is capped by entry count and by approximate
+    size in bytes. Writers call invalidate(user_id) after changing a user's
+    data; the invalidation is visible to other gunicorn workers through
+    SharedGenerations.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_bytes: int = USER_CACHE_MAX_BYTES,
+        max_entries: int = USER_CACHE_MAX_ENTRIES,
+        ttl: float = USER_CACHE_TTL_SECONDS,
+    ):
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _generation(self, user_id: str) -> int:
+        generations = _shared_generations()
+        return generations.get(self.namespace, user_id) if generations else 0
+
+    def get_or_load(self, user_id: str, variant, loader):
+        """
+        Return the cached value for (user_id, variant), calling loader() on a miss.
+
+        The generation is read before loading, so a write that lands while
+        the loader runs leaves the new entry already stale.
+        """
+        key = (user_id, variant)
+        generation = self._generation(user_id)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, entry_generation, stored_at, size = entry
+                if entry_generation == generation and now - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    CACHE_REQUESTS.labels(self.namespace, "hit").inc()
+                    return value
+                self._remove(key)
+            self.misses += 1
+        CACHE_REQUESTS.labels(self.namespace, "miss").inc()
+
+        value = loader()
+        self._put(key, value, generation, now)
+        return value
+
+    def _put(self, key, value, generation: int, stored_at: float):
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, generation, stored_at, size)
+            self.size_bytes += size
+            while self._entries and (
+                self.size_bytes > self.max_bytes or len(self._entries) > self.max_entries
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+            self._publish_size()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry[3]
+
+    def invalidate(self, user_id: str):
+        """Drop every cached variant for a user, in this worker and all others."""
+        if not user_id:
+            return
+        generations = _shared_generations()
+        if generations:
+            generations.bump(self.namespace, user_id)
+
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                self._remove(key)
+            self._publish_size()
+
+    def _publish_size(self):
+        CACHE_ENTRIES.labels(self.namespace).set(len(self._entries))
+        CACHE_BYTES.labels(self.namespace).set(self.size_bytes)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
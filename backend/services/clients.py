@@ -0,0 +1,105 @@
+"""
+Shared API clients, created on first use.
+
+Importing this module is cheap: the supabase, google-genai and resend
+packages are only imported when a client is first used, so a cold start
+doesn't pay for SDKs the first requests never touch. Each client is built
+once per process and shared by every service, and all of them send their
+requests over the worker's pooled transport (see services/http_transport).
+
+    from services.clients import supabase
+    supabase.table("trips").select("*").execute()   # builds the client here
+"""
+import os
+import time
+import threading
+from services.startup import record_client_init
+
+GEMINI_TIMEOUT_SECONDS = float(os.environ.get("GEMINI_TIMEOUT_SECONDS", "110"))
+
+CLIENT_FACTORIES = {}
+
+_clients = {}
+# Reentrant: a factory may itself get another client
+_clients_lock = threading.RLock()
+
+
+def client_factory(name: str):
+    """Register the function that builds the named client."""
+    def register(factory):
+        CLIENT_FACTORIES[name] = factory
+        return factory
+    return register
+
+
+def get_client(name: str):
+    """Return the named client, building it on first use (thread-safe)."""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                started = time.perf_counter()
+                client = CLIENT_FACTORIES[name]()
+                record_client_init(name, time.perf_counter() - started)
+                _clients[name] = client
+    return client
+
+
+class LazyClient:
+    """Module-level stand-in for a client; the real one is built on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(get_client(self._name), attr)
+
+    def __repr__(self):
+        state = "ready" if self._name in _clients else "not created"
+        return f"<LazyClient {self._name} ({state})>"
+
+
+@client_factory("supabase")
+def _create_supabase():
+    from supabase import create_client, ClientOptions
+    from services.http_transport import new_http_client
+
+    # Service role key bypasses RLS
+    url = os.environ.get("SUPABASE_URL")
+    service_role_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+    if not url or not service_role_key:
+        raise ValueError("❌ Supabase credentials missing. Check your .env file.")
+    # PostgREST, auth and storage all share this httpx client
+    options = ClientOptions(httpx_client=new_http_client(follow_redirects=True))
+    return create_client(url, service_role_key, options=options)
+
+
+@client_factory("genai")
+def _create_genai():
+    from google import genai
+    from google.genai import types
+    from services.http_transport import get_transport
+
+    http_options = types.HttpOptions(
+        # Itinerary generation can take well over the default read timeout
+        timeout=int(GEMINI_TIMEOUT_SECONDS * 1000),
+        client_args={"transport": get_transport()},
+    )
+    return genai.Client(api_key=os.environ.get("GEMINI_API_KEY"), http_options=http_options)
+
+
+@client_factory("resend")
+def _create_resend():
+    # The resend SDK is configured module-wide rather than through a client object
+    import resend
+    from services.http_transport import new_http_client, ResendHttpClient
+
+    resend.api_key = os.environ.get("RESEND_API_KEY")
+    resend.default_http_client = ResendHttpClient(new_http_client())
+    return resend
+
+
+supabase = LazyClient("supabase")
+genai_client = LazyClient("genai")
+resend_client = LazyClient("resend")
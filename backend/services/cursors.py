@@ -0,0 +1,46 @@
+"""
+Opaque keyset cursors for newest-first lists.
+
+A cursor is the (created_at, id) pair of the last row on a page: rows
+sharing a created_at are ordered by id, so none are skipped at a page
+boundary. It travels URL-safe base64 encoded, since timestamps contain
+'+' (which decodes to a space in a query string).
+"""
+import json
+import base64
+
+
+def encode_cursor(created_at: str, key) -> str:
+    """Cursor for the page after a row with this created_at and id."""
+    raw = json.dumps([created_at, key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Decode a cursor from encode_cursor.
+
+    Returns:
+        (created_at, id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, key = json.loads(raw)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(created_at, str) or not isinstance(key, (str, int)) or isinstance(key, bool):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    # Both end up quoted inside a PostgREST filter
+    if any(c in f"{created_at}{key}" for c in '"\\'):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return created_at, key
+
+
+def before_filter(cursor: tuple, key_column: str = "id") -> str:
+    """PostgREST or() filter for the rows after a cursor in (created_at desc, key desc) order."""
+    created_at, key = cursor
+    # Values are quoted: timestamps contain ':' and '.', which delimit the filter syntax
+    return f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",{key_column}.lt."{key}")'
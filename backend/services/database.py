@@ -1,24 +1,21 @@
-import os
-from supabase import create_client, Client
-from dotenv import load_dotenv
+import logging
 import random
+import time
+import threading
+from services.clients import supabase
+from services.popularity import popularity
+from services.destination_store import get_destination_store, add_to_store, FACETS
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-# Initialize Supabase Client with service role key (bypasses RLS)
-url: str = os.environ.get("SUPABASE_URL")
-service_role_key: str = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
-
-if not url or not service_role_key:
-    raise ValueError("❌ Supabase credentials missing. Check your .env file.")
-
-supabase: Client = create_client(url, service_role_key)
-supabase_admin: Client = supabase
+# The shared Supabase client uses the service role key (bypasses RLS),
+# so it also serves the auth admin API
+supabase_admin = supabase
 
 def init_db():
     # With Supabase, we don't need to "create" the DB file locally.
-    # We can just print a success message to confirm the credentials work.
-    print("✅ Connected to Supabase Cloud Database.")
+    # We can just log a success message to confirm the credentials work.
+    logger.info("Connected to Supabase Cloud Database")
 
 def add_destination(dest):
     """
@@ -40,9 +37,11 @@ def add_destination(dest):
 
     try:
         response = supabase.table("destinations").insert(data).execute()
+        for row in response.data or []:
+            add_to_store(row)
         return response
     except Exception as e:
-        print(f"❌ Error saving to Supabase: {e}")
+        logger.error("Error saving destination to Supabase: %s", e)
         return None
 
 def get_all_destination_names():
@@ -55,28 +54,73 @@ def get_all_destination_names():
         response = supabase.table('destinations').select('name, country').execute()
         return response.data if response.data else []
     except Exception as e:
-        print(f"Error fetching destination names: {e}")
+        logger.error("Error fetching destination names: %s", e)
         return []
 
 def get_random_batch(limit=4):
     """
-    Fetches all destinations and returns 4 random ones.
+    Returns 4 random destinations from the in-memory destination store.
     """
     try:
-        # 1. Fetch data (assuming 'supabase' variable exists in this file)
-        response = supabase.table('destinations').select('*').execute()
-        all_data = response.data
-
-        # 2. Pick random items
-        if not all_data:
+        store = get_destination_store()
+        if not len(store):
             return []
 
-        count = min(limit, len(all_data))
-        return random.sample(all_data, count)
+        count = min(limit, len(store))
+        return store.rows(random.sample(range(len(store)), count))
 
     except Exception as e:
-        print(f"Error fetching random batch: {e}")
+        logger.error("Error fetching random batch: %s", e)
+        return []
+
+
+def get_destinations_by_ids(ids: list) -> list:
+    """Fetch destinations by primary key, in no particular order."""
+    if not ids:
         return []
+    try:
+        response = supabase.table('destinations').select('*').in_('id', ids).execute()
+        return response.data if response.data else []
+    except Exception as e:
+        logger.error("Error fetching destinations by id: %s", e)
+        return []
+
+
+# Destination rows for the trending list, refreshed at most this often
+TRENDING_ROWS_TTL_SECONDS = 60
+_trending_rows = {}
+_trending_rows_loaded_at = 0.0
+_trending_rows_lock = threading.Lock()
+
+
+def get_trending_destinations(limit=10):
+    """
+    Returns the most saved destinations, with time-decayed save counts.
+
+    The ranking comes from the in-memory popularity store; destination rows
+    are looked up by id and kept for TRENDING_ROWS_TTL_SECONDS.
+
+    Returns:
+        List of (destination row, score) pairs, most popular first
+    """
+    global _trending_rows, _trending_rows_loaded_at
+
+    ranking = popularity.top(limit)
+    ids = [destination_id for destination_id, _ in ranking]
+
+    with _trending_rows_lock:
+        expired = time.monotonic() - _trending_rows_loaded_at > TRENDING_ROWS_TTL_SECONDS
+        if expired or any(i not in _trending_rows for i in ids):
+            rows = get_destinations_by_ids(ids)
+            _trending_rows = {str(row['id']): row for row in rows}
+            _trending_rows_loaded_at = time.monotonic()
+        cached = _trending_rows
+
+    return [
+        (cached[destination_id], score)
+        for destination_id, score in ranking
+        if destination_id in cached
+    ]
 
 
 def get_destinations_by_tags(tags: list, limit=4):
@@ -91,93 +135,73 @@ def get_destinations_by_tags(tags: list, limit=4):
         List of destinations that match any of the provided tags, randomly sampled
     """
     try:
-        # Fetch all destinations from the database
-        response = supabase.table('destinations').select('*').execute()
-        all_data = response.data
+        # Tags match case-insensitively; the store ORs the bitmaps of the given tags
+        store = get_destination_store()
+        matching = store.positions(store.match({"tags": tags}))
 
-        if not all_data:
+        # If no matches found, return empty list
+        if not len(matching):
             return []
 
-        # Filter destinations that have at least one matching tag
-        # We normalize both the destination tags and search tags to lowercase for matching
-        normalized_search_tags = [tag.lower() for tag in tags]
+        # Return a random sample of the matching destinations
+        count = min(limit, len(matching))
+        return store.rows(random.sample(list(matching), count))
 
-        matching_destinations = []
-        for dest in all_data:
-            dest_tags = dest.get('tags', [])
-            # Normalize destination tags to lowercase
-            normalized_dest_tags = [t.lower() for t in dest_tags]
+    except Exception as e:
+        logger.error("Error fetching destinations by tags: %s", e)
+        return []
 
-            # Check if any of the destination's tags match any of the search tags
-            has_match = any(tag in normalized_search_tags for tag in normalized_dest_tags)
 
-            if has_match:
-                matching_destinations.append(dest)
+def suggest_destinations(query: str, limit: int = 8) -> list:
+    """
+    Typeahead over destination names, locations and descriptions.
 
-        # If no matches found, return empty list
-        if not matching_destinations:
-            return []
+    Every word of the query must match (the last one as a prefix, a
+    misspelled one by its closest terms), ranked with BM25.
 
-        # Return a random sample of the matching destinations
-        count = min(limit, len(matching_destinations))
-        return random.sample(matching_destinations, count)
+    Args:
+        query: What the user has typed so far
+        limit: Maximum number of suggestions
 
+    Returns:
+        List of destination rows, best match first
+    """
+    try:
+        store = get_destination_store()
+        hits = store.text.search(query, limit=limit)
+        return store.rows(doc_id for doc_id, _ in hits)
     except Exception as e:
-        print(f"Error fetching destinations by tags: {e}")
+        logger.error("Error suggesting destinations: %s", e)
         return []
 
 
-def get_subscribed_users():
+def search_destinations(filters: dict, match_all: tuple = (), limit: int = 20, offset: int = 0,
+                        facet_limit: int = None) -> dict:
     """
-    Fetches all users who have subscribed to the newsletter.
-    Requires the SUPABASE_SERVICE_ROLE_KEY to be set.
+    Filter destinations by facet values and count the facet values of the matches.
+
+    Args:
+        filters: facet ("tags", "country", "region") -> values; a destination
+            matches a facet if it has any of the values, and must match every facet
+        match_all: Facets where a destination must have all of the values instead
+        limit: Maximum number of destinations to return
+        offset: Number of matching destinations to skip
+        facet_limit: Maximum number of values to count per facet (most common first)
 
     Returns:
-        List of user dictionaries with email, name, and metadata
+        {"total": number of matches, "rows": the page of destination rows,
+        "facets": {facet: [(value, count), ...]}}, or None on error
     """
-    if not supabase_admin:
-        print("❌ Service role key not configured. Cannot fetch users.")
-        return []
-
     try:
-        # Use the Supabase Auth Admin API to list all users
-        # We need to paginate through all users
-        subscribed_users = []
-        page = 1
-        per_page = 100
-
-        while True:
-            # Fetch users page by page
-            response = supabase_admin.auth.admin.list_users(
-                page=page,
-                per_page=per_page
-            )
-
-            users = response
-
-            if not users:
-                break
-
-            # Filter for subscribed users
-            for user in users:
-                user_metadata = user.user_metadata or {}
-                if user_metadata.get('subscribed_to_newsletter'):
-                    subscribed_users.append({
-                        'id': user.id,
-                        'email': user.email,
-                        'name': user_metadata.get('full_name', 'Traveler'),
-                        'subscribed_at': user_metadata.get('subscribed_at')
-                    })
-
-            # If we got fewer users than per_page, we've reached the end
-            if len(users) < per_page:
-                break
-
-            page += 1
-
-        print(f"✅ Found {len(subscribed_users)} subscribed users")
-        return subscribed_users
-
+        store = get_destination_store()
+        positions = store.positions(store.match(filters, match_all))
+        # Without filters the counts are the store's precomputed totals
+        counted = positions if any(filters.values()) else None
+        return {
+            "total": len(positions),
+            "rows": store.rows(positions[offset:offset + limit]),
+            "facets": {facet: store.facet_counts(counted, facet, facet_limit) for facet in FACETS},
+        }
     except Exception as e:
-        print(f"❌ Error fetching subscribed users: {e}")
-        return []
+        logger.error("Error searching destinations: %s", e)
+        return None
@@ -0,0 +1,355 @@
+"""
+In-memory columnar copy of the destinations table with bitmap facets.
+
+Each worker keeps the catalog as parallel columns (one list per text
+column, CSR arrays of string ids for tags, country and region) instead
+of one dict per row. Repeated strings such as tags and countries are
+stored once. For every facet value there is a bitmap (a Python int, bit i set when
+row i has the value), so filters are ANDs and ORs of bitmaps. Facet
+counts are a bincount over the matching rows' value ids.
+
+The store is loaded on first use and updated incrementally:
+add_destination() adds new rows directly, and every
+DESTINATION_STORE_TTL_SECONDS a background check appends the rows with
+ids above the largest one loaded (those inserted by other workers). Only
+every DESTINATION_STORE_REBUILD_SECONDS is the whole store reloaded, to
+pick up edited and deleted rows. The store also holds the full-text index used
+for typeahead (services/text_index.py), kept in step with the rows.
+"""
+import logging
+import os
+import sys
+import time
+import threading
+from array import array
+import numpy as np
+from services.clients import supabase
+from services.text_index import TextIndex
+
+logger = logging.getLogger(__name__)
+
+# How often to fetch rows added since the last check, and to reload everything
+DESTINATION_STORE_TTL_SECONDS = float(os.environ.get("DESTINATION_STORE_TTL_SECONDS", "300"))
+DESTINATION_STORE_REBUILD_SECONDS = float(os.environ.get("DESTINATION_STORE_REBUILD_SECONDS", str(6 * 3600)))
+FETCH_PAGE_SIZE = 1000
+
+STORE_COLUMNS = "id, name, location, description, tags, image_prompt, image_url, is_personalized, country, region"
+TEXT_COLUMNS = ("name", "location", "description", "image_prompt", "image_url")
+# Multi-valued (or single string) columns with a bitmap per distinct value, matched case-insensitively
+FACETS = ("tags", "country", "region")
+
+class DestinationStore:
+    """Columnar destinations with per-value bitmaps for each facet."""
+
+    def __init__(self, rows: list = ()):
+        self.ids = []
+        self.index = {}
+        self.columns = {name: [] for name in TEXT_COLUMNS}
+        self.is_personalized = bytearray()
+
+        # Shared table of the exact facet strings; rows refer to them by position
+        self.strings = []
+        self._string_ids = {}
+        # Per facet: CSR offsets/values into self.strings holding every value as stored,
+        # whether the row held a plain string, and whether the column was NULL
+        self.raw_offsets = {facet: array("I", [0]) for facet in FACETS}
+        self.raw_values = {facet: array("I") for facet in FACETS}
+        self.scalar = {facet: bytearray() for facet in FACETS}
+        self.null = {facet: bytearray() for facet in FACETS}
+        # Per facet: CSR of each row's distinct values ignoring case (first spelling), for counts
+        self.offsets = {facet: array("I", [0]) for facet in FACETS}
+        self.values = {facet: array("I") for facet in FACETS}
+        # Per facet: lowercased value -> bitmap of rows, and the first spelling seen for display
+        self.bitmaps = {facet: {} for facet in FACETS}
+        self.labels = {facet: {} for facet in FACETS}
+        # Full-text index over name, location and description; document ids are row positions
+        self.text = TextIndex()
+
+        # Largest integer id loaded, for fetching only newer rows
+        self.max_id = None
+
+        self._lock = threading.Lock()
+        self._arrays = None
+
+        # Bulk load: set the bits of each value in one pass instead of one OR per row
+        positions = {facet: {} for facet in FACETS}
+        for row in rows:
+            i = len(self.ids)
+            for facet, keys in self._append(row).items():
+                for key in keys:
+                    positions[facet].setdefault(key, []).append(i)
+        for facet, by_key in positions.items():
+            for key, rows_with_value in by_key.items():
+                mask = np.zeros(len(self.ids), dtype=bool)
+                mask[rows_with_value] = True
+                self.bitmaps[facet][key] = int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _string_id(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self.strings)
+            self.strings.append(sys.intern(value))
+        return string_id
+
+    def _append(self, row: dict) -> dict:
+        """Append a row's columns; returns the lowercased facet values to set bits for."""
+        for name in TEXT_COLUMNS:
+            self.columns[name].append(row.get(name))
+        self.is_personalized.append(1 if row.get("is_personalized") else 0)
+
+        facet_keys = {}
+        for facet in FACETS:
+            value = row.get(facet)
+            self.scalar[facet].append(1 if isinstance(value, str) else 0)
+            self.null[facet].append(1 if value is None else 0)
+            if isinstance(value, str):
+                value = [value] if value else []
+            keys = []
+            for v in value or []:
+                if not isinstance(v, str):
+                    continue
+                string_id = self._string_id(v)
+                self.raw_values[facet].append(string_id)
+                # Values repeated with different case count (and match) once
+                if v.lower() not in keys:
+                    keys.append(v.lower())
+                    self.values[facet].append(string_id)
+                    self.labels[facet].setdefault(v.lower(), v)
+            self.raw_offsets[facet].append(len(self.raw_values[facet]))
+            self.offsets[facet].append(len(self.values[facet]))
+            facet_keys[facet] = keys
+
+        self.text.add(len(self.ids), row)
+        row_id = row.get("id")
+        if isinstance(row_id, int) and (self.max_id is None or row_id > self.max_id):
+            self.max_id = row_id
+        self.ids.append(row_id)
+        self.index[str(row.get("id"))] = len(self.ids) - 1
+        self._arrays = None
+        return facet_keys
+
+    def add(self, row: dict):
+        """Append a destination row (snake_case, as selected with STORE_COLUMNS)."""
+        with self._lock:
+            if str(row.get("id")) in self.index:
+                return
+            bit = 1 << len(self.ids)
+            for facet, keys in self._append(row).items():
+                bitmaps = self.bitmaps[facet]
+                for key in keys:
+                    bitmaps[key] = bitmaps.get(key, 0) | bit
+
+    def _facet_value(self, facet: str, i: int):
+        # The column exactly as it was loaded: NULL, a string, or a list of strings
+        if self.null[facet][i]:
+            return None
+        offsets = self.raw_offsets[facet]
+        values = [self.strings[s] for s in self.raw_values[facet][offsets[i]:offsets[i + 1]]]
+        if self.scalar[facet][i]:
+            return values[0] if values else ""
+        return values
+
+    def row(self, i: int) -> dict:
+        """Rebuild row i as a snake_case destination dict."""
+        row = {"id": self.ids[i], "is_personalized": bool(self.is_personalized[i])}
+        for name, column in self.columns.items():
+            row[name] = column[i]
+        for facet in FACETS:
+            row[facet] = self._facet_value(facet, i)
+        return row
+
+    def rows(self, positions) -> list:
+        return [self.row(int(i)) for i in positions]
+
+    def all(self) -> int:
+        """Bitmap of every row."""
+        return (1 << len(self.ids)) - 1
+
+    def match(self, filters: dict, match_all: tuple = ()) -> int:
+        """
+        Bitmap of the rows matching every facet in filters.
+
+        Args:
+            filters: facet -> list of values; a row matches a facet if it has any of them
+            match_all: Facets where a row must have all of the values instead
+
+        Returns:
+            Bitmap of matching rows
+        """
+        result = self.all()
+        for facet, values in filters.items():
+            if not values:
+                continue
+            bitmaps = self.bitmaps[facet]
+            if facet in match_all:
+                for value in values:
+                    result &= bitmaps.get(value.lower(), 0)
+            else:
+                combined = 0
+                for value in values:
+                    combined |= bitmaps.get(value.lower(), 0)
+                result &= combined
+        return result
+
+    def positions(self, bitmap: int) -> np.ndarray:
+        """Row positions of the set bits of a bitmap, in ascending order."""
+        if not bitmap:
+            return np.empty(0, dtype=np.int64)
+        raw = np.frombuffer(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little"), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(raw, bitorder="little"))
+
+    def _facet_arrays(self, facet: str) -> tuple:
+        # numpy copies of the CSR columns, rebuilt after rows are added
+        arrays = self._arrays
+        if arrays is None:
+            # Built under the lock so add() can't append half a row to the columns being copied
+            with self._lock:
+                arrays = self._arrays
+                if arrays is None:
+                    arrays = {}
+                    for f in FACETS:
+                        keys = list(self.labels[f])
+                        key_index = {key: k for k, key in enumerate(keys)}
+                        string_key = np.full(len(self.strings), -1, dtype=np.int64)
+                        for string_id in set(self.values[f]):
+                            string_key[string_id] = key_index[self.strings[string_id].lower()]
+                        values = string_key[np.array(self.values[f], dtype=np.int64)]
+                        offsets = np.array(self.offsets[f], dtype=np.int64)
+                        arrays[f] = (keys, offsets, values, np.bincount(values, minlength=len(keys)))
+                    self._arrays = arrays
+        return arrays[facet]
+
+    def facet_counts(self, positions: np.ndarray, facet: str, limit: int = None) -> list:
+        """
+        How many of the given rows have each value of a facet.
+
+        Args:
+            positions: Row positions, as returned by positions(); None for every row
+
+        Returns:
+            List of (value, count), most common first, without zero counts
+        """
+        keys, offsets, values, totals = self._facet_arrays(facet)
+        if positions is None:
+            counts = totals
+        else:
+            # Gather the value slices of the given rows in one vectorized step
+            starts, ends = offsets[positions], offsets[positions + 1]
+            lengths = ends - starts
+            flat = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            counts = np.bincount(values[flat], minlength=len(keys))
+
+        order = np.argsort(-counts, kind="stable")
+        if limit:
+            order = order[:limit]
+        labels = self.labels[facet]
+        return [(labels[keys[k]], int(counts[k])) for k in order if counts[k]]
+
+
+def _fetch_all_rows(after_id: int = None) -> list:
+    """Every destination row, or only those with an id above after_id."""
+    rows = []
+    start = 0
+    while True:
+        query = supabase.table("destinations").select(STORE_COLUMNS)
+        if after_id is not None:
+            query = query.gt("id", after_id)
+        response = query.order("id").range(start, start + FETCH_PAGE_SIZE - 1).execute()
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < FETCH_PAGE_SIZE:
+            return rows
+        start += FETCH_PAGE_SIZE
+
+
+_store = None
+_loaded_at = 0.0
+_checked_at = 0.0
+_refreshing = False
+_store_lock = threading.Lock()
+# Rows added while a store is being loaded, replayed into it before it is published
+_added_during_load = []
+_added_lock = threading.Lock()
+
+
+def _load() -> DestinationStore:
+    """Load a new store and publish it, with the rows added while it was loading."""
+    global _store, _loaded_at, _checked_at
+    store = DestinationStore(_fetch_all_rows())
+    with _added_lock:
+        # The fetch may have read the table before these were inserted
+        for row in _added_during_load:
+            store.add(row)
+        _store = store
+        _loaded_at = _checked_at = time.monotonic()
+    return store
+
+
+def _append_new_rows(store: DestinationStore):
+    """Add the rows inserted since the store's largest id (e.g. by other workers)."""
+    global _checked_at
+    rows = _fetch_all_rows(after_id=store.max_id)
+    for row in rows:
+        store.add(row)
+    _checked_at = time.monotonic()
+    if rows:
+        logger.info("Destination store updated", extra={"added": len(rows), "destinations": len(store)})
+
+
+def _refresh(rebuild: bool):
+    global _refreshing
+    try:
+        store = _store
+        if rebuild or store.max_id is None:
+            _load()
+        else:
+            _append_new_rows(store)
+    except Exception as e:
+        logger.error("Error refreshing destination store: %s", e)
+    finally:
+        with _added_lock:
+            _added_during_load.clear()
+            _refreshing = False
+
+
+def get_destination_store() -> DestinationStore:
+    """
+    This worker's destination store. The first call loads it; later calls
+    return it at once and update it in the background when it is due.
+    """
+    global _refreshing
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                with _added_lock:
+                    _refreshing = True
+                try:
+                    store = _load()
+                finally:
+                    with _added_lock:
+                        _added_during_load.clear()
+                        _refreshing = False
+                logger.info("Destination store loaded", extra={"destinations": len(store)})
+    elif time.monotonic() - _checked_at > DESTINATION_STORE_TTL_SECONDS and not _refreshing:
+        with _store_lock:
+            if not _refreshing:
+                rebuild = time.monotonic() - _loaded_at > DESTINATION_STORE_REBUILD_SECONDS
+                with _added_lock:
+                    _refreshing = True
+                threading.Thread(
+                    target=_refresh, args=(rebuild,), name="destination-store-refresh", daemon=True
+                ).start()
+    return _store
+
+
+def add_to_store(row: dict):
+    """Add a newly inserted destination to the store, if this worker has loaded one."""
+    with _added_lock:
+        if _refreshing:
+            _added_during_load.append(row)
+        store = _store
+    if store is not None:
+        store.add(row)
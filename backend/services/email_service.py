@@ -1,11 +1,54 @@
+import logging
 import os
-import resend
-from dotenv import load_dotenv
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from services.clients import resend_client as resend
+from services.email_templates import render_welcome, render_weekly
+
+logger = logging.getLogger(__name__)
+
+# Resend's batch API accepts at most 100 messages per call
+RESEND_BATCH_SIZE = 100
+# Concurrent batch calls and overall request rate (Resend's default limit is 2 requests/second)
+EMAIL_BATCH_CONCURRENCY = int(os.environ.get("EMAIL_BATCH_CONCURRENCY", "2"))
+EMAIL_REQUESTS_PER_SECOND = float(os.environ.get("EMAIL_REQUESTS_PER_SECOND", "2"))
+EMAIL_MAX_RETRIES = 4
+TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+# The message itself was rejected (e.g. a malformed address); retrying can't help
+PERMANENT_STATUS_CODES = {400, 422}
+# 409 for a reused idempotency key with a different payload: the key's
+# original request was accepted, so those recipients were already sent to
+IDEMPOTENCY_CONFLICT_ERROR = "invalid_idempotent_request"
+
+
+def build_welcome_email(to_email: str, user_name: str, destinations: list = None) -> dict:
+    """
+    Build the Resend message parameters for the welcome email.
 
-load_dotenv()
+    Args:
+        to_email: Recipient email address
+        user_name: Recipient's name
+        destinations: Optional list of personalized destination dictionaries
+    """
+    intro_text = (
+        "You're now subscribed to our weekly newsletter. Every week, we'll send you "
+        "handpicked travel destinations tailored to your interests."
+    )
+    if destinations and len(destinations) > 0:
+        intro_text = (
+            "You're now subscribed to our weekly newsletter! Based on your saved destinations, "
+            "we've already found some places we think you'll love."
+        )
 
-# Initialize Resend with API key
-resend.api_key = os.environ.get("RESEND_API_KEY")
+    params = {
+        "from": "Voyager <noreply@voyager-travel.org>",  # Update with your verified domain
+        "to": [to_email],
+        "subject": "Welcome to Voyager's Weekly Destinations!",
+        "html": render_welcome(user_name, intro_text, destinations),
+    }
+    return params
 
 
 def send_welcome_email(to_email: str, user_name: str, destinations: list = None):
@@ -19,84 +62,35 @@ def send_welcome_email(to_email: str, user_name: str, destinations: list = None)
         destinations: Optional list of personalized destination dictionaries
     """
     try:
-        # Build destination cards HTML if destinations are provided
-        destination_cards = ""
-        if destinations and len(destinations) > 0:
-            destination_cards = """
-                <div style="margin: 30px 0;">
-                    <h2 style="font-size: 20px; color: #0f172a; margin-bottom: 20px; font-family: Georgia, serif;">
-                        Here are some destinations we think you'll love:
-                    </h2>
-            """
-            for dest in destinations[:4]:  # Limit to 4 destinations
-                destination_cards += f"""
-                    <div style="margin-bottom: 20px; border-radius: 16px; overflow: hidden; border: 1px solid #e2e8f0;">
-                        <img src="{dest.get('image_url', '')}" alt="{dest.get('name', '')}"
-                             style="width: 100%; height: 180px; object-fit: cover;">
-                        <div style="padding: 16px;">
-                            <p style="font-size: 11px; color: #10b981; text-transform: uppercase; letter-spacing: 1px; margin: 0 0 6px 0;">
-                                {dest.get('location', '')}
-                            </p>
-                            <h3 style="font-size: 18px; color: #0f172a; margin: 0 0 10px 0; font-family: Georgia, serif;">
-                                {dest.get('name', '')}
-                            </h3>
-                            <p style="font-size: 13px; color: #64748b; line-height: 1.5; margin: 0;">
-                                {dest.get('description', '')[:120]}...
-                            </p>
-                        </div>
-                    </div>
-                """
-            destination_cards += "</div>"
-
-        intro_text = (
-            "You're now subscribed to our weekly newsletter. Every week, we'll send you "
-            "handpicked travel destinations tailored to your interests."
-        )
-        if destinations and len(destinations) > 0:
-            intro_text = (
-                "You're now subscribed to our weekly newsletter! Based on your saved destinations, "
-                "we've already found some places we think you'll love."
-            )
-
-        params = {
-            "from": "Voyager <noreply@voyager-travel.org>",  # Update with your verified domain
-            "to": [to_email],
-            "subject": "Welcome to Voyager's Weekly Destinations!",
-            "html": f"""
-                <div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; max-width: 600px; margin: 0 auto; padding: 40px 20px;">
-                    <h1 style="font-size: 32px; color: #0f172a; margin-bottom: 20px; font-family: Georgia, serif;">
-                        Welcome to Voyager, {user_name}!
-                    </h1>
-
-                    <p style="font-size: 16px; color: #64748b; line-height: 1.6; margin-bottom: 20px;">
-                        {intro_text}
-                    </p>
-
-                    {destination_cards}
-
-                    <p style="font-size: 16px; color: #64748b; line-height: 1.6; margin-bottom: 30px;">
-                        Get ready to discover your next adventure!
-                    </p>
-
-                    <div style="border-top: 1px solid #e2e8f0; padding-top: 20px; margin-top: 30px;">
-                        <p style="font-size: 14px; color: #94a3b8;">
-                            Happy travels,<br>
-                            The Voyager Team
-                        </p>
-                    </div>
-                </div>
-            """
-        }
-
+        params = build_welcome_email(to_email, user_name, destinations)
         email = resend.Emails.send(params)
-        print(f"✅ Welcome email sent to {to_email}")
+        logger.info("Welcome email sent")
         return email
 
     except Exception as e:
-        print(f"❌ Failed to send welcome email: {e}")
+        logger.error("Failed to send welcome email: %s", e)
         return None
 
 
+def build_weekly_newsletter(to_email: str, user_name: str, destinations: list) -> dict:
+    """
+    Build the Resend message parameters for the weekly newsletter.
+
+    Args:
+        to_email: Recipient email address
+        user_name: Recipient's name
+        destinations: List of destination dictionaries with name, location, description, imageUrl
+    """
+    # Destination cards come from the fragment cache; only the name is rendered per recipient
+    params = {
+        "from": "Voyager <onboarding@resend.dev>",  # Update with your verified domain
+        "to": [to_email],
+        "subject": "Your Weekly Travel Inspiration ✈️",
+        "html": render_weekly(user_name, destinations),
+    }
+    return params
+
+
 def send_weekly_newsletter(to_email: str, user_name: str, destinations: list):
     """
     Send the weekly newsletter with personalized destinations.
@@ -107,70 +101,152 @@ def send_weekly_newsletter(to_email: str, user_name: str, destinations: list):
         destinations: List of destination dictionaries with name, location, description, imageUrl
     """
     try:
-        # Build destination cards HTML
-        destination_cards = ""
-        for dest in destinations[:4]:  # Limit to 4 destinations
-            destination_cards += f"""
-                <div style="margin-bottom: 30px; border-radius: 16px; overflow: hidden; border: 1px solid #e2e8f0;">
-                    <img src="{dest.get('image_url', '')}" alt="{dest.get('name', '')}"
-                         style="width: 100%; height: 200px; object-fit: cover;">
-                    <div style="padding: 20px;">
-                        <p style="font-size: 12px; color: #10b981; text-transform: uppercase; letter-spacing: 1px; margin: 0 0 8px 0;">
-                            {dest.get('location', '')}
-                        </p>
-                        <h3 style="font-size: 20px; color: #0f172a; margin: 0 0 12px 0; font-family: Georgia, serif;">
-                            {dest.get('name', '')}
-                        </h3>
-                        <p style="font-size: 14px; color: #64748b; line-height: 1.5; margin: 0;">
-                            {dest.get('description', '')[:150]}...
-                        </p>
-                    </div>
-                </div>
-            """
-
-        params = {
-            "from": "Voyager <onboarding@resend.dev>",  # Update with your verified domain
-            "to": [to_email],
-            "subject": "Your Weekly Travel Inspiration ✈️",
-            "html": f"""
-                <div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; max-width: 600px; margin: 0 auto; padding: 40px 20px; background-color: #ffffff;">
-                    <div style="text-align: center; margin-bottom: 40px;">
-                        <h1 style="font-size: 28px; color: #0f172a; margin-bottom: 10px; font-family: Georgia, serif;">
-                            Voyager Weekly
-                        </h1>
-                        <p style="font-size: 14px; color: #64748b;">
-                            Your personalized travel destinations
-                        </p>
-                    </div>
-
-                    <p style="font-size: 16px; color: #334155; line-height: 1.6; margin-bottom: 30px;">
-                        Hi {user_name},<br><br>
-                        Here are this week's handpicked destinations just for you:
-                    </p>
-
-                    {destination_cards}
-
-                    <div style="text-align: center; margin: 40px 0;">
-                        <a href="https://yourdomain.com"
-                           style="display: inline-block; background-color: #0f172a; color: white; padding: 14px 32px; border-radius: 50px; text-decoration: none; font-weight: 500;">
-                            Explore More Destinations
-                        </a>
-                    </div>
-
-                    <div style="border-top: 1px solid #e2e8f0; padding-top: 20px; margin-top: 40px; text-align: center;">
-                        <p style="font-size: 12px; color: #94a3b8;">
-                            You're receiving this because you subscribed to Voyager's newsletter.<br>
-                            <a href="#" style="color: #94a3b8;">Unsubscribe</a>
-                        </p>
-                    </div>
-                </div>
-            """
-        }
-
+        params = build_weekly_newsletter(to_email, user_name, destinations)
         email = resend.Emails.send(params)
-        print(f"✅ Weekly newsletter sent to {to_email}")
+        # One line per recipient during campaigns, so only a sample is kept
+        logger.info("Weekly newsletter sent", extra={"sample_rate": 0.1})
         return email
 
     except Exception as e:
-        print(f"❌ Failed to send weekly newsletter: {e}")
+        logger.error("Failed to send weekly newsletter: %s", e)
+        return None
+
+
+class RateLimiter:
+    """Token bucket shared by the threads making Resend calls."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def _is_idempotency_conflict(error: Exception) -> bool:
+    return str(getattr(error, "code", "")) == "409" and getattr(error, "error_type", None) == IDEMPOTENCY_CONFLICT_ERROR
+
+
+def _status_code(error: Exception) -> int:
+    try:
+        return int(getattr(error, "code", None))
+    except (TypeError, ValueError):
         return None
+
+
+def _is_transient(error: Exception) -> bool:
+    """Rate limits, server errors and network failures are worth retrying."""
+    if _is_idempotency_conflict(error):
+        return False
+    code = _status_code(error)
+    if code in TRANSIENT_STATUS_CODES:
+        return True
+    return isinstance(error, (ConnectionError, TimeoutError)) or "timed out" in str(error).lower()
+
+
+def _batch_outcomes(messages: list, response) -> list:
+    """Map a batch response back to its messages: ids in order for the accepted ones, errors by index."""
+    data = response.get("data", []) if isinstance(response, dict) else response
+    errors = response.get("errors") or [] if isinstance(response, dict) else []
+    rejected = {error.get("index"): error.get("message") or "invalid message" for error in errors}
+    ids = iter([item.get("id") for item in data or []])
+
+    outcomes = []
+    for i, m in enumerate(messages):
+        if i in rejected:
+            outcomes.append({"email": m["to"][0], "status": "failed", "error": rejected[i], "permanent": True})
+        else:
+            outcomes.append({"email": m["to"][0], "status": "sent", "id": next(ids, None)})
+    return outcomes
+
+
+def _send_batch(messages: list, limiter: RateLimiter) -> list:
+    """Send one Resend batch call, retrying transient failures with backoff."""
+    # Permissive validation: invalid messages are reported per index instead
+    # of rejecting the whole batch, and the valid ones are still sent
+    options = {"batch_validation": "permissive"}
+
+    for attempt in range(EMAIL_MAX_RETRIES + 1):
+        limiter.acquire()
+        try:
+            response = resend.Batch.send(messages, options=options)
+            return _batch_outcomes(messages, response)
+        except Exception as e:
+            if attempt < EMAIL_MAX_RETRIES and _is_transient(e):
+                # Exponential backoff with jitter so concurrent batches don't retry in lockstep
+                time.sleep(2 ** attempt + random.random())
+                continue
+            return [{"email": m["to"][0], "status": "failed", "error": str(e)} for m in messages]
+
+
+def _send_one(message: dict, limiter: RateLimiter, idempotency_key: str) -> dict:
+    """Send one email under its own idempotency key, retrying transient failures with backoff."""
+    options = {"idempotency_key": idempotency_key}
+    email = message["to"][0]
+    for attempt in range(EMAIL_MAX_RETRIES + 1):
+        limiter.acquire()
+        try:
+            response = resend.Emails.send(message, options=options)
+            return {"email": email, "status": "sent", "id": response.get("id") if isinstance(response, dict) else None}
+        except Exception as e:
+            if _is_idempotency_conflict(e):
+                logger.warning("Email already sent under idempotency key %s", idempotency_key)
+                return {"email": email, "status": "sent", "id": None}
+            if attempt < EMAIL_MAX_RETRIES and _is_transient(e):
+                time.sleep(2 ** attempt + random.random())
+                continue
+            outcome = {"email": email, "status": "failed", "error": str(e)}
+            if _status_code(e) in PERMANENT_STATUS_CODES:
+                outcome["permanent"] = True
+            return outcome
+
+
+def send_bulk(messages: list, idempotency_keys: list = None) -> list:
+    """
+    Send many single-recipient emails through Resend.
+
+    Messages are grouped into batches of RESEND_BATCH_SIZE and sent by
+    EMAIL_BATCH_CONCURRENCY threads sharing a rate limiter. Messages that
+    fail validation (e.g. a malformed address) are reported as failed with
+    "permanent": True and don't stop the rest of their batch; when a whole
+    batch call fails, every recipient in it is reported as failed.
+
+    Resend takes one idempotency key per request, so with idempotency_keys
+    each message is sent on its own under its key instead of in a batch.
+    That is the only way a retry that regroups the messages still can't
+    send one twice, at the cost of one request per message.
+
+    Args:
+        messages: Resend message params, each with a single recipient in 'to'
+        idempotency_keys: One key per message (e.g. its outbox row id)
+
+    Returns:
+        One outcome dict per message, in order: {"email", "status": "sent"|"failed", "id" | "error"}
+    """
+    limiter = RateLimiter(EMAIL_REQUESTS_PER_SECOND)
+
+    with ThreadPoolExecutor(max_workers=max(EMAIL_BATCH_CONCURRENCY, 1)) as pool:
+        if idempotency_keys is not None:
+            requests = len(messages)
+            outcomes = list(pool.map(lambda item: _send_one(item[0], limiter, item[1]), zip(messages, idempotency_keys)))
+        else:
+            batches = [messages[i:i + RESEND_BATCH_SIZE] for i in range(0, len(messages), RESEND_BATCH_SIZE)]
+            requests = len(batches)
+            results = pool.map(lambda batch: _send_batch(batch, limiter), batches)
+            outcomes = [outcome for batch_outcomes in results for outcome in batch_outcomes]
+
+    sent = sum(1 for o in outcomes if o["status"] == "sent")
+    logger.info("Bulk send complete", extra={"sent": sent, "total": len(outcomes), "requests": requests})
+    return outcomes
@@ -0,0 +1,198 @@
+import re
+import html
+import threading
+from collections import OrderedDict
+
+# Destination card fragments kept across sends (each a few hundred bytes)
+CARD_CACHE_SIZE = 1024
+
+_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class SafeHtml(str):
+    """A string of already-escaped HTML that templates insert verbatim."""
+
+
+class CompiledTemplate:
+    """
+    A template split once into literal chunks and placeholder names.
+
+    Rendering is a single join over the chunks, with every value
+    HTML-escaped unless it is SafeHtml. Placeholders look like {{ name }}.
+    """
+
+    def __init__(self, source: str):
+        parts = _PLACEHOLDER.split(source)
+        # split() alternates literal text and captured placeholder names
+        self.literals = parts[0::2]
+        self.fields = parts[1::2]
+
+    def render(self, **values) -> SafeHtml:
+        out = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            value = values[field]
+            out.append(value if isinstance(value, SafeHtml) else html.escape(str(value), quote=True))
+            out.append(literal)
+        return SafeHtml("".join(out))
+
+
+WELCOME_LAYOUT = CompiledTemplate("""
+    <div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; max-width: 600px; margin: 0 auto; padding: 40px 20px;">
+        <h1 style="font-size: 32px; color: #0f172a; margin-bottom: 20px; font-family: Georgia, serif;">
+            Welcome to Voyager, {{ user_name }}!
+        </h1>
+
+        <p style="font-size: 16px; color: #64748b; line-height: 1.6; margin-bottom: 20px;">
+            {{ intro_text }}
+        </p>
+
+        {{ destination_cards }}
+
+        <p style="font-size: 16px; color: #64748b; line-height: 1.6; margin-bottom: 30px;">
+            Get ready to discover your next adventure!
+        </p>
+
+        <div style="border-top: 1px solid #e2e8f0; padding-top: 20px; margin-top: 30px;">
+            <p style="font-size: 14px; color: #94a3b8;">
+                Happy travels,<br>
+                The Voyager Team
+            </p>
+        </div>
+    </div>
+""")
+
+WELCOME_CARDS_SECTION = CompiledTemplate("""
+    <div style="margin: 30px 0;">
+        <h2 style="font-size: 20px; color: #0f172a; margin-bottom: 20px; font-family: Georgia, serif;">
+            Here are some destinations we think you'll love:
+        </h2>
+        {{ cards }}
+    </div>
+""")
+
+WELCOME_CARD = CompiledTemplate("""
+        <div style="margin-bottom: 20px; border-radius: 16px; overflow: hidden; border: 1px solid #e2e8f0;">
+            <img src="{{ image_url }}" alt="{{ name }}"
+                 style="width: 100%; height: 180px; object-fit: cover;">
+            <div style="padding: 16px;">
+                <p style="font-size: 11px; color: #10b981; text-transform: uppercase; letter-spacing: 1px; margin: 0 0 6px 0;">
+                    {{ location }}
+                </p>
+                <h3 style="font-size: 18px; color: #0f172a; margin: 0 0 10px 0; font-family: Georgia, serif;">
+                    {{ name }}
+                </h3>
+                <p style="font-size: 13px; color: #64748b; line-height: 1.5; margin: 0;">
+                    {{ description }}...
+                </p>
+            </div>
+        </div>
+""")
+
+WEEKLY_LAYOUT = CompiledTemplate("""
+    <div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; max-width: 600px; margin: 0 auto; padding: 40px 20px; background-color: #ffffff;">
+        <div style="text-align: center; margin-bottom: 40px;">
+            <h1 style="font-size: 28px; color: #0f172a; margin-bottom: 10px; font-family: Georgia, serif;">
+                Voyager Weekly
+            </h1>
+            <p style="font-size: 14px; color: #64748b;">
+                Your personalized travel destinations
+            </p>
+        </div>
+
+        <p style="font-size: 16px; color: #334155; line-height: 1.6; margin-bottom: 30px;">
+            Hi {{ user_name }},<br><br>
+            Here are this week's handpicked destinations just for you:
+        </p>
+
+        {{ destination_cards }}
+
+        <div style="text-align: center; margin: 40px 0;">
+            <a href="https://yourdomain.com"
+               style="display: inline-block; background-color: #0f172a; color: white; padding: 14px 32px; border-radius: 50px; text-decoration: none; font-weight: 500;">
+                Explore More Destinations
+            </a>
+        </div>
+
+        <div style="border-top: 1px solid #e2e8f0; padding-top: 20px; margin-top: 40px; text-align: center;">
+            <p style="font-size: 12px; color: #94a3b8;">
+                You're receiving this because you subscribed to Voyager's newsletter.<br>
+                <a href="#" style="color: #94a3b8;">Unsubscribe</a>
+            </p>
+        </div>
+    </div>
+""")
+
+WEEKLY_CARD = CompiledTemplate("""
+        <div style="margin-bottom: 30px; border-radius: 16px; overflow: hidden; border: 1px solid #e2e8f0;">
+            <img src="{{ image_url }}" alt="{{ name }}"
+                 style="width: 100%; height: 200px; object-fit: cover;">
+            <div style="padding: 20px;">
+                <p style="font-size: 12px; color: #10b981; text-transform: uppercase; letter-spacing: 1px; margin: 0 0 8px 0;">
+                    {{ location }}
+                </p>
+                <h3 style="font-size: 20px; color: #0f172a; margin: 0 0 12px 0; font-family: Georgia, serif;">
+                    {{ name }}
+                </h3>
+                <p style="font-size: 14px; color: #64748b; line-height: 1.5; margin: 0;">
+                    {{ description }}...
+                </p>
+            </div>
+        </div>
+""")
+
+# Card template and description length for each email type
+CARD_STYLES = {
+    "welcome": (WELCOME_CARD, 120),
+    "weekly": (WEEKLY_CARD, 150),
+}
+
+_card_cache = OrderedDict()
+_card_cache_lock = threading.Lock()
+
+
+def render_card(style: str, dest: dict) -> SafeHtml:
+    """
+    Render one destination card, reusing the cached fragment when possible.
+
+    Cards are cached by style and the fields they show, so the HTML for a
+    destination is built once and shared by every recipient it goes to.
+    """
+    key = (
+        style, dest.get('id'), dest.get('name'), dest.get('location'),
+        dest.get('description'), dest.get('image_url'),
+    )
+    with _card_cache_lock:
+        card = _card_cache.get(key)
+        if card is not None:
+            _card_cache.move_to_end(key)
+            return card
+
+    template, description_length = CARD_STYLES[style]
+    card = template.render(
+        image_url=dest.get('image_url') or '',
+        name=dest.get('name') or '',
+        location=dest.get('location') or '',
+        description=(dest.get('description') or '')[:description_length],
+    )
+
+    with _card_cache_lock:
+        _card_cache[key] = card
+        if len(_card_cache) > CARD_CACHE_SIZE:
+            _card_cache.popitem(last=False)
+    return card
+
+
+def render_cards(style: str, destinations: list) -> SafeHtml:
+    """Render up to 4 destination cards in slot order."""
+    return SafeHtml("".join(render_card(style, dest) for dest in destinations[:4]))
+
+
+def render_welcome(user_name: str, intro_text: str, destinations: list = None) -> str:
+    cards = SafeHtml("")
+    if destinations:
+        cards = WELCOME_CARDS_SECTION.render(cards=render_cards("welcome", destinations))
+    return WELCOME_LAYOUT.render(user_name=user_name, intro_text=intro_text, destination_cards=cards)
+
+
+def render_weekly(user_name: str, destinations: list) -> str:
+    return WEEKLY_LAYOUT.render(user_name=user_name, destination_cards=render_cards("weekly", destinations))
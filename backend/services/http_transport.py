@@ -0,0 +1,190 @@
+"""
+One pooled HTTP transport per worker, shared by every outbound API client.
+
+Supabase (PostgREST, auth, storage), Gemini and Resend all send their
+requests through the same connection pool, so a warm worker reuses open
+keep-alive (and, when the h2 package is installed, multiplexed HTTP/2)
+connections instead of paying a TCP + TLS handshake per request. Each
+library still gets its own httpx.Client for its headers and timeouts;
+only the transport, which owns the pool, is shared.
+
+Pool sizes and timeouts come from the environment (HTTP_POOL_*, HTTP_*_TIMEOUT).
+The transport counts requests, newly opened connections and TLS
+handshakes per host; transport_stats() reports them with the pool's
+current size.
+"""
+import os
+import time
+import threading
+import httpx
+from services.metrics import (
+    UPSTREAM_LATENCY, UPSTREAM_ERRORS, UPSTREAM_CONNECTIONS, dependency_for_host, upstream_operation,
+)
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:  # Optional: fall back to HTTP/1.1 keep-alive
+    HTTP2_AVAILABLE = False
+
+HTTP_POOL_MAX_CONNECTIONS = int(os.environ.get("HTTP_POOL_MAX_CONNECTIONS", "20"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.environ.get("HTTP_POOL_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "30"))
+# How long a request may wait for a free connection when the pool is full
+HTTP_POOL_TIMEOUT = float(os.environ.get("HTTP_POOL_TIMEOUT", "5"))
+
+DEFAULT_TIMEOUT = httpx.Timeout(
+    HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT, pool=HTTP_POOL_TIMEOUT,
+)
+
+
+class PooledTransport(httpx.HTTPTransport):
+    """httpx transport that records connection reuse per host."""
+
+    def __init__(self):
+        super().__init__(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            # Retry once when a connection can't be established (not on responses)
+            retries=1,
+        )
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host_stats(self, host: str) -> dict:
+        stats = self._hosts.get(host)
+        if stats is None:
+            stats = self._hosts[host] = {
+                "requests": 0,
+                "connectionsOpened": 0,
+                "tlsHandshakes": 0,
+                "connectSeconds": 0.0,
+                "errors": 0,
+            }
+        return stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        dependency = dependency_for_host(host)
+        operation = upstream_operation(dependency, request.method, request.url.path)
+        phase_started = [None]
+
+        # httpcore reports connection setup through the trace extension
+        def trace(event: str, info: dict):
+            if event in ("connection.connect_tcp.started", "connection.start_tls.started"):
+                phase_started[0] = time.perf_counter()
+            elif event in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+                elapsed = time.perf_counter() - phase_started[0] if phase_started[0] else 0.0
+                with self._lock:
+                    stats = self._host_stats(host)
+                    stats["connectionsOpened" if event == "connection.connect_tcp.complete" else "tlsHandshakes"] += 1
+                    stats["connectSeconds"] += elapsed
+                if event == "connection.connect_tcp.complete":
+                    UPSTREAM_CONNECTIONS.labels(dependency).inc()
+
+        request.extensions = {**request.extensions, "trace": trace}
+        # Gemini calls are timed per call by itinerary_service, along with their token counts
+        timed = dependency != "gemini"
+        started = time.perf_counter()
+        try:
+            response = super().handle_request(request)
+        except httpx.TransportError:
+            with self._lock:
+                self._host_stats(host)["errors"] += 1
+            if timed:
+                UPSTREAM_ERRORS.labels(dependency, operation).inc()
+            raise
+        finally:
+            with self._lock:
+                self._host_stats(host)["requests"] += 1
+            if timed:
+                # Time to response headers; the body is read afterwards by the client
+                UPSTREAM_LATENCY.labels(dependency, operation).observe(time.perf_counter() - started)
+
+        if timed and (response.status_code == 429 or response.status_code >= 500):
+            UPSTREAM_ERRORS.labels(dependency, operation).inc()
+        return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            hosts = {host: dict(stats) for host, stats in self._hosts.items()}
+        for stats in hosts.values():
+            stats["connectSeconds"] = round(stats["connectSeconds"], 4)
+
+        connections = list(getattr(self._pool, "connections", []))
+        idle = sum(1 for conn in connections if conn.is_idle())
+        requests = sum(h["requests"] for h in hosts.values())
+        opened = sum(h["connectionsOpened"] for h in hosts.values())
+        return {
+            "http2": HTTP2_AVAILABLE,
+            "requests": requests,
+            "connectionsOpened": opened,
+            # Share of requests that went out on an already open connection
+            "reuseRatio": round(1 - opened / requests, 4) if requests else None,
+            "pool": {
+                "connections": len(connections),
+                "idle": idle,
+                "active": len(connections) - idle,
+                "maxConnections": HTTP_POOL_MAX_CONNECTIONS,
+                "maxKeepalive": HTTP_POOL_MAX_KEEPALIVE,
+            },
+            "hosts": hosts,
+        }
+
+
+_transport = None
+_transport_pid = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> PooledTransport:
+    """This worker's shared transport (rebuilt after a fork - sockets can't be shared)."""
+    global _transport, _transport_pid
+    pid = os.getpid()
+    if _transport is None or _transport_pid != pid:
+        with _transport_lock:
+            if _transport is None or _transport_pid != pid:
+                _transport = PooledTransport()
+                _transport_pid = pid
+    return _transport
+
+
+def new_http_client(**kwargs) -> httpx.Client:
+    """An httpx.Client on the shared transport; kwargs override headers, timeout, etc."""
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return httpx.Client(transport=get_transport(), **kwargs)
+
+
+def transport_stats() -> dict:
+    """Pool utilization and connection reuse for this worker."""
+    if _transport is None or _transport_pid != os.getpid():
+        return {"http2": HTTP2_AVAILABLE, "requests": 0, "connectionsOpened": 0, "reuseRatio": None, "pool": None, "hosts": {}}
+    return _transport.stats()
+
+
+class ResendHttpClient:
+    """
+    Resend HTTP client (the resend.default_http_client interface) on the
+    shared transport. The SDK's default client opens a new connection for
+    every call.
+    """
+
+    def __init__(self, client: httpx.Client):
+        self._client = client
+
+    def request(self, method, url, headers, json=None, files=None, data=None):
+        try:
+            response = self._client.request(
+                method, url, headers=headers, files=files, data=data,
+                json=json if files is None and data is None else None,
+            )
+        except httpx.HTTPError as e:
+            # Resend turns this into a ResendError
+            raise RuntimeError(f"Request failed: {e}") from e
+        return response.content, response.status_code, response.headers
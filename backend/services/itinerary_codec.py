@@ -0,0 +1,129 @@
+import os
+import json
+import base64
+
+try:
+    import zstandard
+except ImportError:  # Optional: compact encoding works without compression
+    zstandard = None
+
+# Stored itineraries are either the plain list Gemini returns, or one of
+# these compact encodings. Plain lists are always accepted when decoding,
+# so rows written before the encoding existed keep working.
+COLUMNAR_FORMAT = "itinerary/columnar"
+COMPRESSED_FORMAT = "itinerary/columnar+zstd"
+CODEC_VERSION = 1
+
+DAY_FIELDS = {"day", "date", "activities"}
+ACTIVITY_FIELDS = ("time", "title", "description", "location", "country")
+# Activity fields that repeat heavily and are stored as indexes into a string table
+DICTIONARY_FIELDS = ("location", "country")
+
+ZSTD_LEVEL = 9
+
+
+def _use_zstd() -> bool:
+    """Set ITINERARY_ZSTD=1 to zstd-compress the columnar form (needs the zstandard package). Read per call."""
+    return os.environ.get("ITINERARY_ZSTD", "").lower() in ("1", "true", "yes")
+
+
+def _is_encodable(itinerary) -> bool:
+    """Only itineraries in the exact Gemini response shape are encoded."""
+    if not isinstance(itinerary, list):
+        return False
+    for day in itinerary:
+        if not isinstance(day, dict) or set(day) != DAY_FIELDS:
+            return False
+        if not isinstance(day["activities"], list):
+            return False
+        for activity in day["activities"]:
+            if not isinstance(activity, dict) or set(activity) != set(ACTIVITY_FIELDS):
+                return False
+    return True
+
+
+def encode_itinerary(itinerary):
+    """
+    Encode an itinerary into the compact storage form.
+
+    Each day's activities are stored column by column, so keys appear once
+    per day instead of once per activity, and locations/countries are
+    replaced by indexes into a shared string table. With ITINERARY_ZSTD
+    enabled the result is additionally zstd-compressed.
+
+    Itineraries that don't match the expected shape are returned unchanged.
+    """
+    if not itinerary or not _is_encodable(itinerary):
+        return itinerary
+
+    strings = []
+    string_index = {}
+
+    def intern(value):
+        if value not in string_index:
+            string_index[value] = len(strings)
+            strings.append(value)
+        return string_index[value]
+
+    days = []
+    for day in itinerary:
+        activities = day["activities"]
+        encoded_day = {"day": day["day"], "date": day["date"]}
+        for field in ACTIVITY_FIELDS:
+            if field in DICTIONARY_FIELDS:
+                encoded_day[field] = [intern(a[field]) for a in activities]
+            else:
+                encoded_day[field] = [a[field] for a in activities]
+        days.append(encoded_day)
+
+    encoded = {"format": COLUMNAR_FORMAT, "v": CODEC_VERSION, "strings": strings, "days": days}
+
+    if _use_zstd() and zstandard is not None:
+        raw = json.dumps(encoded, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        compressed = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+        return {
+            "format": COMPRESSED_FORMAT,
+            "v": CODEC_VERSION,
+            "data": base64.b64encode(compressed).decode("ascii"),
+        }
+
+    return encoded
+
+
+def _decode_day(day: dict, strings: list) -> dict:
+    columns = [
+        [strings[i] for i in day[field]] if field in DICTIONARY_FIELDS else day[field]
+        for field in ACTIVITY_FIELDS
+    ]
+    return {
+        "day": day["day"],
+        "date": day["date"],
+        "activities": [dict(zip(ACTIVITY_FIELDS, values)) for values in zip(*columns)],
+    }
+
+
+def decode_itinerary(stored):
+    """
+    Decode a stored itinerary back into the list-of-days shape.
+
+    Accepts the columnar form and the zstd-compressed columnar form. Plain
+    lists and any other dict (legacy or hand-edited itineraries, patched
+    documents) are returned unchanged.
+    """
+    if not isinstance(stored, dict):
+        return stored if stored is not None else []
+
+    fmt = stored.get("format")
+    if fmt == COMPRESSED_FORMAT:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to decode compressed itineraries")
+        raw = zstandard.ZstdDecompressor().decompress(base64.b64decode(stored["data"]))
+        decompressed = json.loads(raw)
+        if isinstance(decompressed, dict) and decompressed.get("format") == COLUMNAR_FORMAT:
+            stored, fmt = decompressed, COLUMNAR_FORMAT
+
+    if fmt != COLUMNAR_FORMAT:
+        return stored
+
+    strings = stored["strings"]
+    return [_decode_day(day, strings) for day in stored["days"]]
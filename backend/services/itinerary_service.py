@@ -1,24 +1,58 @@
-import os
+import logging
 import json
-from google import genai
-from google.genai import types
-from dotenv import load_dotenv
+from services.clients import genai_client as client
+from services.metrics import track_upstream, record_gemini_usage
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+GEMINI_MODEL = 'gemini-3-flash-preview'
 
+QUESTIONS_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "STRING"
+    }
+}
 
-def generate_clarifying_questions(trip_data: dict) -> list:
-    """
-    Generate 0-3 yes/no clarifying questions using Gemini to better tailor the itinerary.
+ITINERARY_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "day": {"type": "INTEGER"},
+            "date": {"type": "STRING"},
+            "activities": {
+                "type": "ARRAY",
+                "items": {
+                    "type": "OBJECT",
+                    "properties": {
+                        "time": {"type": "STRING"},
+                        "title": {"type": "STRING"},
+                        "description": {"type": "STRING"},
+                        "location": {"type": "STRING"},
+                        "country": {"type": "STRING"}
+                    },
+                    "required": ["time", "title", "description", "location", "country"]
+                }
+            }
+        },
+        "required": ["day", "date", "activities"]
+    }
+}
 
-    Args:
-        trip_data: dict with trip parameters (destination, dates, companions, etc.)
 
-    Returns:
-        list of dicts with 'id' and 'text' keys
-    """
+def _json_config(temperature: float, schema: dict):
+    # Imported here so google-genai isn't loaded until the first Gemini call
+    from google.genai import types
+
+    return types.GenerateContentConfig(
+        response_mime_type='application/json',
+        temperature=temperature,
+        response_schema=schema,
+    )
+
+
+def _questions_prompt(trip_data: dict) -> str:
     destination = trip_data.get('destination', '')
     start_date = trip_data.get('startDate', '')
     end_date = trip_data.get('endDate', '')
@@ -60,47 +94,61 @@ def generate_clarifying_questions(trip_data: dict) -> list:
         "- For simple city breaks or straightforward destinations, return an empty array\n\n"
         "Return a JSON array of question strings. Return [] if no questions are needed."
     )
+    return prompt_text
 
-    try:
-        response = client.models.generate_content(
-            model='gemini-3-flash-preview',
-            contents=prompt_text,
-            config=types.GenerateContentConfig(
-                response_mime_type='application/json',
-                temperature=0.3,
-                response_schema={
-                    "type": "ARRAY",
-                    "items": {
-                        "type": "STRING"
-                    }
-                }
-            )
-        )
-
-        questions_raw = json.loads(response.text)
-        # Limit to 3 questions max and format with IDs
-        questions = [
-            {"id": f"q{i}", "text": q}
-            for i, q in enumerate(questions_raw[:3])
-        ]
-        return questions
 
-    except Exception as e:
-        print(f"Failed to generate clarifying questions: {e}", flush=True)
-        return []
+def _parse_questions(text: str) -> list:
+    questions_raw = json.loads(text)
+    # Limit to 3 questions max and format with IDs
+    return [
+        {"id": f"q{i}", "text": q}
+        for i, q in enumerate(questions_raw[:3])
+    ]
 
 
-def generate_itinerary(trip_data: dict) -> dict:
+def generate_clarifying_questions(trip_data: dict) -> list:
     """
-    Generate a day-by-day itinerary using Gemini based on trip parameters.
+    Generate 0-3 yes/no clarifying questions using Gemini to better tailor the itinerary.
 
     Args:
-        trip_data: dict with keys: destination, startDate, endDate, currency,
-                   budgetAmount, companions, numberOfPeople, specificDestinations
+        trip_data: dict with trip parameters (destination, dates, companions, etc.)
 
     Returns:
-        dict with 'itinerary' (list of days) and 'countries' (list of country names)
+        list of dicts with 'id' and 'text' keys
     """
+    try:
+        with track_upstream("gemini", "questions"):
+            response = client.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=_questions_prompt(trip_data),
+                config=_json_config(0.3, QUESTIONS_SCHEMA),
+            )
+        record_gemini_usage("questions", response)
+        return _parse_questions(response.text)
+
+    except Exception as e:
+        logger.error("Failed to generate clarifying questions: %s", e)
+        return []
+
+
+async def generate_clarifying_questions_async(trip_data: dict) -> list:
+    """Async variant of generate_clarifying_questions, used by the ASGI app."""
+    try:
+        with track_upstream("gemini", "questions"):
+            response = await client.aio.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=_questions_prompt(trip_data),
+                config=_json_config(0.3, QUESTIONS_SCHEMA),
+            )
+        record_gemini_usage("questions", response)
+        return _parse_questions(response.text)
+
+    except Exception as e:
+        logger.error("Failed to generate clarifying questions: %s", e)
+        return []
+
+
+def _itinerary_prompt(trip_data: dict) -> str:
     destination = trip_data.get('destination', '')
     start_date = trip_data.get('startDate', '')
     end_date = trip_data.get('endDate', '')
@@ -168,58 +216,65 @@ def generate_itinerary(trip_data: dict) -> dict:
         "3. Activities match what each destination is actually known for.\n\n"
         "Return a JSON array of days, each containing a day number, date, and list of activities."
     )
+    return prompt_text
+
+
+def _parse_itinerary(text: str) -> dict:
+    itinerary = json.loads(text)
 
+    # Extract unique countries from all activities
+    countries = list(set(
+        activity.get('country', '')
+        for day in itinerary
+        for activity in day.get('activities', [])
+        if activity.get('country')
+    ))
+    countries.sort()
+
+    return {
+        "itinerary": itinerary,
+        "countries": countries
+    }
+
+
+def generate_itinerary(trip_data: dict) -> dict:
+    """
+    Generate a day-by-day itinerary using Gemini based on trip parameters.
+
+    Args:
+        trip_data: dict with keys: destination, startDate, endDate, currency,
+                   budgetAmount, companions, numberOfPeople, specificDestinations
+
+    Returns:
+        dict with 'itinerary' (list of days) and 'countries' (list of country names)
+    """
     try:
-        response = client.models.generate_content(
-            model='gemini-3-flash-preview',
-            contents=prompt_text,
-            config=types.GenerateContentConfig(
-                response_mime_type='application/json',
-                temperature=0.8,
-                response_schema={
-                    "type": "ARRAY",
-                    "items": {
-                        "type": "OBJECT",
-                        "properties": {
-                            "day": {"type": "INTEGER"},
-                            "date": {"type": "STRING"},
-                            "activities": {
-                                "type": "ARRAY",
-                                "items": {
-                                    "type": "OBJECT",
-                                    "properties": {
-                                        "time": {"type": "STRING"},
-                                        "title": {"type": "STRING"},
-                                        "description": {"type": "STRING"},
-                                        "location": {"type": "STRING"},
-                                        "country": {"type": "STRING"}
-                                    },
-                                    "required": ["time", "title", "description", "location", "country"]
-                                }
-                            }
-                        },
-                        "required": ["day", "date", "activities"]
-                    }
-                }
+        with track_upstream("gemini", "itinerary"):
+            response = client.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=_itinerary_prompt(trip_data),
+                config=_json_config(0.8, ITINERARY_SCHEMA),
             )
-        )
+        record_gemini_usage("itinerary", response)
+        return _parse_itinerary(response.text)
 
-        itinerary = json.loads(response.text)
+    except Exception as e:
+        logger.error("Itinerary generation failed: %s", e)
+        return {"error": str(e)}
 
-        # Extract unique countries from all activities
-        countries = list(set(
-            activity.get('country', '')
-            for day in itinerary
-            for activity in day.get('activities', [])
-            if activity.get('country')
-        ))
-        countries.sort()
 
-        return {
-            "itinerary": itinerary,
-            "countries": countries
-        }
+async def generate_itinerary_async(trip_data: dict) -> dict:
+    """Async variant of generate_itinerary, used by the ASGI app."""
+    try:
+        with track_upstream("gemini", "itinerary"):
+            response = await client.aio.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=_itinerary_prompt(trip_data),
+                config=_json_config(0.8, ITINERARY_SCHEMA),
+            )
+        record_gemini_usage("itinerary", response)
+        return _parse_itinerary(response.text)
 
     except Exception as e:
-        print(f"❌ Itinerary generation failed: {e}", flush=True)
+        logger.error("Itinerary generation failed: %s", e)
         return {"error": str(e)}
@@ -0,0 +1,315 @@
+"""
+Durable background jobs stored in the Supabase 'jobs' table.
+
+A job is a row with a kind, a JSON payload and a status. Handlers
+registered with @job_handler(kind) run on a small thread pool; each
+gunicorn worker also polls for jobs that are due (new, waiting to retry,
+or abandoned by a worker that died) and claims them with a
+compare-and-set on the attempts counter, so a job only runs in one place
+at a time. Handlers must be idempotent: a job may be re-run after a
+crash, and run_steps() records finished steps so retries skip them.
+
+Table schema:
+
+    create table jobs (
+        id text primary key,
+        kind text not null,
+        payload jsonb not null default '{}',
+        status text not null default 'pending',  -- pending | running | retry | done | dead
+        progress jsonb not null default '{}',
+        attempts integer not null default 0,
+        last_error text,
+        next_run_at timestamptz not null default now(),
+        locked_until timestamptz,
+        created_at timestamptz not null default now(),
+        updated_at timestamptz not null default now()
+    );
+"""
+import logging
+import os
+import time
+import uuid
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from services.database import supabase
+from services.metrics import JOBS_RUNNING, JOB_RESULTS
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", "15"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "5"))
+# How long a claimed job may run before another worker assumes it crashed
+JOB_LEASE_SECONDS = 600
+RETRY_BASE_SECONDS = 30
+
+JOB_HANDLERS = {}
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+_poller = None
+_poller_lock = threading.Lock()
+
+
+def job_handler(kind: str):
+    """Register a function as the handler for a job kind. It receives the job row."""
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def _timestamp(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def get_job(job_id: str) -> dict:
+    """Fetch a job row by id."""
+    try:
+        response = supabase.table("jobs").select("*").eq("id", job_id).limit(1).execute()
+        return response.data[0] if response.data else None
+    except Exception as e:
+        logger.error("Error fetching job: %s", e, extra={"job_id": job_id})
+        return None
+
+
+def enqueue_job(kind: str, payload: dict, job_id: str = None) -> dict:
+    """
+    Persist a job and start it in the background.
+
+    Passing a deterministic job_id makes enqueueing idempotent: if a job
+    with that id already exists it is returned unchanged.
+
+    Returns:
+        The job row, or None if it couldn't be stored
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"No handler registered for job kind {kind!r}")
+
+    job_id = job_id or f"{kind}:{uuid.uuid4()}"
+    try:
+        supabase.table("jobs").upsert(
+            {"id": job_id, "kind": kind, "payload": payload},
+            ignore_duplicates=True,
+        ).execute()
+    except Exception as e:
+        logger.error("Error enqueueing job: %s", e, extra={"job_kind": kind})
+        return None
+
+    job = get_job(job_id)
+    if job and job["status"] in ("pending", "retry"):
+        _executor.submit(_claim_and_run, job)
+    start_job_runner()
+    return job
+
+
+def requeue_dead_job(job_id: str) -> dict:
+    """
+    Give a dead-lettered job a fresh set of attempts and start it again.
+
+    Its progress is kept, so the new run resumes where the last one stopped.
+
+    Returns:
+        The job row (unchanged if it wasn't dead), or None if it couldn't be read
+    """
+    try:
+        response = (
+            supabase.table("jobs")
+            .update({
+                "status": "pending",
+                "attempts": 0,
+                "next_run_at": _timestamp(_now()),
+                "locked_until": None,
+                "updated_at": _timestamp(_now()),
+            })
+            .eq("id", job_id)
+            .eq("status", "dead")
+            .execute()
+        )
+    except Exception as e:
+        logger.error("Error requeueing job: %s", e, extra={"job_id": job_id})
+        return None
+
+    if not response.data:
+        return get_job(job_id)
+    job = response.data[0]
+    logger.info("Dead job requeued", extra={"job_id": job_id, "job_kind": job["kind"]})
+    _executor.submit(_claim_and_run, job)
+    start_job_runner()
+    return job
+
+
+def renew_job_lease(job: dict) -> bool:
+    """
+    Extend a running job's lease by JOB_LEASE_SECONDS from now.
+
+    Long handlers call this between units of work so other workers don't
+    take the job over while it is still making progress.
+
+    Returns:
+        False if the job was meanwhile claimed by another worker
+    """
+    response = (
+        supabase.table("jobs")
+        .update({
+            "locked_until": _timestamp(_now() + timedelta(seconds=JOB_LEASE_SECONDS)),
+            "updated_at": _timestamp(_now()),
+        })
+        .eq("id", job["id"])
+        .eq("attempts", job["attempts"])
+        .eq("status", "running")
+        .execute()
+    )
+    if not response.data:
+        logger.warning("Job lease lost to another worker", extra={"job_id": job["id"]})
+        return False
+    return True
+
+
+def update_job_progress(job: dict, progress: dict):
+    """Merge keys into a job's progress and persist it."""
+    job["progress"] = {**(job.get("progress") or {}), **progress}
+    supabase.table("jobs").update({
+        "progress": job["progress"],
+        "updated_at": _timestamp(_now()),
+    }).eq("id", job["id"]).execute()
+
+
+def run_steps(job: dict, steps: dict):
+    """
+    Run a job's independent steps concurrently, skipping ones already completed.
+
+    Args:
+        job: The job row; finished step names are recorded in progress['completed_steps']
+        steps: Mapping of step name -> zero-argument callable
+
+    Raises:
+        RuntimeError: If any step failed (after all of them have finished)
+    """
+    completed = set((job.get("progress") or {}).get("completed_steps", []))
+    todo = {name: fn for name, fn in steps.items() if name not in completed}
+    if not todo:
+        return
+
+    lock = threading.Lock()
+    errors = {}
+
+    def run(name, fn):
+        try:
+            fn()
+        except Exception as e:
+            errors[name] = str(e)
+            return
+        with lock:
+            completed.add(name)
+            update_job_progress(job, {"completed_steps": sorted(completed)})
+
+    with ThreadPoolExecutor(max_workers=len(todo)) as pool:
+        futures = {name: pool.submit(run, name, fn) for name, fn in todo.items()}
+
+    # A step whose completion couldn't be recorded isn't finished: it runs again on retry
+    for name, future in futures.items():
+        error = future.exception()
+        if error is not None:
+            errors[name] = f"completion not recorded: {error}"
+
+    if errors:
+        raise RuntimeError("; ".join(f"{name}: {error}" for name, error in sorted(errors.items())))
+
+
+def _claim(job: dict) -> dict:
+    """Atomically mark a job as running, unless another worker got there first."""
+    response = (
+        supabase.table("jobs")
+        .update({
+            "status": "running",
+            "attempts": job["attempts"] + 1,
+            "locked_until": _timestamp(_now() + timedelta(seconds=JOB_LEASE_SECONDS)),
+            "updated_at": _timestamp(_now()),
+        })
+        .eq("id", job["id"])
+        .eq("attempts", job["attempts"])
+        .execute()
+    )
+    return response.data[0] if response.data else None
+
+
+def _claim_and_run(job: dict):
+    try:
+        claimed = _claim(job)
+    except Exception as e:
+        logger.error("Error claiming job: %s", e, extra={"job_id": job["id"]})
+        return
+    if not claimed:
+        return
+
+    handler = JOB_HANDLERS.get(claimed["kind"])
+    running = JOBS_RUNNING.labels(claimed["kind"])
+    running.inc()
+    try:
+        if handler is None:
+            raise RuntimeError(f"No handler registered for job kind {claimed['kind']!r}")
+        handler(claimed)
+        update = {"status": "done", "last_error": None, "locked_until": None}
+    except Exception as e:
+        logger.warning("Job failed: %s", e, extra={"job_id": claimed["id"], "attempt": claimed["attempts"]})
+        if claimed["attempts"] >= JOB_MAX_ATTEMPTS:
+            update = {"status": "dead", "last_error": str(e), "locked_until": None}
+        else:
+            delay = RETRY_BASE_SECONDS * 2 ** (claimed["attempts"] - 1)
+            update = {
+                "status": "retry",
+                "last_error": str(e),
+                "locked_until": None,
+                "next_run_at": _timestamp(_now() + timedelta(seconds=delay)),
+            }
+    finally:
+        running.dec()
+
+    JOB_RESULTS.labels(claimed["kind"], update["status"]).inc()
+    update["updated_at"] = _timestamp(_now())
+    try:
+        supabase.table("jobs").update(update).eq("id", claimed["id"]).execute()
+    except Exception as e:
+        logger.error("Error recording job result: %s", e, extra={"job_id": claimed["id"]})
+
+
+def _due_jobs() -> list:
+    now = _timestamp(_now())
+    response = (
+        supabase.table("jobs")
+        .select("*")
+        .or_(
+            f"and(status.in.(pending,retry),next_run_at.lte.{now}),"
+            f"and(status.eq.running,locked_until.lt.{now})"
+        )
+        .order("next_run_at")
+        .limit(JOB_WORKERS * 4)
+        .execute()
+    )
+    return response.data or []
+
+
+def _poll_loop():
+    while True:
+        try:
+            for job in _due_jobs():
+                if job["kind"] in JOB_HANDLERS:
+                    _executor.submit(_claim_and_run, job)
+        except Exception as e:
+            logger.error("Error polling jobs: %s", e)
+        time.sleep(JOB_POLL_SECONDS)
+
+
+def start_job_runner():
+    """Start this worker's job poller (idempotent)."""
+    global _poller
+    if _poller is None:
+        with _poller_lock:
+            if _poller is None:
+                _poller = threading.Thread(target=_poll_loop, name="job-poller", daemon=True)
+                _poller.start()
@@ -0,0 +1,220 @@
+"""
+Prometheus metrics, served at /metrics.
+
+Under gunicorn every worker writes its samples to files in
+PROMETHEUS_MULTIPROC_DIR (set up by gunicorn.conf.py) and /metrics merges
+them, so a scrape sees the whole container whichever worker answers it.
+Without that variable (python app.py) metrics stay in process memory.
+"""
+import logging
+import os
+import time
+from functools import lru_cache
+from urllib.parse import urlparse
+from contextlib import contextmanager
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest,
+)
+
+logger = logging.getLogger(__name__)
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+# Route latencies span cached reads (ms) to Gemini calls (tens of seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+REQUEST_LATENCY = Histogram(
+    "voyager_http_request_duration_seconds",
+    "Time to handle an API request, by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+UPSTREAM_LATENCY = Histogram(
+    "voyager_upstream_request_duration_seconds",
+    "Time spent in calls to upstream services (Supabase, Gemini, Resend)",
+    ["dependency", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_ERRORS = Counter(
+    "voyager_upstream_errors_total",
+    "Failed upstream calls (exceptions, 429 and 5xx responses)",
+    ["dependency", "operation"],
+)
+UPSTREAM_CONNECTIONS = Counter(
+    "voyager_upstream_connections_opened_total",
+    "New connections opened by the shared HTTP transport (each one a TCP, usually TLS, handshake)",
+    ["dependency"],
+)
+
+GEMINI_TOKENS = Histogram(
+    "voyager_gemini_tokens",
+    "Tokens used per Gemini call",
+    ["operation", "kind"],
+    buckets=TOKEN_BUCKETS,
+)
+
+CACHE_REQUESTS = Counter(
+    "voyager_cache_requests_total",
+    "Per-user cache lookups",
+    ["cache", "result"],
+)
+CACHE_ENTRIES = Gauge(
+    "voyager_cache_entries",
+    "Entries held in the per-user caches, summed over live workers",
+    ["cache"],
+    multiprocess_mode="livesum",
+)
+CACHE_BYTES = Gauge(
+    "voyager_cache_bytes",
+    "Estimated size of the per-user caches, summed over live workers",
+    ["cache"],
+    multiprocess_mode="livesum",
+)
+
+JOBS_RUNNING = Gauge(
+    "voyager_jobs_running",
+    "Background jobs currently running, summed over live workers",
+    ["kind"],
+    multiprocess_mode="livesum",
+)
+JOB_RESULTS = Counter(
+    "voyager_jobs_total",
+    "Finished background job attempts, by outcome",
+    ["kind", "result"],
+)
+OUTBOX_RESULTS = Counter(
+    "voyager_outbox_emails_total",
+    "Outbox emails processed, by outcome",
+    ["kind", "result"],
+)
+QUEUE_DEPTH = Gauge(
+    "voyager_queue_depth",
+    "Rows waiting in the durable queues (sampled at scrape time)",
+    ["queue"],
+    multiprocess_mode="mostrecent",
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "voyager_log_records_dropped_total",
+    "Log records dropped because the log queue was full",
+)
+
+# Hosts of each upstream dependency, matched by suffix
+DEPENDENCY_HOSTS = (
+    ("supabase.co", "supabase"),
+    ("supabase.in", "supabase"),
+    ("googleapis.com", "gemini"),
+    ("resend.com", "resend"),
+)
+
+QUEUE_DEPTH_TTL_SECONDS = 15
+_queue_depth_sampled_at = 0.0
+
+
+@lru_cache(maxsize=64)
+def dependency_for_host(host: str) -> str:
+    """Which upstream service a host belongs to ('other' if none)."""
+    if host == urlparse(os.environ.get("SUPABASE_URL") or "").hostname:
+        return "supabase"
+    for suffix, dependency in DEPENDENCY_HOSTS:
+        if host == suffix or host.endswith("." + suffix):
+            return dependency
+    return "other"
+
+
+# PostgREST verbs, named like the supabase-py query builder methods
+POSTGREST_OPERATIONS = {"GET": "select", "HEAD": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+
+def upstream_operation(dependency: str, method: str, path: str) -> str:
+    """
+    A low-cardinality operation label for an upstream HTTP request, e.g.
+    'trips.select' for a PostgREST read or 'emails.batch' for Resend.
+    """
+    parts = [p for p in path.split("/") if p]
+    if dependency == "supabase":
+        if parts[:2] == ["rest", "v1"] and len(parts) > 2:
+            if parts[2] == "rpc":
+                return "rpc." + (parts[3] if len(parts) > 3 else "")
+            return f"{parts[2]}.{POSTGREST_OPERATIONS.get(method, method.lower())}"
+        # auth, storage, functions: the service name is enough
+        return parts[0] if parts else "root"
+    if dependency == "resend":
+        # /emails and /emails/batch; ids (/emails/<id>) collapse to the resource
+        if parts[1:2] == ["batch"]:
+            return f"{parts[0]}.batch"
+        return parts[0] if parts else "root"
+    return method.lower()
+
+
+@contextmanager
+def track_upstream(dependency: str, operation: str):
+    """Time a block that calls an upstream service, counting it as an error if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.labels(dependency, operation).inc()
+        raise
+    finally:
+        UPSTREAM_LATENCY.labels(dependency, operation).observe(time.perf_counter() - started)
+
+
+def record_gemini_usage(operation: str, response):
+    """Record the prompt and output token counts of a Gemini response."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for kind, field in (("prompt", "prompt_token_count"), ("output", "candidates_token_count"),
+                        ("thinking", "thoughts_token_count")):
+        count = getattr(usage, field, None)
+        if count:
+            GEMINI_TOKENS.labels(operation, kind).observe(count)
+
+
+def _sample_queue_depths():
+    """Count pending jobs and outbox emails, at most once per QUEUE_DEPTH_TTL_SECONDS."""
+    global _queue_depth_sampled_at
+    now = time.monotonic()
+    if now - _queue_depth_sampled_at < QUEUE_DEPTH_TTL_SECONDS:
+        return
+    _queue_depth_sampled_at = now
+
+    from services.clients import supabase
+
+    for queue, table, statuses in (
+        ("jobs", "jobs", ["pending", "retry", "running"]),
+        ("email_outbox", "email_outbox", ["pending", "sending"]),
+    ):
+        try:
+            response = (
+                supabase.table(table)
+                .select("id", count="exact")
+                .in_("status", statuses)
+                .limit(1)
+                .execute()
+            )
+            QUEUE_DEPTH.labels(queue).set(response.count or 0)
+        except Exception as e:
+            logger.warning("Error sampling queue depth: %s", e, extra={"queue": queue})
+
+
+def render_metrics() -> tuple:
+    """
+    Render every worker's metrics in the Prometheus text format.
+
+    Returns:
+        (body, content type)
+    """
+    _sample_queue_depths()
+
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,248 @@
+"""
+Weekly newsletter campaigns, run as durable background jobs.
+
+A campaign is a 'newsletter' job (see services/jobs) whose id is the
+campaign id. Its recipients and their delivery status live in the
+'campaign_recipients' table:
+
+    create table campaign_recipients (
+        campaign_id text not null,
+        user_id text not null,
+        email text not null,
+        name text,
+        status text not null default 'pending',  -- pending | sent | retry | failed
+        message_id text,
+        error text,
+        updated_at timestamptz not null default now(),
+        primary key (campaign_id, user_id)
+    );
+
+Each recipient's email is sent under the idempotency key
+newsletter/{campaign_id}/{user_id}, so however a resumed or retried
+campaign pages its recipients, Resend never delivers one twice.
+"""
+import time
+import logging
+from datetime import datetime, timezone
+from services.database import supabase, get_random_batch
+from services.subscribers_service import iter_subscribers, ensure_subscribers, SUBSCRIBERS_PAGE_SIZE
+from services.email_service import build_weekly_newsletter, send_bulk
+from services.jobs import job_handler, enqueue_job, requeue_dead_job, renew_job_lease, get_job, update_job_progress
+
+logger = logging.getLogger(__name__)
+
+# Recipients sent per page (one Resend request each); the job lease is renewed after every page
+CAMPAIGN_PAGE_SIZE = 200
+# Extra passes over recipients whose send failed transiently, and the wait before the first
+CAMPAIGN_RETRY_ROUNDS = 3
+CAMPAIGN_RETRY_DELAY_SECONDS = 60
+RECIPIENT_STATUSES = ("pending", "sent", "retry", "failed")
+
+
+def current_campaign_id() -> str:
+    """The default campaign id: one weekly newsletter per ISO week."""
+    year, week, _ = datetime.now(timezone.utc).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def campaign_job_id(campaign_id: str) -> str:
+    return f"newsletter:{campaign_id}"
+
+
+def start_campaign(campaign_id: str = None) -> dict:
+    """
+    Start (or return the already started) newsletter campaign.
+
+    Starting the same campaign twice returns the existing job, so a
+    repeated cron hit never sends the newsletter twice. A campaign that
+    ran out of attempts is restarted instead; it resumes with the
+    recipients still pending.
+    """
+    campaign_id = campaign_id or current_campaign_id()
+    job = enqueue_job("newsletter", {"campaign_id": campaign_id}, job_id=campaign_job_id(campaign_id))
+    if job and job["status"] == "dead":
+        job = requeue_dead_job(job["id"])
+    return job
+
+
+def get_campaign_progress(campaign_id: str) -> dict:
+    """
+    Fetch a campaign's job status and recipient counts per delivery status.
+
+    Returns:
+        Dict with 'job' (the job row) and 'counts', or None if the campaign doesn't exist
+    """
+    job = get_job(campaign_job_id(campaign_id))
+    if not job:
+        return None
+
+    counts = {}
+    try:
+        for status in RECIPIENT_STATUSES:
+            response = (
+                supabase.table("campaign_recipients")
+                .select("user_id", count="exact")
+                .eq("campaign_id", campaign_id)
+                .eq("status", status)
+                .limit(1)
+                .execute()
+            )
+            counts[status] = response.count or 0
+    except Exception as e:
+        logger.error("Error counting campaign recipients: %s", e, extra={"campaign_id": campaign_id})
+
+    return {"job": job, "counts": counts}
+
+
+def _load_recipients(campaign_id: str):
+    """Snapshot the current subscribers into the campaign's recipient list."""
+    total = 0
+    page = []
+    for user in iter_subscribers():
+        page.append({"campaign_id": campaign_id, "user_id": user["id"], "email": user["email"], "name": user["name"]})
+        if len(page) == SUBSCRIBERS_PAGE_SIZE:
+            _insert_recipients(page)
+            total += len(page)
+            page = []
+    if page:
+        _insert_recipients(page)
+        total += len(page)
+    return total
+
+
+def _insert_recipients(rows: list):
+    # Existing rows keep their status, so a resumed load doesn't reset delivered recipients
+    supabase.table("campaign_recipients").upsert(rows, ignore_duplicates=True).execute()
+
+
+def _pending_recipients(campaign_id: str) -> list:
+    # Ordered by user_id so a page re-read after a crash forms the same batches
+    # (and therefore the same idempotency keys) as before
+    response = (
+        supabase.table("campaign_recipients")
+        .select("user_id, email, name")
+        .eq("campaign_id", campaign_id)
+        .eq("status", "pending")
+        .order("user_id")
+        .limit(CAMPAIGN_PAGE_SIZE)
+        .execute()
+    )
+    return response.data or []
+
+
+def _recipient_status(outcome: dict) -> str:
+    # Sends that failed for a reason other than the message itself get another pass
+    if outcome["status"] == "failed" and not outcome.get("permanent"):
+        return "retry"
+    return outcome["status"]
+
+
+def _record_outcomes(campaign_id: str, recipients: list, outcomes: list):
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    rows = [
+        {
+            "campaign_id": campaign_id,
+            "user_id": recipient["user_id"],
+            "email": recipient["email"],
+            "name": recipient["name"],
+            "status": _recipient_status(outcome),
+            "message_id": outcome.get("id"),
+            "error": outcome.get("error"),
+            "updated_at": now,
+        }
+        for recipient, outcome in zip(recipients, outcomes)
+    ]
+    supabase.table("campaign_recipients").upsert(rows).execute()
+
+
+def _has_recipients(campaign_id: str, status: str) -> bool:
+    response = (
+        supabase.table("campaign_recipients")
+        .select("user_id")
+        .eq("campaign_id", campaign_id)
+        .eq("status", status)
+        .limit(1)
+        .execute()
+    )
+    return bool(response.data)
+
+
+def _move_recipients(campaign_id: str, from_status: str, to_status: str) -> int:
+    response = (
+        supabase.table("campaign_recipients")
+        .update({"status": to_status, "updated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")})
+        .eq("campaign_id", campaign_id)
+        .eq("status", from_status)
+        .execute()
+    )
+    return len(response.data or [])
+
+
+@job_handler("newsletter")
+def _run_campaign(job: dict):
+    """
+    Send a campaign to every pending recipient, one page at a time.
+
+    Each recipient gets the four unsaved destinations that best match the
+    tags of what they've saved, scored for the whole page at once by the
+    Personalizer; recipients with no saves get the campaign's default
+    destinations. The defaults and recipient list are fixed on the first
+    run and reused on resume. Each page's outcomes are written back before the
+    next page is read, so a crash repeats at most the page in flight, and
+    the per-recipient idempotency keys drop the emails from it that were
+    already accepted.
+
+    Recipients whose send failed transiently (status 'retry') are sent
+    again in up to CAMPAIGN_RETRY_ROUNDS later passes, with growing
+    delays; those still failing after the last pass are marked 'failed'.
+    """
+    campaign_id = job["payload"]["campaign_id"]
+    progress = job.get("progress") or {}
+
+    destinations = progress.get("destinations")
+    if not destinations:
+        destinations = get_random_batch(limit=4)
+        if not destinations:
+            raise RuntimeError("No destinations available to send")
+        update_job_progress(job, {"destinations": destinations})
+
+    if "recipients" not in progress:
+        # The first campaign may run before any reconcile has filled the index
+        ensure_subscribers()
+        total = _load_recipients(campaign_id)
+        update_job_progress(job, {"recipients": total})
+        logger.info("Campaign recipients loaded", extra={"campaign_id": campaign_id, "recipients": total})
+
+    # numpy/scipy are only needed here, so they aren't imported at startup
+    from services.personalization import Personalizer
+
+    personalizer = Personalizer(seed=campaign_id)
+
+    while True:
+        recipients = _pending_recipients(campaign_id)
+        if not recipients:
+            if not _has_recipients(campaign_id, "retry"):
+                break
+            retry_round = (job.get("progress") or {}).get("retry_round", 0)
+            if retry_round >= CAMPAIGN_RETRY_ROUNDS:
+                failed = _move_recipients(campaign_id, "retry", "failed")
+                if failed:
+                    logger.warning("Campaign recipients failed after retries", extra={"campaign_id": campaign_id, "failed": failed})
+                break
+            # Wait out rate limits and provider outages before the next pass
+            time.sleep(CAMPAIGN_RETRY_DELAY_SECONDS * 2 ** retry_round)
+            renew_job_lease(job)
+            retrying = _move_recipients(campaign_id, "retry", "pending")
+            update_job_progress(job, {"retry_round": retry_round + 1})
+            logger.info("Retrying campaign recipients", extra={"campaign_id": campaign_id, "recipients": retrying, "round": retry_round + 1})
+            continue
+
+        personalized = personalizer.top_destinations([r["user_id"] for r in recipients], k=4)
+        messages = [
+            build_weekly_newsletter(r["email"], r["name"], personalized.get(r["user_id"]) or destinations)
+            for r in recipients
+        ]
+        outcomes = send_bulk(messages, idempotency_keys=[f"newsletter/{campaign_id}/{r['user_id']}" for r in recipients])
+        _record_outcomes(campaign_id, recipients, outcomes)
+        # A large campaign outlives one lease; keep it while pages are going out
+        renew_job_lease(job)
@@ -0,0 +1,221 @@
+"""
+Outbox for transactional emails.
+
+Request handlers record an email intent in the 'email_outbox' table and
+return; a dispatcher thread in each worker drains due rows in batches,
+renders them, sends them through the Resend batch API and records the
+outcome. Failed rows are retried with backoff and dead-lettered
+(status 'dead') after OUTBOX_MAX_ATTEMPTS. Every claim counts as an
+attempt, so a row whose send keeps crashing its worker is dead-lettered
+too. Each email is sent under its row id as idempotency key, so a row
+sent before a crash is never sent again, however rows are regrouped.
+
+    create table email_outbox (
+        id uuid primary key default gen_random_uuid(),
+        kind text not null,
+        to_email text not null,
+        payload jsonb not null default '{}',
+        status text not null default 'pending',  -- pending | sending | sent | dead
+        attempts integer not null default 0,
+        next_attempt_at timestamptz not null default now(),
+        claimed_until timestamptz,
+        last_error text,
+        created_at timestamptz not null default now(),
+        sent_at timestamptz
+    );
+"""
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from services.database import supabase, get_destinations_by_tags
+from services.email_service import build_welcome_email, send_bulk
+from services.metrics import OUTBOX_RESULTS
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_POLL_SECONDS = float(os.environ.get("OUTBOX_POLL_SECONDS", "5"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "6"))
+# How long a dispatcher may hold claimed rows before another worker takes them over
+OUTBOX_CLAIM_SECONDS = 120
+# Rows claimed per round; each is one Resend request, so this must send well within the claim
+OUTBOX_BATCH_SIZE = 50
+RETRY_BASE_SECONDS = 30
+
+_wakeup = threading.Event()
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def _timestamp(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _render_welcome(row: dict, cache: dict) -> dict:
+    payload = row.get("payload") or {}
+    tags = payload.get("tags") or []
+    destinations = None
+    if tags:
+        # Many sign-ups in a batch pick the same tags: look each tag set up once
+        key = ("welcome", tuple(sorted(tags)))
+        if key not in cache:
+            cache[key] = get_destinations_by_tags(tags, limit=4)
+        destinations = cache[key]
+    return build_welcome_email(row["to_email"], payload.get("name", "Traveler"), destinations)
+
+
+# Builds the Resend message for each outbox kind, at dispatch time. Renderers
+# get the row and a dict shared by the batch for caching lookups.
+OUTBOX_RENDERERS = {
+    "welcome": _render_welcome,
+}
+
+
+def enqueue_email(kind: str, to_email: str, payload: dict = None) -> dict:
+    """
+    Record an email to be sent in the background.
+
+    Returns:
+        The outbox row, or None if it couldn't be stored
+    """
+    if kind not in OUTBOX_RENDERERS:
+        raise ValueError(f"Unknown outbox email kind {kind!r}")
+
+    try:
+        response = supabase.table("email_outbox").insert({
+            "kind": kind,
+            "to_email": to_email,
+            "payload": payload or {},
+        }).execute()
+    except Exception as e:
+        logger.error("Error queueing email: %s", e, extra={"email_kind": kind})
+        return None
+
+    start_outbox_dispatcher()
+    _wakeup.set()
+    return response.data[0] if response.data else None
+
+
+def _claim_due(now: datetime) -> list:
+    """Claim up to OUTBOX_BATCH_SIZE due rows for this dispatcher, counting an attempt for each."""
+    stamp = _timestamp(now)
+    response = (
+        supabase.table("email_outbox")
+        .select("id, status, attempts")
+        .or_(f"and(status.eq.pending,next_attempt_at.lte.{stamp}),and(status.eq.sending,claimed_until.lt.{stamp})")
+        .order("next_attempt_at")
+        .limit(OUTBOX_BATCH_SIZE)
+        .execute()
+    )
+    candidates = response.data or []
+    if not candidates:
+        return []
+
+    groups = {}
+    for row in candidates:
+        groups.setdefault((row["status"], row["attempts"]), []).append(row["id"])
+
+    claimed = []
+    claimed_until = _timestamp(now + timedelta(seconds=OUTBOX_CLAIM_SECONDS))
+    for (status, attempts), ids in groups.items():
+        # The status and attempts filters make the claim a compare-and-set:
+        # rows another dispatcher claimed in the meantime are not returned
+        query = (
+            supabase.table("email_outbox")
+            .update({"status": "sending", "claimed_until": claimed_until, "attempts": attempts + 1})
+            .in_("id", ids)
+            .eq("status", status)
+            .eq("attempts", attempts)
+        )
+        if status == "sending":
+            query = query.lt("claimed_until", stamp)
+        claimed.extend(query.execute().data or [])
+    return claimed
+
+
+def _mark_failed(row: dict, error: str, now: datetime, permanent: bool = False):
+    # The claim already counted this attempt
+    attempts = row["attempts"]
+    # Retrying can't fix a message Resend rejected as invalid
+    if permanent or attempts >= OUTBOX_MAX_ATTEMPTS:
+        update = {"status": "dead", "attempts": attempts, "last_error": error, "claimed_until": None}
+        logger.error("Outbox email dead-lettered: %s", error, extra={"outbox_id": row["id"], "attempts": attempts})
+    else:
+        delay = RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+        update = {
+            "status": "pending",
+            "attempts": attempts,
+            "last_error": error,
+            "claimed_until": None,
+            "next_attempt_at": _timestamp(now + timedelta(seconds=delay)),
+        }
+    supabase.table("email_outbox").update(update).eq("id", row["id"]).execute()
+    OUTBOX_RESULTS.labels(row["kind"], "dead" if update["status"] == "dead" else "retry").inc()
+
+
+def drain_outbox() -> int:
+    """
+    Send one batch of due outbox emails.
+
+    Returns:
+        The number of rows processed (0 when the outbox is empty)
+    """
+    now = datetime.now(timezone.utc)
+    rows = _claim_due(now)
+    if not rows:
+        return 0
+
+    messages, sendable, cache = [], [], {}
+    for row in rows:
+        if row["attempts"] > OUTBOX_MAX_ATTEMPTS:
+            # Its last attempt's claim expired without an outcome: the send kept crashing the worker
+            _mark_failed(row, row.get("last_error") or "Claim expired on the final attempt", now, permanent=True)
+            continue
+        try:
+            messages.append(OUTBOX_RENDERERS[row["kind"]](row, cache))
+            sendable.append(row)
+        except Exception as e:
+            _mark_failed(row, f"Render failed: {e}", now)
+
+    if messages:
+        # Keyed by row, so Resend drops a row that was already sent before a crash
+        outcomes = send_bulk(messages, idempotency_keys=[f"outbox/{row['id']}" for row in sendable])
+
+        sent_ids = []
+        for row, outcome in zip(sendable, outcomes):
+            if outcome["status"] == "sent":
+                sent_ids.append(row["id"])
+                OUTBOX_RESULTS.labels(row["kind"], "sent").inc()
+            else:
+                _mark_failed(row, outcome.get("error") or "unknown error", now, outcome.get("permanent", False))
+
+        if sent_ids:
+            supabase.table("email_outbox").update({
+                "status": "sent",
+                "sent_at": _timestamp(datetime.now(timezone.utc)),
+                "claimed_until": None,
+            }).in_("id", sent_ids).execute()
+
+    return len(rows)
+
+
+def _dispatch_loop():
+    while True:
+        try:
+            # Keep draining while there's a backlog, then wait for new mail or the next poll
+            while drain_outbox():
+                pass
+        except Exception as e:
+            logger.error("Error draining email outbox: %s", e)
+        _wakeup.wait(OUTBOX_POLL_SECONDS)
+        _wakeup.clear()
+
+
+def start_outbox_dispatcher():
+    """Start this worker's outbox dispatcher (idempotent)."""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = threading.Thread(target=_dispatch_loop, name="email-outbox", daemon=True)
+                _dispatcher.start()
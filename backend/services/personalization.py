@@ -0,0 +1,149 @@
+import logging
+import zlib
+import numpy as np
+from scipy import sparse
+from services.database import supabase
+
+logger = logging.getLogger(__name__)
+
+# Fetch page size for the full-table reads done once per campaign
+FETCH_PAGE_SIZE = 1000
+# Users scored per matrix multiplication, bounding the dense score block to
+# SCORE_CHUNK_USERS x number of destinations float32 values
+SCORE_CHUNK_USERS = 2048
+# Tiny random jitter so ties between equally scored destinations vary per user
+TIE_BREAK_NOISE = 1e-3
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    """Mix uint64 values into well-distributed uint64 hashes (wrapping arithmetic)."""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _hash_ids(values) -> np.ndarray:
+    return np.fromiter((zlib.crc32(str(v).encode()) for v in values), dtype=np.uint64)
+
+DESTINATION_COLUMNS = "id, name, location, description, tags, image_url, country, region"
+
+
+def _fetch_all(table: str, columns: str, order: str) -> list:
+    rows = []
+    start = 0
+    while True:
+        response = (
+            supabase.table(table)
+            .select(columns)
+            .order(order)
+            .range(start, start + FETCH_PAGE_SIZE - 1)
+            .execute()
+        )
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < FETCH_PAGE_SIZE:
+            return rows
+        start += FETCH_PAGE_SIZE
+
+
+class Personalizer:
+    """
+    Scores every destination for many users at once with sparse matrices.
+
+    Built once per campaign from one read of the destinations and
+    saved_destinations tables:
+
+        D  destinations x tags   (1 where the destination has the tag)
+        S  users x destinations  (1 where the user saved the destination)
+        U = S @ D                users x tags, the user's tag frequencies -
+                                 the same signal the frontend uses for the
+                                 personalized feed
+        scores = U @ D.T         users x destinations
+
+    Already saved destinations are excluded, and each user's best k are
+    picked with argpartition instead of a full sort.
+    """
+
+    def __init__(self, seed: str = ""):
+        self.destinations = _fetch_all("destinations", DESTINATION_COLUMNS, "id")
+        saves = _fetch_all("saved_destinations", "user_id, destination_id", "user_id")
+
+        dest_index = {str(d["id"]): i for i, d in enumerate(self.destinations)}
+        tag_index = {}
+        rows, cols = [], []
+        for i, dest in enumerate(self.destinations):
+            for tag in {t.lower() for t in dest.get("tags") or []}:
+                rows.append(i)
+                cols.append(tag_index.setdefault(tag, len(tag_index)))
+        self.dest_tags = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(self.destinations), max(len(tag_index), 1)),
+        )
+
+        self.user_index = {}
+        rows, cols = [], []
+        for save in saves:
+            col = dest_index.get(str(save["destination_id"]))
+            if col is None:
+                continue
+            rows.append(self.user_index.setdefault(save["user_id"], len(self.user_index)))
+            cols.append(col)
+        self.saved = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(max(len(self.user_index), 1), len(self.destinations)),
+        )
+        self.saved.sum_duplicates()
+        self.saved.data[:] = 1
+
+        self.user_tags = (self.saved @ self.dest_tags).tocsr()
+        # Tie-break noise is a hash of (seed, user, destination), not a random
+        # stream, so a user's picks don't depend on which page they are scored in
+        self.seed = seed
+        self.dest_hashes = _hash_ids(d["id"] for d in self.destinations)
+        logger.info("Personalizer built", extra={
+            "users": len(self.user_index),
+            "destinations": len(self.destinations),
+            "tags": len(tag_index),
+        })
+
+    def _tie_break_noise(self, user_ids: list) -> np.ndarray:
+        """Deterministic noise in [0, TIE_BREAK_NOISE) per (user, destination)."""
+        user_hashes = _splitmix64(_hash_ids(f"{self.seed}:{u}" for u in user_ids))
+        mixed = _splitmix64(user_hashes[:, None] ^ self.dest_hashes[None, :])
+        return (mixed >> np.uint64(40)).astype(np.float32) / np.float32(1 << 24) * TIE_BREAK_NOISE
+
+    def top_destinations(self, user_ids: list, k: int = 4) -> dict:
+        """
+        Pick each user's k best-matching destinations they haven't saved.
+
+        Returns:
+            Dict of user_id -> list of destination rows, best first. Users
+            with no saved destinations (nothing to personalize on) are omitted.
+        """
+        known = [u for u in user_ids if u in self.user_index]
+        if not known or not self.destinations:
+            return {}
+        k = min(k, len(self.destinations))
+
+        result = {}
+        for start in range(0, len(known), SCORE_CHUNK_USERS):
+            chunk = known[start:start + SCORE_CHUNK_USERS]
+            rows = np.fromiter((self.user_index[u] for u in chunk), dtype=np.int64, count=len(chunk))
+
+            scores = (self.user_tags[rows] @ self.dest_tags.T).toarray()
+            scores += self._tie_break_noise(chunk)
+            saved = self.saved[rows].nonzero()
+            scores[saved] = -np.inf
+
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+            for user_id, picks, picked_scores in zip(chunk, top, top_scores):
+                result[user_id] = [
+                    self.destinations[i] for i, s in zip(picks, picked_scores) if np.isfinite(s)
+                ]
+        return result
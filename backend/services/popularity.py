@@ -0,0 +1,194 @@
+import logging
+import os
+import json
+import time
+import heapq
+import tempfile
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; flushes are then unsynchronised
+    fcntl = None
+
+POPULARITY_PATH = os.environ.get(
+    "POPULARITY_PATH", os.path.join(tempfile.gettempdir(), "voyager-popularity.json")
+)
+HALF_LIFE_SECONDS = float(os.environ.get("POPULARITY_HALF_LIFE_DAYS", "7")) * 86400
+FLUSH_INTERVAL_SECONDS = float(os.environ.get("POPULARITY_FLUSH_SECONDS", "30"))
+# Rebase stored weights once the epoch is this many half-lives old, long before floats overflow
+REBASE_AFTER_HALF_LIVES = 256
+
+
+def _timestamp(at) -> float:
+    """Epoch seconds of a timestamp given as seconds or an ISO string (e.g. a row's created_at)."""
+    if not isinstance(at, str):
+        return float(at)
+    text = at.replace("Z", "+00:00")
+    # Python 3.9 only parses fractions of exactly 3 or 6 digits
+    head, dot, rest = text.partition(".")
+    if dot:
+        digits = len(rest) - len(rest.lstrip("0123456789"))
+        text = f"{head}.{rest[:digits][:6].ljust(6, '0')}{rest[digits:]}"
+    return datetime.fromisoformat(text).timestamp()
+
+
+class PopularityStore:
+    """
+    Time-decayed save counters per destination.
+
+    Uses forward decay: a save at time t adds 2^((t - epoch) / half_life)
+    to the destination's weight, so weights never need to be decayed in
+    place and relative order doesn't change as time passes. The current
+    decayed count is weight / 2^((now - epoch) / half_life).
+
+    Because weights are additive, each gunicorn worker keeps its own
+    pending deltas and periodically merges them into a shared JSON file
+    under a file lock, then picks up the other workers' totals.
+    """
+
+    def __init__(self, path: str = POPULARITY_PATH, half_life: float = HALF_LIFE_SECONDS):
+        self.path = path
+        self.half_life = half_life
+        self.epoch = time.time()
+        self._totals = {}
+        self._pending = {}
+        self._top = None
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._load()
+
+    def _scale(self, at: float) -> float:
+        return 2 ** ((at - self.epoch) / self.half_life)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            self.epoch = state["epoch"]
+            self._totals = state["weights"]
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable popularity file: %s", e, extra={"path": self.path})
+
+    def record(self, destination_id, delta: int = 1, at=None):
+        """
+        Record a save (+1) or unsave (-1) of a destination.
+
+        Args:
+            destination_id: The destination
+            delta: +1 for a save, -1 for an unsave
+            at: When the save was made (epoch seconds or ISO string, default now).
+                Pass the removed save's created_at for an unsave so it takes back
+                exactly the weight the save added.
+        """
+        key = str(destination_id)
+        try:
+            at = time.time() if at is None else _timestamp(at)
+        except (TypeError, ValueError) as e:
+            logger.warning("Ignoring unparseable popularity timestamp %r: %s", at, e)
+            at = time.time()
+        weight = delta * self._scale(at)
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0.0) + weight
+            self._totals[key] = max(self._totals.get(key, 0.0) + weight, 0.0)
+            self._top = None
+        self._ensure_flusher()
+
+    def score(self, destination_id) -> float:
+        """Current decayed save count for a destination."""
+        with self._lock:
+            weight = self._totals.get(str(destination_id), 0.0)
+        return weight / self._scale(time.time())
+
+    def top(self, k: int = 10) -> list:
+        """
+        Return the k most popular destinations as (destination_id, score) pairs.
+
+        The ranking is cached until the next recorded event, so repeated
+        reads cost a slice of a list.
+        """
+        self._ensure_flusher()
+        with self._lock:
+            if self._top is None or len(self._top) < k <= len(self._totals):
+                self._top = heapq.nlargest(max(k, 50), self._totals.items(), key=lambda item: item[1])
+            ranking = self._top[:k]
+        scale = self._scale(time.time())
+        return [(destination_id, weight / scale) for destination_id, weight in ranking if weight > 0]
+
+    def flush(self):
+        """Merge pending deltas into the shared file and reload everyone's totals."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        lock_file = None
+        try:
+            lock_file = open(self.path + ".lock", "w")
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            try:
+                with open(self.path) as f:
+                    state = json.load(f)
+            except (FileNotFoundError, ValueError):
+                state = {"epoch": self.epoch, "weights": {}}
+
+            # Pending weights were scaled against our epoch; convert to the file's
+            ratio = 2 ** ((self.epoch - state["epoch"]) / self.half_life)
+            weights = state["weights"]
+            for key, weight in pending.items():
+                weights[key] = max(weights.get(key, 0.0) + weight * ratio, 0.0)
+
+            epoch = state["epoch"]
+            now = time.time()
+            if (now - epoch) / self.half_life > REBASE_AFTER_HALF_LIVES:
+                shrink = 2 ** ((now - epoch) / self.half_life)
+                weights = {key: w / shrink for key, w in weights.items()}
+                epoch = now
+            weights = {key: w for key, w in weights.items() if w > 0}
+
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"epoch": epoch, "weights": weights}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            # Put the deltas back so they are retried on the next flush
+            with self._lock:
+                for key, weight in pending.items():
+                    self._pending[key] = self._pending.get(key, 0.0) + weight
+            logger.error("Error persisting popularity counters: %s", e)
+            return
+        finally:
+            if lock_file:
+                lock_file.close()
+
+        with self._lock:
+            # Events recorded during the flush are still pending; keep them visible
+            ratio = 2 ** ((self.epoch - epoch) / self.half_life)
+            self._totals = dict(weights)
+            for key, weight in self._pending.items():
+                self._totals[key] = max(self._totals.get(key, 0.0) + weight * ratio, 0.0)
+            self._pending = {key: weight * ratio for key, weight in self._pending.items()}
+            self.epoch = epoch
+            self._top = None
+
+    def _ensure_flusher(self):
+        if self._flusher is None:
+            with self._lock:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(
+                        target=self._flush_loop, name="popularity-flusher", daemon=True
+                    )
+                    self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL_SECONDS)
+            self.flush()
+
+
+popularity = PopularityStore()
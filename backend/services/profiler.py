@@ -0,0 +1,228 @@
+"""
+Opt-in sampling profiler for slow requests.
+
+While a request runs, a background thread samples its stack every
+PROFILE_INTERVAL_MS. When the request ends the samples are thrown away,
+unless it took longer than PROFILE_SLOW_MS or was picked by
+PROFILE_SAMPLE_RATE, in which case they are written as a profile to a
+bounded ring of files in PROFILE_DIR, shared by all workers.
+
+Each profile holds collapsed stacks ("a;b;c <count>", the input format
+of flamegraph.pl and speedscope), the time spent inside each service
+function, and how the samples split between Python work and waiting on
+sockets (Supabase, Gemini, Resend).
+
+Nothing runs unless PROFILE_ENABLED=1.
+"""
+import logging
+import os
+import sys
+import json
+import time
+import queue
+import random
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; ring slots are then picked without a lock
+    fcntl = None
+
+PROFILE_ENABLED = os.environ.get("PROFILE_ENABLED", "").lower() in ("1", "true", "yes")
+PROFILE_SLOW_MS = float(os.environ.get("PROFILE_SLOW_MS", "1000"))
+# Fraction of requests profiled regardless of latency
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "/tmp/voyager-profiles")
+PROFILE_RING_SIZE = int(os.environ.get("PROFILE_RING_SIZE", "200"))
+MAX_STACK_DEPTH = 128
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+# A sample whose innermost frame is in one of these modules is waiting on the network
+WAIT_MODULES = {"socket", "ssl", "selectors"}
+WAIT_PATH_MARKERS = (os.sep + "httpcore" + os.sep + "_backends" + os.sep,)
+
+_labels = {}
+
+
+def _frame_label(code) -> str:
+    """'module:function' for a code object, e.g. services.trips_service:get_user_trips."""
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename
+        if path.startswith(BACKEND_DIR):
+            module = path[len(BACKEND_DIR):].rsplit(".", 1)[0].replace(os.sep, ".")
+        else:
+            module = os.path.basename(path).rsplit(".", 1)[0]
+        label = _labels[code] = f"{module}:{code.co_name}"
+    return label
+
+
+def _is_waiting(code) -> bool:
+    return (
+        os.path.basename(code.co_filename).rsplit(".", 1)[0] in WAIT_MODULES
+        or any(marker in code.co_filename for marker in WAIT_PATH_MARKERS)
+    )
+
+
+class StackSampler:
+    """Samples the stacks of registered threads on a timer, only while any are registered."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._active = {}
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, ident: int):
+        self._active[ident] = Counter()
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                    self._thread.start()
+        self._wakeup.set()
+
+    def stop(self, ident: int) -> Counter:
+        return self._active.pop(ident, None) or Counter()
+
+    def _run(self):
+        while True:
+            if not self._active:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            time.sleep(self.interval)
+
+            frames = sys._current_frames()
+            for ident, samples in list(self._active.items()):
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                if stack:
+                    # Code objects are cheap to hash; labels are only built for kept profiles
+                    samples[tuple(stack)] += 1
+
+
+class ProfileRing:
+    """The last PROFILE_RING_SIZE profiles, as slot files shared by every worker."""
+
+    def __init__(self, directory: str, size: int):
+        self.directory = directory
+        self.size = size
+
+    def _next_slot(self) -> int:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "ring.idx"), "a+") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            counter = int(f.read() or 0)
+            f.seek(0)
+            f.truncate()
+            f.write(str(counter + 1))
+        return counter % self.size
+
+    def append(self, profile: dict):
+        path = os.path.join(self.directory, f"profile-{self._next_slot():04d}.json")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(profile, f)
+        os.replace(tmp, path)
+
+    def list(self) -> list:
+        """Every stored profile, newest first."""
+        profiles = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        for name in names:
+            if not (name.startswith("profile-") and name.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Being replaced right now
+        profiles.sort(key=lambda p: p["startedAt"], reverse=True)
+        return profiles
+
+    def get(self, profile_id: str) -> dict:
+        return next((p for p in self.list() if p["id"] == profile_id), None)
+
+
+def build_profile(samples: Counter, info: dict) -> dict:
+    """Turn raw samples into a stored profile: collapsed stacks plus per-service and wait/CPU splits."""
+    collapsed = Counter()
+    services = Counter()
+    waiting = 0
+    for stack, count in samples.items():
+        labels = [_frame_label(code) for code in reversed(stack)]
+        collapsed[";".join(labels)] += count
+        # Inclusive time: each service function counts once per sample it appears in
+        for label in {label for label in labels if label.startswith("services.")}:
+            services[label] += count
+        if _is_waiting(stack[0]):
+            waiting += count
+
+    total = sum(samples.values())
+    # The sampler ticks late while a busy thread holds the GIL, so spread the
+    # measured duration over the samples instead of assuming the nominal interval
+    interval_ms = info["durationMs"] / total if total else PROFILE_INTERVAL_MS
+    return {
+        **info,
+        "sampleIntervalMs": round(interval_ms, 2),
+        "samples": total,
+        "waitingMs": round(waiting * interval_ms, 1),
+        "pythonMs": round((total - waiting) * interval_ms, 1),
+        "services": {label: round(count * interval_ms, 1) for label, count in services.most_common(25)},
+        "collapsed": "\n".join(f"{stack} {count}" for stack, count in collapsed.most_common()),
+    }
+
+
+sampler = StackSampler(PROFILE_INTERVAL_MS / 1000)
+ring = ProfileRing(PROFILE_DIR, PROFILE_RING_SIZE)
+
+# Profiles are built and written off the request thread; when the writer
+# falls behind, new profiles are dropped rather than queued without bound
+_pending = queue.Queue(maxsize=32)
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _write_loop():
+    while True:
+        samples, info = _pending.get()
+        try:
+            ring.append(build_profile(samples, info))
+        except Exception as e:
+            logger.error("Error writing profile: %s", e)
+
+
+def should_keep(duration_ms: float, sampled: bool) -> bool:
+    return duration_ms >= PROFILE_SLOW_MS or sampled
+
+
+def pick_for_sampling() -> bool:
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def submit(samples: Counter, info: dict):
+    """Queue a finished request's samples to be stored as a profile."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_write_loop, name="profile-writer", daemon=True)
+                _writer.start()
+    try:
+        _pending.put_nowait((samples, info))
+    except queue.Full:
+        pass
@@ -1,29 +1,97 @@
-import os
-from supabase import create_client, Client
-from dotenv import load_dotenv
+import logging
+from services.clients import supabase
+from services.cache import UserCache
+from services.cursors import before_filter
+from services.popularity import popularity
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-url: str = os.environ.get("SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+# Per-user cache of saved destination lists, invalidated by save/unsave below
+saved_cache = UserCache("saved_destinations")
 
-supabase: Client = create_client(url, key)
+# Destination columns joined for each view. The grid only shows the card
+# image and labels; the detail view also needs the description.
+SAVED_VIEW_COLUMNS = {
+    "grid": "id, name, location, tags, image_url, is_personalized, country, region",
+    "detail": "id, name, location, description, tags, image_prompt, image_url, is_personalized, country, region",
+}
 
 
-def get_saved_destinations(user_id: str) -> list:
-    """Fetch all saved destinations for a user, joined with full destination data."""
+def get_saved_destinations(user_id: str, view: str = "detail", before: tuple = None, limit: int = None) -> list:
+    """
+    Fetch saved destinations for a user, newest first (ties broken by
+    destination id), joined with destination data.
+
+    Args:
+        user_id: The user whose saves to fetch
+        view: Key of SAVED_VIEW_COLUMNS selecting which destination columns to join
+        before: Keyset cursor - (created_at, destination_id) of the last save on the previous page
+        limit: Maximum number of rows to return
+    """
+    columns = SAVED_VIEW_COLUMNS[view]
+
+    def load():
+        query = (
+            supabase.table("saved_destinations")
+            .select(f"destination_id, created_at, destinations({columns})")
+            .eq("user_id", user_id)
+        )
+        if before:
+            query = query.or_(before_filter(before, key_column="destination_id"))
+
+        query = query.order("created_at", desc=True).order("destination_id", desc=True)
+        if limit:
+            query = query.limit(limit)
+
+        response = query.execute()
+        return response.data if response.data else []
+
+    try:
+        return saved_cache.get_or_load(user_id, (view, before, limit), load)
+    except Exception as e:
+        logger.error("Error fetching saved destinations: %s", e)
+        return []
+
+
+def count_saved_destinations(user_id: str) -> int:
+    """
+    Count a user's saved destinations from the cached id set.
+
+    Returns:
+        The count, or None if the ids couldn't be fetched
+    """
     try:
+        return len(_saved_destination_ids(user_id))
+    except Exception as e:
+        logger.error("Error counting saved destinations: %s", e)
+        return None
+
+
+def _saved_destination_ids(user_id: str) -> frozenset:
+    def load():
         response = (
             supabase.table("saved_destinations")
-            .select("destination_id, created_at, destinations(*)")
+            .select("destination_id")
             .eq("user_id", user_id)
-            .order("created_at", desc=True)
             .execute()
         )
-        return response.data if response.data else []
+        return frozenset(str(row["destination_id"]) for row in response.data or [])
+
+    return saved_cache.get_or_load(user_id, "ids", load)
+
+
+def get_saved_destination_ids(user_id: str) -> frozenset:
+    """
+    Fetch the set of destination ids a user has saved, as strings.
+
+    Only the id column is selected, and the set is cached alongside the
+    full list, so membership checks for feed cards don't pull joined rows.
+    """
+    try:
+        return _saved_destination_ids(user_id)
     except Exception as e:
-        print(f"Error fetching saved destinations: {e}")
-        return []
+        logger.error("Error fetching saved destination ids: %s", e)
+        return frozenset()
 
 
 def save_destination(user_id: str, destination_id: str) -> tuple:
@@ -34,19 +102,74 @@ def save_destination(user_id: str, destination_id: str) -> tuple:
             .insert({"user_id": user_id, "destination_id": destination_id})
             .execute()
         )
+        saved_cache.invalidate(user_id)
+        popularity.record(destination_id, 1)
         return (response.data[0] if response.data else None, None)
     except Exception as e:
-        print(f"Error saving destination: {e}", flush=True)
+        logger.error("Error saving destination: %s", e)
         return (None, str(e))
 
 
 def unsave_destination(user_id: str, destination_id: str) -> bool:
     """Delete a saved destination row."""
     try:
-        supabase.table("saved_destinations").delete().eq(
+        response = supabase.table("saved_destinations").delete().eq(
             "user_id", user_id
         ).eq("destination_id", destination_id).execute()
+        saved_cache.invalidate(user_id)
+        # Only count rows that were actually removed
+        for row in response.data or []:
+            popularity.record(row["destination_id"], -1, at=row.get("created_at"))
+        return True
+    except Exception as e:
+        logger.error("Error unsaving destination: %s", e)
+        return False
+
+
+def save_destinations(user_id: str, destination_ids: list) -> tuple:
+    """
+    Save many destinations for a user with a single multi-row insert.
+
+    Ids the user has already saved are skipped, so repeating a bulk save is harmless.
+
+    Returns:
+        (number of newly saved rows, None) on success, or (None, error message)
+    """
+    try:
+        already_saved = get_saved_destination_ids(user_id)
+        # Compared as strings, so 1 and "1" are the same destination
+        new_ids = list(dict.fromkeys(
+            str(d) for d in destination_ids if str(d) not in already_saved
+        ))
+        if not new_ids:
+            return (0, None)
+
+        rows = [{"user_id": user_id, "destination_id": d} for d in new_ids]
+        # The id set may be stale (a concurrent save): rows that already exist are skipped, not an error
+        response = (
+            supabase.table("saved_destinations")
+            .upsert(rows, on_conflict="user_id,destination_id", ignore_duplicates=True)
+            .execute()
+        )
+        saved_cache.invalidate(user_id)
+        for row in response.data or []:
+            popularity.record(row["destination_id"], 1)
+        return (len(response.data) if response.data else 0, None)
+    except Exception as e:
+        logger.error("Error bulk saving destinations: %s", e)
+        return (None, str(e))
+
+
+def unsave_destinations(user_id: str, destination_ids: list) -> bool:
+    """Delete many saved destination rows for a user in a single request."""
+    try:
+        response = supabase.table("saved_destinations").delete().eq(
+            "user_id", user_id
+        ).in_("destination_id", destination_ids).execute()
+        saved_cache.invalidate(user_id)
+        for row in response.data or []:
+            popularity.record(row["destination_id"], -1, at=row.get("created_at"))
         return True
     except Exception as e:
-        print(f"Error unsaving destination: {e}")
+        logger.error("Error bulk unsaving destinations: %s", e)
         return False
@@ -0,0 +1,166 @@
+"""
+Schema-driven camelCase serializers for API responses.
+
+A Schema lists the fields of one response object: its camelCase name,
+the snake_case column it comes from, a default and an optional
+conversion. The schema is compiled once, at import, into a plain
+function that builds the response object from a DB row in a single dict
+literal, instead of a hand-written transform per route.
+
+    DESTINATION(row)        -> {"id": "...", "imageUrl": ..., ...}
+    DESTINATION.many(rows)  -> [...]
+"""
+from services.itinerary_codec import decode_itinerary
+
+_MISSING = object()
+
+
+class Field:
+    """
+    One field of a response object.
+
+    Args:
+        name: camelCase name in the response
+        source: snake_case column in the row (default: name)
+        default: Value when the column is missing
+        convert: Function applied to the column value
+        optional: Only emit the field when the row has the column
+            (for views selected without it)
+        value: A constant to emit instead of reading the row
+    """
+
+    __slots__ = ("name", "source", "default", "convert", "optional", "value")
+
+    def __init__(self, name: str, source: str = None, default=None, convert=None,
+                 optional: bool = False, value=_MISSING):
+        self.name = name
+        self.source = source or name
+        self.default = default
+        self.convert = convert
+        self.optional = optional
+        self.value = value
+
+
+class Schema:
+    """
+    A compiled snake_case row -> camelCase object serializer.
+
+    Args:
+        fields: The response fields, in output order
+        nested: Read the fields from row[nested] (e.g. a joined table) instead of the row itself
+    """
+
+    def __init__(self, *fields: Field, nested: str = None):
+        self.fields = fields
+        self.nested = nested
+        self.serialize = self._compile()
+
+    def __call__(self, row: dict) -> dict:
+        return self.serialize(row)
+
+    def many(self, rows: list) -> list:
+        serialize = self.serialize
+        return [serialize(row) for row in rows]
+
+    def extend(self, *fields: Field) -> "Schema":
+        """A copy of this schema with fields added or, by name, replaced."""
+        replaced = {f.name: f for f in fields}
+        kept = [replaced.pop(f.name, f) for f in self.fields]
+        return Schema(*kept, *replaced.values(), nested=self.nested)
+
+    def _compile(self):
+        # Generates e.g.
+        #   def serialize(row):
+        #       out = {"id": _c0(row.get("id")), "imageUrl": row.get("image_url"), ...}
+        #       if "description" in row: out["description"] = row["description"]
+        #       return out
+        # Converters and constants are bound as names in the function's globals;
+        # list and dict defaults are inlined as literals so each row gets its own.
+        namespace = {}
+        required, optional = [], []
+        for i, field in enumerate(self.fields):
+            if field.value is not _MISSING:
+                namespace[f"_v{i}"] = field.value
+                required.append(f"{field.name!r}: _v{i}")
+                continue
+
+            if field.optional:
+                read = f"row[{field.source!r}]"
+            elif field.default is None:
+                read = f"row.get({field.source!r})"
+            elif isinstance(field.default, (list, dict)):
+                read = f"row.get({field.source!r}, {field.default!r})"
+            else:
+                namespace[f"_d{i}"] = field.default
+                read = f"row.get({field.source!r}, _d{i})"
+            if field.convert is not None:
+                namespace[f"_c{i}"] = field.convert
+                read = f"_c{i}({read})"
+
+            if field.optional:
+                optional.append(f"    if {field.source!r} in row: out[{field.name!r}] = {read}")
+            else:
+                required.append(f"{field.name!r}: {read}")
+
+        lines = ["def serialize(row):"]
+        if self.nested:
+            lines.append(f"    row = row.get({self.nested!r}) or {{}}")
+        lines.append(f"    out = {{{', '.join(required)}}}")
+        lines.extend(optional)
+        lines.append("    return out")
+
+        exec("\n".join(lines), namespace)
+        return namespace["serialize"]
+
+
+def _or_empty_list(value):
+    return value or []
+
+
+DESTINATION = Schema(
+    Field("id", convert=str),
+    Field("name"),
+    Field("location"),
+    Field("description", optional=True),
+    Field("tags", default=[]),
+    Field("imagePrompt", "image_prompt", default="", optional=True),
+    Field("imageUrl", "image_url"),
+    Field("isPersonalized", "is_personalized", default=False),
+    Field("country", default=""),
+    Field("region", default=""),
+)
+
+# Destinations picked by the user's tags (the personalized feed)
+PERSONALIZED_DESTINATION = DESTINATION.extend(Field("isPersonalized", value=True))
+
+# Typeahead suggestions only carry what the dropdown shows
+DESTINATION_SUGGESTION = Schema(
+    Field("id", convert=str),
+    Field("name"),
+    Field("location"),
+    Field("country", default=""),
+    Field("imageUrl", "image_url"),
+)
+
+# Saved destinations are rows of saved_destinations with the destination joined in
+SAVED_DESTINATION = Schema(*DESTINATION.fields, nested="destinations")
+
+TRIP = Schema(
+    Field("id"),
+    Field("userId", "user_id"),
+    Field("tripName", "trip_name", default=""),
+    Field("destination", default=""),
+    Field("startDate", "start_date", default=""),
+    Field("endDate", "end_date", default=""),
+    Field("currency", default="USD"),
+    Field("budgetRange", "budget_range", default=""),
+    Field("budgetAmount", "budget_amount", default=0),
+    Field("companions", default="solo"),
+    Field("numberOfPeople", "number_of_people"),
+    Field("countries", default=[]),
+    Field("createdAt", "created_at", default=""),
+    Field("version", default=1),
+    # Summary rows are selected without the heavy JSON columns
+    Field("specificDestinations", "specific_destinations", convert=_or_empty_list, optional=True),
+    Field("itinerary", convert=decode_itinerary, optional=True),
+)
@@ -0,0 +1,162 @@
+"""
+Startup timing for cold starts.
+
+Records how long each startup phase took (e.g. importing each blueprint),
+which packages it pulled in, when each shared client was first built and
+how long the first request took to arrive. With STARTUP_IMPORT_PROFILE=1
+it also times every module import, like `python -X importtime`.
+
+app.py imports this module first so the import profile sees everything,
+which makes it the place .env is loaded.
+"""
+import os
+import sys
+import time
+import threading
+import importlib.abc
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+# Load .env before reading STARTUP_IMPORT_PROFILE, and before any module app.py imports reads its settings
+load_dotenv()
+
+IMPORT_PROFILE_ENABLED = os.environ.get("STARTUP_IMPORT_PROFILE", "").lower() in ("1", "true", "yes")
+# Slowest imports listed in the report
+IMPORT_PROFILE_TOP = 40
+
+_started = time.perf_counter()
+_phases = []
+_client_inits = {}
+_milestones = {}
+_imports = []
+_import_state = threading.local()
+
+
+def _process_age() -> float:
+    """Seconds since the interpreter started (Linux), or since this module loaded."""
+    try:
+        with open("/proc/self/stat") as f:
+            # The process name may contain spaces; fields after it are fixed
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.perf_counter() - _started
+
+
+# Interpreter start time on the perf_counter clock
+_process_start = time.perf_counter() - _process_age()
+
+
+def _since_start() -> float:
+    return round(time.perf_counter() - _process_start, 4)
+
+
+@contextmanager
+def startup_phase(name: str):
+    """Time a block of startup work and note the top-level packages it imported."""
+    before = set(sys.modules)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        loaded = {m.split(".", 1)[0] for m in set(sys.modules) - before}
+        _phases.append({
+            "name": name,
+            "seconds": round(time.perf_counter() - started, 4),
+            "packages": sorted(loaded),
+        })
+
+
+def record_client_init(name: str, seconds: float):
+    _client_inits[name] = {"seconds": round(seconds, 4), "atSeconds": _since_start()}
+
+
+def mark(milestone: str):
+    """Record the first time a milestone (e.g. 'ready') is reached."""
+    _milestones.setdefault(milestone, _since_start())
+
+
+class _TimedLoader:
+    """Wraps a module loader to time exec_module, tracking nested imports."""
+
+    def __init__(self, loader, name):
+        self._loader = loader
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        stack = _import_state.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - started
+            children = stack.pop()
+            if stack:
+                stack[-1] += total
+            _imports.append({
+                "module": self._name,
+                "selfMicros": int((total - children) * 1e6),
+                "cumulativeMicros": int(total * 1e6),
+                "depth": len(stack),
+            })
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """Meta path finder that defers to the real finders and times their loaders."""
+
+    def find_spec(self, fullname, path, target=None):
+        if getattr(_import_state, "finding", False):
+            return None
+        _import_state.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            _import_state.finding = False
+
+        # Built-in and frozen modules load through class-level importers; leave them alone
+        if spec.loader is not None and not isinstance(spec.loader, type) and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, fullname)
+        return spec
+
+
+if IMPORT_PROFILE_ENABLED:
+    sys.meta_path.insert(0, _ImportTimer())
+
+
+def startup_report() -> dict:
+    """Everything recorded so far, for the debug endpoint."""
+    report = {
+        "milestones": dict(_milestones),
+        "phases": list(_phases),
+        "clients": dict(_client_inits),
+        "importProfile": IMPORT_PROFILE_ENABLED,
+    }
+    if IMPORT_PROFILE_ENABLED:
+        report["imports"] = sorted(_imports, key=lambda i: i["cumulativeMicros"], reverse=True)[:IMPORT_PROFILE_TOP]
+    return report
+
+
+def init_startup_timing(app):
+    """Mark the app ready now, and record when the first request arrives."""
+    mark("ready")
+
+    @app.before_request
+    def _first_request():
+        if "firstRequest" not in _milestones:
+            mark("firstRequest")
@@ -0,0 +1,143 @@
+"""
+Structured, non-blocking logging.
+
+Modules log through the standard library (logging.getLogger(__name__)).
+setup_logging() routes every record through a bounded queue to one writer
+thread that formats it as a JSON line on stdout. The logging thread only
+does a put_nowait, so it never blocks on stdout and never waits on a lock
+held by another request. When the queue is full, records are dropped and
+counted (voyager_log_records_dropped_total) instead of slowing requests down.
+
+Records carry the current request id (see middleware/request_logging)
+and any fields passed through `extra`:
+
+    logger.info("Campaign loaded", extra={"campaign_id": cid, "recipients": total})
+
+High-volume events can be sampled: pass extra={"sample_rate": 0.01} to
+keep about 1% of them (kept records are marked with their rate). Warnings
+and errors are never sampled.
+
+Settings: LOG_LEVEL (default INFO), LOG_FORMAT=json|text, LOG_QUEUE_SIZE.
+"""
+import os
+import sys
+import copy
+import atexit
+import json
+import time
+import queue
+import random
+import logging
+import threading
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+from services.metrics import LOG_RECORDS_DROPPED
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request id and extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Readable lines for local development (LOG_FORMAT=text)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = " ".join(
+            f"{key}={value}" for key, value in vars(record).items()
+            if key not in _RECORD_ATTRS and value is not None
+        )
+        line = f"{record.levelname:<7} {record.name}: {record.getMessage()}"
+        if fields:
+            line += f"  [{fields}]"
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the writer thread. Runs on the logging thread, so it
+    only attaches the request id, applies sampling and enqueues; formatting
+    happens on the writer thread.
+    """
+
+    def handle(self, record: logging.LogRecord):
+        # Handler.handle holds the handler lock around emit(); the queue is
+        # thread-safe by itself, so skip it and leave no lock for threads to contend on
+        result = self.filter(record)
+        if isinstance(result, logging.LogRecord):  # Python 3.12+ filters may return a replacement
+            record = result
+        if result:
+            self.emit(record)
+        return result
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, "sample_rate", None)
+        if rate is not None and record.levelno < logging.WARNING and random.random() >= rate:
+            return False
+        return super().filter(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.request_id = request_id_var.get()
+        # Resolve the message and traceback now: args and frames may change after this call returns
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+def setup_logging():
+    """Install the queue handler on the root logger and start the writer thread (idempotent)."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        root = logging.getLogger()
+        root.handlers = [NonBlockingQueueHandler(log_queue)]
+        root.setLevel(LOG_LEVEL)
+
+        _listener = QueueListener(log_queue, output)
+        _listener.start()
+        # Write out whatever is still queued when the process exits
+        atexit.register(_listener.stop)
+
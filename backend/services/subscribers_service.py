@@ -0,0 +1,187 @@
+"""
+Index of newsletter subscribers, kept in sync with the auth user metadata.
+
+The source of truth is still user_metadata.subscribed_to_newsletter on
+the Supabase auth user. The frontend reports every change through
+POST /api/newsletter/subscription, account deletion removes the row, and
+a reconcile job repairs any drift. Sends read only this table.
+
+The table starts empty. A campaign that finds it empty backfills it from
+the auth users before snapshotting its recipients (ensure_subscribers),
+so the first campaign after deploying reaches everyone who subscribed
+before the table existed. POST /api/newsletter/subscribers/reconcile
+does the same backfill on demand.
+
+
+    create table newsletter_subscribers (
+        user_id text primary key,
+        email text not null,
+        name text,
+        subscribed_at timestamptz,
+        updated_at timestamptz not null default now()
+    );
+"""
+import logging
+from datetime import datetime, timezone
+from services.database import supabase, supabase_admin
+from services.jobs import job_handler, enqueue_job, update_job_progress
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBERS_PAGE_SIZE = 500
+AUTH_USERS_PAGE_SIZE = 100
+
+
+def _subscriber_row(user) -> dict:
+    """Build a newsletter_subscribers row from a Supabase auth user."""
+    metadata = user.user_metadata or {}
+    return {
+        "user_id": user.id,
+        "email": user.email,
+        "name": metadata.get('full_name', 'Traveler'),
+        "subscribed_at": metadata.get('subscribed_at'),
+        "updated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+def _is_subscribed(user) -> bool:
+    return bool((user.user_metadata or {}).get('subscribed_to_newsletter'))
+
+
+def sync_subscription(user_id: str) -> bool:
+    """
+    Refresh one user's subscriber row from their auth metadata.
+
+    Called whenever a user subscribes or unsubscribes. Reading the auth user
+    rather than trusting the request keeps the index consistent with the
+    metadata the frontend just wrote.
+
+    Returns:
+        The user's current subscription state
+    """
+    response = supabase_admin.auth.admin.get_user_by_id(user_id)
+    user = response.user
+    if user and _is_subscribed(user):
+        supabase.table("newsletter_subscribers").upsert(_subscriber_row(user)).execute()
+        return True
+
+    remove_subscriber(user_id)
+    return False
+
+
+def remove_subscriber(user_id: str):
+    """Drop a user from the subscriber index (idempotent)."""
+    supabase.table("newsletter_subscribers").delete().eq("user_id", user_id).execute()
+
+
+def iter_subscribers(page_size: int = SUBSCRIBERS_PAGE_SIZE):
+    """
+    Stream subscribed users from the index, a page at a time.
+
+    Yields:
+        Dicts with id, email, name and subscribed_at, ordered by user id
+    """
+    last_id = None
+    while True:
+        query = supabase.table("newsletter_subscribers").select("user_id, email, name, subscribed_at")
+        if last_id is not None:
+            query = query.gt("user_id", last_id)
+        rows = query.order("user_id").limit(page_size).execute().data or []
+
+        for row in rows:
+            yield {
+                'id': row['user_id'],
+                'email': row['email'],
+                'name': row.get('name') or 'Traveler',
+                'subscribed_at': row.get('subscribed_at'),
+            }
+
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]['user_id']
+
+
+def _auth_user_pages(start_page: int = 1):
+    """Yield (page number, auth users) for each page of auth users from start_page."""
+    page = start_page
+    while True:
+        users = supabase_admin.auth.admin.list_users(page=page, per_page=AUTH_USERS_PAGE_SIZE)
+        if not users:
+            return
+        yield page, users
+        if len(users) < AUTH_USERS_PAGE_SIZE:
+            return
+        page += 1
+
+
+def ensure_subscribers() -> int:
+    """
+    Backfill the subscriber index from auth metadata if it is empty.
+
+    Run before a campaign snapshots its recipients: until the first
+    reconcile, users who subscribed before the index existed have no row.
+
+    Returns:
+        The number of subscribers backfilled (0 if the index already had rows)
+    """
+    response = supabase.table("newsletter_subscribers").select("user_id").limit(1).execute()
+    if response.data:
+        return 0
+
+    total = 0
+    for _, users in _auth_user_pages():
+        subscribed = [_subscriber_row(u) for u in users if _is_subscribed(u)]
+        if subscribed:
+            supabase.table("newsletter_subscribers").upsert(subscribed).execute()
+            total += len(subscribed)
+    logger.info("Subscriber index backfilled", extra={"subscribers": total})
+    return total
+
+
+def start_reconcile() -> dict:
+    """Start a subscriber reconcile job (one per day at most)."""
+    day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    return enqueue_job("reconcile_subscribers", {}, job_id=f"reconcile_subscribers:{day}")
+
+
+@job_handler("reconcile_subscribers")
+def _reconcile_subscribers(job: dict):
+    """
+    Repair drift between auth metadata and the subscriber index.
+
+    Walks the auth users page by page, upserting subscribers and removing
+    rows for users who have unsubscribed. The page reached is recorded in
+    the job's progress, so a retry resumes where the last attempt stopped.
+    Rows for users that no longer exist are removed only by a pass that
+    saw every page in one go.
+    """
+    progress = job.get("progress") or {}
+    start_page = progress.get("page", 1)
+    seen = set() if start_page == 1 else None
+    added = progress.get("upserted", 0)
+    removed = progress.get("removed", 0)
+
+    for page, users in _auth_user_pages(start_page):
+        subscribed = [_subscriber_row(u) for u in users if _is_subscribed(u)]
+        unsubscribed = [u.id for u in users if not _is_subscribed(u)]
+        if subscribed:
+            supabase.table("newsletter_subscribers").upsert(subscribed).execute()
+        if unsubscribed:
+            response = supabase.table("newsletter_subscribers").delete().in_("user_id", unsubscribed).execute()
+            removed += len(response.data or [])
+        added += len(subscribed)
+        if seen is not None:
+            seen.update(u.id for u in users)
+
+        update_job_progress(job, {"page": page + 1, "upserted": added, "removed": removed})
+
+    if seen is not None:
+        orphans = [s['id'] for s in iter_subscribers() if s['id'] not in seen]
+        for i in range(0, len(orphans), SUBSCRIBERS_PAGE_SIZE):
+            supabase.table("newsletter_subscribers").delete().in_(
+                "user_id", orphans[i:i + SUBSCRIBERS_PAGE_SIZE]
+            ).execute()
+        removed += len(orphans)
+        update_job_progress(job, {"removed": removed})
+
+    logger.info("Subscriber reconcile finished", extra={"upserted": added, "removed": removed})
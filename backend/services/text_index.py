@@ -0,0 +1,226 @@
+"""
+In-process full-text index over destination names, locations and descriptions.
+
+An inverted index (term -> postings of document ids and weighted term
+frequencies) ranked with BM25. Name matches count more than location
+matches, and those more than description matches. For typeahead the last word
+of the query is a prefix, expanded to the indexed terms that start with
+it. A word that matches nothing falls back to the terms sharing the most
+trigrams with it, so small typos still find results.
+
+Documents are numbered by the caller (the destination store's row
+positions) and can only be appended, which keeps every postings list
+sorted and lets the index grow incrementally.
+"""
+import math
+import re
+import bisect
+import unicodedata
+from array import array
+from collections import Counter
+import numpy as np
+
+# Weight of a term occurrence in each field
+FIELD_WEIGHTS = (("name", 3.0), ("location", 2.0), ("description", 1.0))
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Indexed terms a trailing prefix may expand to (the most common ones)
+MAX_PREFIX_TERMS = 50
+# Postings at least this long keep a numpy copy between queries
+ARRAY_CACHE_MIN_POSTINGS = 1024
+# Similar terms a word with no exact match is replaced by, and how similar they must be
+MAX_FUZZY_TERMS = 5
+MIN_TRIGRAM_SIMILARITY = 0.4
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to was were with".split()
+)
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str, keep_last: bool = False) -> list:
+    """
+    Lowercase, accent-stripped words of a text, without stopwords.
+
+    Args:
+        text: The text to split
+        keep_last: Keep the last word even if it is a stopword (a typeahead
+            prefix such as "to" may be the start of "tokyo")
+    """
+    if not text:
+        return []
+    text = text.lower()
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    words = _WORD.findall(text)
+    last = words[-1:] if keep_last else []
+    return [w for w in words[:len(words) - len(last)] if w not in STOPWORDS] + last
+
+
+def _trigrams(term: str) -> set:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TextIndex:
+    """BM25 inverted index with prefix and trigram lookups."""
+
+    def __init__(self):
+        self.postings = {}      # term -> (doc ids, weighted term frequencies)
+        self.terms = []         # sorted, for prefix ranges
+        self.trigrams = {}      # trigram -> terms containing it
+        self.trigram_counts = {}  # term -> number of distinct trigrams
+        self.lengths = array("f")
+        self.total_length = 0.0
+        # numpy copies reused by queries until documents are added
+        self._norm = (0, None)
+        self._arrays = {}
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def add(self, doc_id: int, fields: dict):
+        """
+        Index a document. doc_id must be the next id (len(self)).
+
+        Args:
+            doc_id: The document's position
+            fields: name, location and description text
+        """
+        if doc_id != len(self.lengths):
+            raise ValueError(f"Documents must be added in order: expected {len(self.lengths)}, got {doc_id}")
+
+        frequencies = {}
+        for field, weight in FIELD_WEIGHTS:
+            for term, count in Counter(tokenize(fields.get(field))).items():
+                frequencies[term] = frequencies.get(term, 0.0) + count * weight
+
+        for term, frequency in frequencies.items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = (array("I"), array("f"))
+                bisect.insort(self.terms, term)
+                trigrams = _trigrams(term)
+                # Count first: a query may see the term in a trigram set as soon as it is added
+                self.trigram_counts[term] = len(trigrams)
+                for trigram in trigrams:
+                    self.trigrams.setdefault(trigram, set()).add(term)
+            entry[0].append(doc_id)
+            entry[1].append(frequency)
+
+        length = sum(frequencies.values())
+        # Publish the document last: queries only score ids below len(self.lengths)
+        self.total_length += length
+        self.lengths.append(length)
+
+    def _prefix_terms(self, prefix: str) -> list:
+        """Indexed terms starting with prefix, most common first."""
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + "\uffff", start)
+        terms = self.terms[start:end]
+        if len(terms) > MAX_PREFIX_TERMS:
+            terms = sorted(terms, key=lambda t: len(self.postings[t][0]), reverse=True)[:MAX_PREFIX_TERMS]
+        return terms
+
+    def _similar_terms(self, word: str) -> list:
+        """Indexed terms sharing the most trigrams with word (for typos)."""
+        grams = _trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            terms = self.trigrams.get(gram)
+            if terms:
+                # Copy (one C-level step) since add() may grow the set while we count
+                shared.update(terms.copy())
+        scored = []
+        for term, count in shared.items():
+            similarity = count / (len(grams) + self.trigram_counts[term] - count)
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                scored.append((similarity, term))
+        scored.sort(reverse=True)
+        return [term for _, term in scored[:MAX_FUZZY_TERMS]]
+
+    def _length_norm(self, n: int) -> np.ndarray:
+        """BM25 length normalisation of the first n documents."""
+        cached_n, norm = self._norm
+        if cached_n != n:
+            lengths = np.array(self.lengths[:n], dtype=np.float32)
+            avg_length = self.total_length / n if self.total_length else 1.0
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / avg_length)
+            self._norm = (n, norm)
+        return norm
+
+    def _postings(self, term: str, n: int) -> tuple:
+        """A term's postings among the first n documents, as numpy arrays."""
+        doc_ids, frequencies = self.postings[term]
+        cached = self._arrays.get(term)
+        if cached is not None and cached[0] == len(doc_ids):
+            docs, tf = cached[1], cached[2]
+        else:
+            docs = np.array(doc_ids, dtype=np.int64)
+            tf = np.array(frequencies, dtype=np.float32)[:len(docs)]
+            docs = docs[:len(tf)]
+            if len(docs) >= ARRAY_CACHE_MIN_POSTINGS:
+                self._arrays[term] = (len(docs), docs, tf)
+        # Postings are sorted: drop documents added after this query started
+        end = np.searchsorted(docs, n)
+        return docs[:end], tf[:end]
+
+    def _expand(self, word: str, prefix: bool) -> list:
+        if prefix:
+            terms = self._prefix_terms(word)
+        else:
+            terms = [word] if word in self.postings else []
+        return terms or self._similar_terms(word)
+
+    def search(self, query: str, limit: int = 10, prefix: bool = True) -> list:
+        """
+        Rank documents containing every word of the query with BM25.
+
+        Args:
+            query: Text typed by the user
+            limit: Maximum number of results
+            prefix: Treat the last word as a prefix (typeahead)
+
+        Returns:
+            List of (doc id, score), best first
+        """
+        words = tokenize(query, keep_last=prefix)
+        # Queries are scored against the documents published when they start
+        n = len(self.lengths)
+        if not words or not n:
+            return []
+
+        norm = self._length_norm(n)
+
+        scores = np.zeros(n, dtype=np.float32)
+        matched = np.ones(n, dtype=bool)
+        for i, word in enumerate(words):
+            # A trailing stopword ("trip to") may be the start of a word or just a
+            # stopword: when it narrows the results to nothing, it is ignored
+            optional = prefix and i and i == len(words) - 1 and word in STOPWORDS
+            terms = self._expand(word, prefix and i == len(words) - 1)
+            if not terms:
+                if optional:
+                    break
+                return []
+            # A document scores its best-matching expansion of each word
+            word_scores = np.zeros(n, dtype=np.float32)
+            for term in terms:
+                docs, tf = self._postings(term, n)
+                idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                term_scores = idf * tf * (BM25_K1 + 1) / (tf + norm[docs])
+                word_scores[docs] = np.maximum(word_scores[docs], term_scores)
+            if optional and not (matched & (word_scores > 0)).any():
+                break
+            scores += word_scores
+            matched &= word_scores > 0
+
+        candidates = np.flatnonzero(matched)
+        if not len(candidates):
+            return []
+        if len(candidates) > limit:
+            top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[top]
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(doc), float(scores[doc])) for doc in order]
@@ -1,17 +1,52 @@
-import os
-from supabase import create_client, Client
-from dotenv import load_dotenv
+import logging
+from services.clients import supabase
+from services.json_patch import apply_json_patch, apply_merge_patch, JsonPatchError
+from services.itinerary_codec import encode_itinerary, decode_itinerary
+from services.cache import UserCache
+from services.cursors import before_filter
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-url: str = os.environ.get("SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+# Per-user cache of trip lists; every writer below invalidates the owner's entries
+trips_cache = UserCache("trips")
 
-supabase: Client = create_client(url, key)
+# Columns needed by the trips list view. The heavy JSON columns
+# (itinerary, specific_destinations) are only fetched by get_trip.
+TRIP_SUMMARY_COLUMNS = (
+    "id, user_id, trip_name, destination, start_date, end_date, currency, "
+    "budget_range, budget_amount, companions, number_of_people, countries, created_at, version"
+)
+
+# Editable trip fields: camelCase (API) -> snake_case (DB column)
+TRIP_FIELD_MAP = {
+    'tripName': 'trip_name',
+    'destination': 'destination',
+    'startDate': 'start_date',
+    'endDate': 'end_date',
+    'currency': 'currency',
+    'budgetRange': 'budget_range',
+    'budgetAmount': 'budget_amount',
+    'companions': 'companions',
+    'numberOfPeople': 'number_of_people',
+    'specificDestinations': 'specific_destinations',
+    'itinerary': 'itinerary',
+    'countries': 'countries',
+}
+
+# Error codes returned by update_trip / patch_trip
+TRIP_NOT_FOUND = "not_found"
+TRIP_CONFLICT = "conflict"
+# Times save_trip re-reads the version when a concurrent write moved it
+SAVE_TRIP_ATTEMPTS = 3
 
 
 def save_trip(trip_data: dict) -> dict:
-    """Save a trip to the Supabase trips table."""
+    """
+    Save a trip to the Supabase trips table.
+
+    Saving over an existing trip (same id) is a write like any other: it
+    bumps the trip's version, so a client holding the old ETag gets a 409.
+    """
     data = {
         "id": trip_data.get('id'),
         "user_id": trip_data.get('userId'),
@@ -30,64 +65,230 @@ def save_trip(trip_data: dict) -> dict:
     }
 
     try:
-        response = supabase.table("trips").upsert(data).execute()
-        return response.data[0] if response.data else None
+        for _ in range(SAVE_TRIP_ATTEMPTS):
+            current = None
+            if data["id"] is not None:
+                response = supabase.table("trips").select("version").eq("id", data["id"]).limit(1).execute()
+                current = response.data[0] if response.data else None
+
+            if current is None:
+                response = supabase.table("trips").upsert(
+                    {**data, "itinerary": encode_itinerary(data["itinerary"])}
+                ).execute()
+                trips_cache.invalidate(data["user_id"])
+                return response.data[0] if response.data else None
+
+            fields = {key: value for key, value in data.items() if key != "id"}
+            trip, error = _write_trip(data["id"], fields, current.get("version") or 1)
+            if error is None:
+                return trip
+            if error == TRIP_NOT_FOUND:
+                continue
+        logger.error("Error saving trip: version kept changing", extra={"trip_id": data["id"]})
+        return None
     except Exception as e:
-        print(f"❌ Error saving trip: {e}")
+        logger.error("Error saving trip: %s", e)
         return None
 
 
-def get_user_trips(user_id: str) -> list:
-    """Fetch all trips for a specific user."""
+def get_user_trips(
+    user_id: str,
+    countries: list = None,
+    start_from: str = None,
+    end_to: str = None,
+    before: tuple = None,
+    limit: int = None,
+    full: bool = False,
+) -> list:
+    """
+    Fetch trips for a specific user, newest first (ties broken by id).
+
+    Results are served from trips_cache when the user's trips haven't
+    changed since they were last fetched.
+
+    Args:
+        user_id: Owner of the trips
+        countries: Only return trips visiting at least one of these countries
+        start_from: Only return trips starting on or after this date (YYYY-MM-DD)
+        end_to: Only return trips ending on or before this date (YYYY-MM-DD)
+        before: Keyset cursor - (created_at, id) of the last trip on the previous page
+        limit: Maximum number of trips to return
+        full: Select every column instead of the summary projection
+    """
+    variant = (tuple(countries or ()), start_from, end_to, before, limit, full)
+
+    def load():
+        query = (
+            supabase.table("trips")
+            .select("*" if full else TRIP_SUMMARY_COLUMNS)
+            .eq("user_id", user_id)
+        )
+        if countries:
+            query = query.overlaps("countries", countries)
+        if start_from:
+            query = query.gte("start_date", start_from)
+        if end_to:
+            query = query.lte("end_date", end_to)
+        if before:
+            query = query.or_(before_filter(before))
+
+        query = query.order("created_at", desc=True).order("id", desc=True)
+        if limit:
+            query = query.limit(limit)
+
+        response = query.execute()
+        return response.data if response.data else []
+
+    try:
+        return trips_cache.get_or_load(user_id, variant, load)
+    except Exception as e:
+        logger.error("Error fetching trips: %s", e)
+        return []
+
+
+def get_trip(trip_id: str) -> dict:
+    """Fetch a single trip with its full itinerary."""
     try:
         response = (
             supabase.table("trips")
             .select("*")
-            .eq("user_id", user_id)
-            .order("created_at", desc=True)
+            .eq("id", trip_id)
+            .limit(1)
             .execute()
         )
-        return response.data if response.data else []
+        return response.data[0] if response.data else None
     except Exception as e:
-        print(f"❌ Error fetching trips: {e}")
-        return []
+        logger.error("Error fetching trip: %s", e, extra={"trip_id": trip_id})
+        return None
 
 
-def update_trip(trip_id: str, trip_data: dict) -> dict:
-    """Update an existing trip."""
-    data = {}
-    field_map = {
-        'tripName': 'trip_name',
-        'destination': 'destination',
-        'startDate': 'start_date',
-        'endDate': 'end_date',
-        'currency': 'currency',
-        'budgetRange': 'budget_range',
-        'budgetAmount': 'budget_amount',
-        'companions': 'companions',
-        'numberOfPeople': 'number_of_people',
-        'specificDestinations': 'specific_destinations',
-        'itinerary': 'itinerary',
-        'countries': 'countries',
-    }
+def _write_trip(trip_id: str, data: dict, version: int) -> tuple:
+    """
+    Write changed columns only if the row is still at `version`.
+
+    Every write bumps the trip's `version` column (integer, default 1),
+    which is what the API exposes as the trip's ETag.
+    """
+    data = {**data, "version": version + 1}
+    if "itinerary" in data:
+        data["itinerary"] = encode_itinerary(data["itinerary"])
+    response = (
+        supabase.table("trips")
+        .update(data)
+        .eq("id", trip_id)
+        .eq("version", version)
+        .execute()
+    )
+    if not response.data:
+        # Nothing matched: either the version moved on, or there is no such trip
+        exists = supabase.table("trips").select("id").eq("id", trip_id).limit(1).execute()
+        return (None, TRIP_CONFLICT if exists.data else TRIP_NOT_FOUND)
+    trips_cache.invalidate(response.data[0].get("user_id"))
+    return (response.data[0], None)
+
+
+def update_trip(trip_id: str, trip_data: dict, expected_version: int = None) -> tuple:
+    """
+    Update an existing trip.
+
+    Args:
+        trip_id: Trip to update
+        trip_data: camelCase fields to overwrite
+        expected_version: If given, the update only applies when the trip is
+                          still at this version (from the client's If-Match)
 
-    for camel, snake in field_map.items():
+    Returns:
+        (trip, None) on success, or (None, error) where error is
+        TRIP_NOT_FOUND, TRIP_CONFLICT or an error message
+    """
+    data = {}
+    for camel, snake in TRIP_FIELD_MAP.items():
         if camel in trip_data:
             data[snake] = trip_data[camel]
 
     try:
-        response = supabase.table("trips").update(data).eq("id", trip_id).execute()
-        return response.data[0] if response.data else None
+        if expected_version is None:
+            response = (
+                supabase.table("trips")
+                .select("version")
+                .eq("id", trip_id)
+                .limit(1)
+                .execute()
+            )
+            if not response.data:
+                return (None, TRIP_NOT_FOUND)
+            expected_version = response.data[0].get("version") or 1
+
+        return _write_trip(trip_id, data, expected_version)
     except Exception as e:
-        print(f"❌ Error updating trip: {e}")
-        return None
+        logger.error("Error updating trip: %s", e, extra={"trip_id": trip_id})
+        return (None, str(e))
+
+
+def patch_trip(trip_id: str, patch, merge: bool = False, expected_version: int = None) -> tuple:
+    """
+    Apply a JSON Patch (RFC 6902) or JSON Merge Patch (RFC 7396) to a trip.
+
+    The patch addresses the camelCase trip document, e.g.
+    [{"op": "replace", "path": "/itinerary/0/activities/1/title", "value": "Lunch"}].
+    Only the top-level columns the patch actually changes are written.
+
+    Args:
+        trip_id: Trip to patch
+        patch: List of patch operations, or a merge-patch object if merge=True
+        merge: Treat `patch` as a JSON Merge Patch
+        expected_version: If given, fail with TRIP_CONFLICT unless the trip is at this version
+
+    Returns:
+        (trip, None) on success, or (None, error) as for update_trip
+
+    Raises:
+        JsonPatchError: If the patch is malformed, fails a test operation
+                        or touches a field that cannot be edited
+    """
+    current = get_trip(trip_id)
+    if not current:
+        return (None, TRIP_NOT_FOUND)
+
+    version = current.get("version") or 1
+    if expected_version is not None and expected_version != version:
+        return (None, TRIP_CONFLICT)
+
+    doc = {camel: current.get(snake) for camel, snake in TRIP_FIELD_MAP.items()}
+    doc["itinerary"] = decode_itinerary(doc["itinerary"])
+    if merge:
+        patched = apply_merge_patch(doc, patch)
+    else:
+        patched = apply_json_patch(doc, patch)
+
+    if not isinstance(patched, dict):
+        raise JsonPatchError("A patched trip must remain an object")
+    unknown = set(patched) - set(TRIP_FIELD_MAP)
+    if unknown:
+        raise JsonPatchError(f"Cannot edit trip fields: {', '.join(sorted(unknown))}")
+
+    data = {
+        snake: patched.get(camel)
+        for camel, snake in TRIP_FIELD_MAP.items()
+        if patched.get(camel) != doc.get(camel)
+    }
+    if not data:
+        return (current, None)
+
+    try:
+        return _write_trip(trip_id, data, version)
+    except Exception as e:
+        logger.error("Error patching trip: %s", e, extra={"trip_id": trip_id})
+        return (None, str(e))
 
 
 def delete_trip(trip_id: str) -> bool:
     """Delete a trip by ID."""
     try:
-        supabase.table("trips").delete().eq("id", trip_id).execute()
+        response = supabase.table("trips").delete().eq("id", trip_id).execute()
+        for row in response.data or []:
+            trips_cache.invalidate(row.get("user_id"))
         return True
     except Exception as e:
-        print(f"❌ Error deleting trip: {e}")
+        logger.error("Error deleting trip: %s", e, extra={"trip_id": trip_id})
         return False
@@ -1,20 +1,80 @@
+import logging
 from services.database import supabase, supabase_admin
+from services.jobs import job_handler, enqueue_job, requeue_dead_job, get_job, run_steps
+from services.popularity import popularity
+from services.trips_service import trips_cache
+from services.saved_destinations_service import saved_cache
+from services.subscribers_service import remove_subscriber
 
+logger = logging.getLogger(__name__)
 
-def delete_user(user_id: str) -> bool:
-    """Delete a user and all their associated data."""
-    try:
-        # Delete user's saved destinations
-        supabase.table("saved_destinations").delete().eq("user_id", user_id).execute()
 
-        # Delete user's trips
-        supabase.table("trips").delete().eq("user_id", user_id).execute()
+def deletion_job_id(user_id: str) -> str:
+    """One deletion job per user, so repeated requests don't start duplicates."""
+    return f"delete_user:{user_id}"
 
-        # Delete the user account via Supabase Auth Admin API
-        supabase_admin.auth.admin.delete_user(user_id)
 
-        print(f"Deleted user {user_id} and all associated data", flush=True)
-        return True
+def delete_user(user_id: str) -> dict:
+    """
+    Start deleting a user and all their associated data in the background.
+
+    Asking again after the deletion job ran out of attempts restarts it.
+
+    Returns:
+        The deletion job row, or None if the job couldn't be created
+    """
+    job = enqueue_job("delete_user", {"user_id": user_id}, job_id=deletion_job_id(user_id))
+    if job and job["status"] == "dead":
+        job = requeue_dead_job(job["id"])
+    return job
+
+
+def get_user_deletion(user_id: str) -> dict:
+    """Fetch the deletion job for a user, if one was started."""
+    return get_job(deletion_job_id(user_id))
+
+
+def _delete_auth_user(user_id: str):
+    try:
+        supabase_admin.auth.admin.delete_user(user_id)
     except Exception as e:
-        print(f"Error deleting user {user_id}: {e}", flush=True)
-        return False
+        # Already deleted by an earlier attempt
+        if "not found" in str(e).lower():
+            return
+        raise
+
+
+def _delete_saved_destinations(user_id: str):
+    response = supabase.table("saved_destinations").delete().eq("user_id", user_id).execute()
+    # Deleted saves no longer count towards trending
+    for row in response.data or []:
+        popularity.record(row["destination_id"], -1, at=row.get("created_at"))
+
+
+def _clear_caches(user_id: str):
+    trips_cache.invalidate(user_id)
+    saved_cache.invalidate(user_id)
+
+
+@job_handler("delete_user")
+def _run_user_deletion(job: dict):
+    """
+    Delete a user's data concurrently, then clear their caches, then the
+    auth account itself.
+
+    Every step is idempotent, and completed steps are skipped on retry.
+    Caches are cleared only once the rows are gone, so a read racing the
+    deletes can't cache them again. The auth account goes last so a failed
+    data step can still be retried against a user that exists.
+    """
+    user_id = job["payload"]["user_id"]
+
+    run_steps(job, {
+        "saved_destinations": lambda: _delete_saved_destinations(user_id),
+        "trips": lambda: supabase.table("trips").delete().eq("user_id", user_id).execute(),
+        "newsletter_subscriber": lambda: remove_subscriber(user_id),
+    })
+    run_steps(job, {"caches": lambda: _clear_caches(user_id)})
+    run_steps(job, {"auth": lambda: _delete_auth_user(user_id)})
+
+    logger.info("Deleted user and all associated data", extra={"user_id": user_id})
@@ -1,5 +1,5 @@
 
-import React, { useState, useEffect, useMemo, useCallback } from 'react';
+import React, { useState, useEffect, useMemo, useCallback, useRef } from 'react';
 import { createRoot } from 'react-dom/client';
 import * as Lucide from 'lucide-react';
 import type { User } from '@supabase/supabase-js';
@@ -41,6 +41,10 @@ function VoyagerApp() {
 
   // Track the currently logged-in user (null means not logged in)
   const [user, setUser] = useState<User | null>(null);
+  // True once the initial session check has finished (user is known to be signed in or not)
+  const [authReady, setAuthReady] = useState(false);
+  // Whether the hero feed has been loaded by the bootstrap request
+  const feedLoaded = useRef(false);
 
   // Toast notification state
   const [toast, setToast] = useState<{ message: string; type: 'success' | 'error' } | null>(null);
@@ -96,6 +100,13 @@ function VoyagerApp() {
         };
       });
 
+      // Add the user to the backend's newsletter subscriber index
+      fetch(`${API_BASE_URL}/api/newsletter/subscription`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ userId: user.id }),
+      }).catch(err => console.error('Failed to sync newsletter subscription:', err));
+
       // Send welcome email via backend with personalized destinations
       try {
         await fetch(`${API_BASE_URL}/api/newsletter/welcome`, {
@@ -132,6 +143,7 @@ function VoyagerApp() {
       } else {
         setUser(null);
       }
+      setAuthReady(true);
     });
 
     // Subscribe to auth state changes (login, logout, token refresh, etc.)
@@ -190,29 +202,41 @@ function VoyagerApp() {
     }
   }, [currentView, editingTripId]);
 
-  // Load saved destinations from Supabase when user changes
+  // Load the hero feed, saved destinations and trips in one request once the
+  // session is known. When the user changes later, only their data is reloaded.
   useEffect(() => {
-    if (user) {
-      fetch(`${API_BASE_URL}/api/saved-destinations?userId=${user.id}`)
-        .then(res => res.ok ? res.json() : [])
-        .then(data => setSavedDestinations(data))
-        .catch(() => setSavedDestinations([]));
-    } else {
+    if (!authReady) return;
+    if (!user && feedLoaded.current) {
       setSavedDestinations([]);
-    }
-  }, [user?.id]);
-
-  // Load trips from Supabase when user changes
-  useEffect(() => {
-    if (user) {
-      fetch(`${API_BASE_URL}/api/trips?userId=${user.id}`)
-        .then(res => res.ok ? res.json() : [])
-        .then(data => setTrips(data))
-        .catch(() => setTrips([]));
-    } else {
       setTrips([]);
+      return;
     }
-  }, [user?.id]);
+
+    const loadingFeed = !feedLoaded.current;
+    feedLoaded.current = true;
+    const params = new URLSearchParams();
+    if (user) params.set('userId', user.id);
+    if (!loadingFeed) params.set('include', 'saved,trips');
+
+    fetch(`${API_BASE_URL}/api/bootstrap?${params}`)
+      .then(res => {
+        if (!res.ok) throw new Error('Network response was not ok');
+        return res.json();
+      })
+      .then(data => {
+        if (loadingFeed) setDestinations(data.destinations ?? []);
+        setSavedDestinations(data.savedDestinations ?? []);
+        setTrips(data.trips ?? []);
+      })
+      .catch(err => {
+        console.error("Failed to load app data:", err);
+        setSavedDestinations([]);
+        setTrips([]);
+      })
+      .finally(() => {
+        if (loadingFeed) setLoading(false);
+      });
+  }, [authReady, user?.id]);
 
   const toggleSaveDestination = useCallback(async (dest: Destination) => {
     if (!user) {
@@ -270,15 +294,22 @@ function VoyagerApp() {
 
     try {
       if (editingTripId) {
-        // Update existing trip
+        // Update existing trip - If-Match makes the server reject edits to a stale copy
+        const editingTrip = trips.find(t => t.id === editingTripId);
+        const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+        if (editingTrip?.version) {
+          headers['If-Match'] = `"${editingTrip.version}"`;
+        }
         const res = await fetch(`${API_BASE_URL}/api/trips/${editingTripId}`, {
           method: 'PUT',
-          headers: { 'Content-Type': 'application/json' },
+          headers,
           body: JSON.stringify(tripWithUser),
         });
         if (res.ok) {
           const updated = await res.json();
           setTrips(prev => prev.map(t => t.id === editingTripId ? updated : t));
+        } else if (res.status === 409) {
+          showToast("This trip was changed in another tab. Reload to see the latest version.", 'error');
         }
         setEditingTripId(null);
       } else {
@@ -298,7 +329,7 @@ function VoyagerApp() {
     }
 
     setCurrentView('trips');
-  }, [editingTripId, user]);
+  }, [editingTripId, user, trips]);
 
   const handleTripDelete = useCallback(async (id: string) => {
     try {
@@ -319,9 +350,21 @@ function VoyagerApp() {
   }, [user]);
 
   // Handle editing a trip - loads trip data into form cache and navigates to form
-  const handleEditTrip = useCallback((trip: TripPlan) => {
+  const handleEditTrip = useCallback(async (trip: TripPlan) => {
     if (!user) return;
 
+    // The trips list only carries summaries - fetch the full trip for its specific destinations
+    if (!trip.specificDestinations) {
+      try {
+        const res = await fetch(`${API_BASE_URL}/api/trips/${trip.id}`);
+        if (res.ok) {
+          trip = await res.json();
+        }
+      } catch (err) {
+        console.error('Failed to load trip:', err);
+      }
+    }
+
     // Get the month and year from the trip's start date for the calendar
     const startDateObj = new Date(trip.startDate + 'T00:00:00');
 
@@ -441,11 +484,6 @@ function VoyagerApp() {
     }
   }, [personalized, topTags, loadPersonalizedDestinations, loadRandomDestinations]);
 
-  // Load random destinations on initial mount
-  useEffect(() => {
-    loadRandomDestinations();
-  }, [loadRandomDestinations]);
-
   // displayedDestinations is now just the destinations array
   // (filtering is done server-side)
   const displayedDestinations = destinations;
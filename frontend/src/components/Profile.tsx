@@ -3,6 +3,7 @@ import * as Lucide from 'lucide-react';
 import { Button } from './Button';
 import type { User } from '@supabase/supabase-js';
 import { supabase } from '../lib/supabase';
+import { API_BASE_URL } from '../lib/api';
 
 interface ProfileProps {
   user: User;
@@ -82,6 +83,13 @@ export function Profile({ user, onSignOut, onDeleteAccount, onUserUpdate }: Prof
       });
       if (error) throw error;
       if (data.user) onUserUpdate(data.user);
+
+      // Keep the backend's newsletter subscriber index in sync
+      await fetch(`${API_BASE_URL}/api/newsletter/subscription`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ userId: user.id }),
+      });
     } catch (err) {
       console.error('Failed to update newsletter preference:', err);
     } finally {
@@ -65,6 +65,7 @@ export interface TripPlan {
   itinerary?: ItineraryDay[];
   countries?: string[];
   createdAt: string;
+  version?: number;
 }
 
 interface TripPlanningFormProps {
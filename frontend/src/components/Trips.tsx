@@ -2,6 +2,7 @@ import React, { useState } from 'react';
 import * as Lucide from 'lucide-react';
 import { Button } from './Button';
 import { TripPlan, ItineraryDay } from './TripPlanningForm';
+import { API_BASE_URL } from '../lib/api';
 
 interface TripsProps {
   trips: TripPlan[];
@@ -206,6 +207,20 @@ function TripDetailModal({
 export function Trips({ trips, onDeleteTrip, onPlanTrip, onEditTrip }: TripsProps) {
   const [selectedTrip, setSelectedTrip] = useState<TripPlan | null>(null);
 
+  // The trips list only carries summaries - fetch the itinerary when a trip is opened
+  const openTrip = (trip: TripPlan) => {
+    setSelectedTrip(trip);
+    if (trip.itinerary) return;
+    fetch(`${API_BASE_URL}/api/trips/${trip.id}`)
+      .then(res => res.ok ? res.json() : null)
+      .then(full => {
+        if (full) {
+          setSelectedTrip(current => current && current.id === full.id ? full : current);
+        }
+      })
+      .catch(err => console.error('Failed to load trip:', err));
+  };
+
   const handleEditTrip = (trip: TripPlan) => {
     setSelectedTrip(null);
     onEditTrip(trip);
@@ -260,7 +275,7 @@ export function Trips({ trips, onDeleteTrip, onPlanTrip, onEditTrip }: TripsProp
             return (
               <div
                 key={trip.id}
-                onClick={() => setSelectedTrip(trip)}
+                onClick={() => openTrip(trip)}
                 className="bg-white rounded-3xl border border-slate-200 p-6 shadow-sm hover:shadow-md hover:border-emerald-200 transition-all cursor-pointer"
               >
                 {/* Header */}